@@ -11,6 +11,8 @@ import ui_components as ui
 import tabs_scanner
 import tabs_favorites
 import tabs_lab
+import outcomes
+import history_store
 import guide as gd
 
 # -----------------------------------------------------------------------------
@@ -124,6 +126,9 @@ def login_page():
                 st.warning("일치하는 계정 정보가 없습니다.")
 
 def main_app():
+    # 스캔 이력의 선행 수익률을 채우는 백그라운드 작업 (프로세스당 1회 시작)
+    outcomes.start_outcome_worker()
+    
     user = st.session_state["username"]
     role = st.session_state.get("role", "user")
     
@@ -198,6 +203,33 @@ def main_app():
                         time.sleep(1)
                         st.rerun()
 
+            st.divider()
+            st.header("🗄️ 스캔 이력 보관")
+            st.caption("오래된 스캔 이력을 월별 Parquet 파일로 옮겨 DB를 작게 유지합니다. 과거 조회는 그대로 가능합니다.")
+            c_a1, c_a2 = st.columns([3, 1])
+            keep_months = c_a1.number_input("DB에 유지할 최근 개월 수", min_value=1, max_value=36, value=history_store.HOT_MONTHS)
+            if c_a2.button("보관 실행", use_container_width=True):
+                vacuum_error = None
+                with st.spinner("보관 중..."):
+                    moved = history_store.archive_old_months(int(keep_months))
+                    # 직전 정리가 실패했으면 옮길 이력이 없어도 다시 시도
+                    if moved or st.session_state.get("vacuum_pending"):
+                        try:
+                            db.vacuum()
+                            st.session_state["vacuum_pending"] = False
+                        except Exception as e:
+                            vacuum_error = e
+                            st.session_state["vacuum_pending"] = True
+                if vacuum_error is not None:
+                    st.warning(f"DB 공간 정리(VACUUM) 실패: {vacuum_error} - 스캔 / 성과 평가 등 쓰기 작업이 끝난 뒤 '보관 실행'을 다시 누르세요.")
+                if moved:
+                    st.success(", ".join(f"{m}: {n}건" for m, n in moved.items()) + " 보관 완료")
+                else:
+                    st.info("보관할 이력이 없습니다.")
+            archived = history_store.get_archived_months()
+            if archived:
+                st.caption(f"보관된 월: {', '.join(archived)}")
+
 if __name__ == "__main__":
     if st.session_state["logged_in"]:
         main_app()
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from numpy.lib.stride_tricks import sliding_window_view
+import database as db
+import backtest as bt
+import quote_service as qs
+from strategies import DEFAULT_PARAMS, is_us_stock
+
+# -----------------------------------------------------------------------------
+# 기준일(as-of) 구간 스캔 / scan_history 백필
+# - 저장소 일봉만 사용 (네트워크 없음)
+# - 스캐너(analyze_single_stock)와 같은 7개 조건을 (날짜 x 종목) 패널로 한 번에 계산
+#   → 날짜마다 종목별로 다시 스캔하지 않고 구간 전체를 한 번의 벡터 연산으로 처리
+# - 발생한 신호는 전략 필터와 무관하게 daily_signals 에도 기록
+# - 각 날짜의 판정은 그날까지의 봉만 사용 (rolling / ewm / 앵커 VWAP 모두 과거 방향)
+#   단, EMA 는 구간 시작 전 1년부터 누적되므로 단일 기준일 스캔과 소수점 이하 차이가 날 수 있음
+# -----------------------------------------------------------------------------
+# (스캐너 필터 키, scan_history 전략 이름) - 스캐너의 우선순위 순서
+SCAN_STRATEGIES = [
+    ("elite", "⚡엘리트"), ("dbb", "🔥DBB"), ("bnf", "💧BNF"), ("ai", "🤖AI스퀴즈"),
+    ("turtle", "🐢터틀"), ("buffett", "🛡️버핏"), ("vwap", "⚓VWAP"),
+]
+LOOKBACK_DAYS = 365  # fetch_data 와 같은 조회 창
+MIN_BARS = 200
+VWAP_ANCHOR_WINDOW = 150
+CODE_CHUNK = 500
+
+def _shift(arr, n=1):
+    out = np.full_like(arr, np.nan)
+    out[n:] = arr[:-n]
+    return out
+
+def anchored_vwap(panels, window=VWAP_ANCHOR_WINDOW):
+    """날짜마다 '직전 window 일 최저가' 에서 시작하는 앵커 VWAP (calculate_indicators 의 VWAP 를 시점별로)"""
+    H, L, C, V = panels["High"], panels["Low"], panels["Close"], panels["Volume"]
+    T, N = C.shape
+    out = np.full(C.shape, np.nan)
+    if T < window: return out
+    zero = np.zeros((1, N))
+    cum_tpv = np.vstack([zero, np.cumsum(np.nan_to_num((H + L + C) / 3 * V), axis=0)])
+    cum_v = np.vstack([zero, np.cumsum(np.nan_to_num(V), axis=0)])
+    low = np.where(np.isnan(L), np.inf, L)
+    anchor = sliding_window_view(low, window, axis=0).argmin(axis=-1) + np.arange(T - window + 1)[:, None]
+    t = np.arange(window - 1, T)[:, None]
+    cols = np.arange(N)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[window - 1:] = (cum_tpv[t + 1, cols] - cum_tpv[anchor, cols]) / (cum_v[t + 1, cols] - cum_v[anchor, cols])
+    return out
+
+def scan_panels(panels, params=None):
+    """Returns: {스캐너 필터 키: (신호 T x N bool, 점수 T x N)} - 점수 정의는 analyze_single_stock 과 같음"""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    ind = bt.compute_indicators(panels, params)
+    C, V = panels["Close"], panels["Volume"]
+    prev_c = _shift(C)
+
+    delta = pd.DataFrame(C).diff()
+    up, down = delta.clip(lower=0), -1 * delta.clip(upper=0)
+    rsi = (100 - (100 / (1 + up.rolling(14).mean() / down.rolling(14).mean()))).values
+    vwap = anchored_vwap(panels)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        elite = (ind["EMA10"] > ind["EMA20"]) & (ind["EMA20"] > ind["EMA60"]) & \
+                (ind["MACD"] > ind["Signal"]) & (_shift(ind["MACD"]) <= _shift(ind["Signal"]))
+        prev_bw = _shift(ind["Bandwidth"])
+        squeeze = ((prev_bw < params["sqz_bw"]) | (prev_bw < ind["AvgBW120"] * params["sqz_bw_ratio"])) & \
+                  (V > ind["VolAvg20"] * params["vol_mult"]) & (C > prev_c)
+        vwap_diff = np.abs(C - vwap) / vwap
+
+        return {
+            "elite": (elite, 10 + (rsi - 50)),
+            "dbb": ((C > ind["BB_Up2"]) & (prev_c <= _shift(ind["BB_Up2"])), ((C / ind["BB_Up2"]) - 1) * 1000),
+            "bnf": (ind["Disparity25"] <= params["bnf_disparity"], (100 - ind["Disparity25"]) * 2),
+            "ai": (squeeze, (V / ind["VolAvg20"]) * 10),
+            "turtle": ((C > ind["High20"]) & (prev_c <= _shift(ind["High20"])) & (C > ind["MA200"]),
+                       ((C / ind["High20"]) - 1) * 1000),
+            "buffett": ((C > ind["MA200"]) & (prev_c <= _shift(ind["MA200"])), ((C / ind["MA200"]) - 1) * 100),
+            "vwap": (vwap_diff <= params["vwap_band"], (1 - (vwap_diff / params["vwap_band"])) * 50),
+        }
+
+def scan_dates(panels, start, end, is_us=None, exclude_penny=False, params=None):
+    """
+    start ~ end 의 모든 거래일을 기준일로 스캔
+    is_us: 종목별 해외 여부 (N,) - 동전주 기준 (해외 $1 / 국내 1,000원)
+    Returns: DataFrame (scan_date, code, strategy, strategy_name, score, close)
+    """
+    dates = panels["dates"]
+    C, V = panels["Close"], panels["Volume"]
+    in_range = np.asarray((dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end)))
+    if not in_range.any(): return pd.DataFrame()
+
+    # 기준일마다 직전 1년 창 안의 봉 수 (fetch_data 의 200봉 조건)
+    valid = np.isfinite(C)
+    cnt = np.vstack([np.zeros((1, C.shape[1]), dtype=np.int64), np.cumsum(valid, axis=0)])
+    lo = dates.searchsorted(dates - timedelta(days=LOOKBACK_DAYS), side="left")
+    n_bars = cnt[1:] - cnt[lo]
+
+    with np.errstate(invalid="ignore"):
+        ok = valid & (n_bars >= MIN_BARS) & (V > 0) & in_range[:, None]
+        if exclude_penny:
+            floor = np.where(np.asarray(is_us if is_us is not None else np.zeros(C.shape[1], dtype=bool)), 1, 1000)
+            ok &= C >= floor
+
+    signals = scan_panels(panels, params)
+    frames = []
+    for key, name in SCAN_STRATEGIES:
+        fired, score = signals[key]
+        ti, ni = np.nonzero(fired & ok)
+        if not len(ti): continue
+        frames.append(pd.DataFrame({
+            "scan_date": dates[ti].strftime("%Y-%m-%d"),
+            "code": np.asarray(panels["codes"], dtype=object)[ni],
+            "strategy": key, "strategy_name": name,
+            "score": score[ti, ni], "close": C[ti, ni],
+        }))
+    if not frames: return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+# -----------------------------------------------------------------------------
+# daily_signals 행 (비트마스크 + 전략별 점수, 비트 순서는 db.SIGNAL_KEYS)
+# -----------------------------------------------------------------------------
+_NAME_TO_KEY = {name: key for key, name in SCAN_STRATEGIES}
+
+def signal_row(date, code, name, market, scores):
+    """scores: {스캐너 전략 이름: 점수} (analyze_single_stock 의 '전략_점수')"""
+    by_key = {_NAME_TO_KEY[n]: v for n, v in scores.items() if n in _NAME_TO_KEY}
+    mask = sum(1 << i for i, k in enumerate(db.SIGNAL_KEYS) if k in by_key)
+    vals = [by_key.get(k) for k in db.SIGNAL_KEYS]
+    return (date, str(code), name, market, mask) + tuple(None if v is None or np.isnan(v) else float(v) for v in vals)
+
+def signal_rows_from_hits(hits, meta):
+    """scan_dates 결과 (long) → (날짜, 종목) 당 1행"""
+    long = hits.set_index(["scan_date", "code", "strategy"])
+    wide = long["score"].unstack("strategy").reindex(columns=db.SIGNAL_KEYS)
+    fired = long["close"].unstack("strategy").reindex(columns=db.SIGNAL_KEYS).notna()  # 점수가 NaN 인 신호도 포함
+    mask = fired.values @ (1 << np.arange(len(db.SIGNAL_KEYS)))
+    scores = wide.astype(object).where(wide.notna(), None).values.tolist()
+    return [(d, c, meta[c][0], meta[c][1], int(m)) + tuple(sc)
+            for (d, c), m, sc in zip(wide.index, mask, scores)]
+
+def _normalize_code(code):
+    code = str(code).strip()
+    return code.zfill(6) if code.isdigit() and len(code) < 6 else code
+
+def backfill_range(targets, start, end, exclude_penny=True, strategies=None, params=None, progress=None):
+    """
+    targets: 스캐너 종목 리스트 (Code, Name, Market)
+    strategies: 스캐너 필터 키 목록 - 하나라도 걸린 종목-날짜만 기록 (그날 걸린 전략은 모두 기록, 스캐너와 동일)
+    progress: progress(완료 묶음 수, 전체 묶음 수) 콜백
+    Returns: {'dates', 'hits', 'saved'} - hits 는 기록 대상 (종목, 날짜, 전략) 수
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    meta = {}
+    for _, r in targets.iterrows():
+        meta.setdefault(_normalize_code(r['Code']), (r['Name'], r.get('Market', 'Unknown')))
+    stored = set(db.get_bar_codes())
+    codes = [c for c in meta if c in stored]
+
+    # 국내 / 해외는 거래일이 달라 따로 패널을 만듦 (한 패널에 섞이면 휴장일이 NaN 으로 끼어 rolling 창이 깨짐)
+    groups = [[c for c in codes if qs.is_kr_code(c)], [c for c in codes if not qs.is_kr_code(c)]]
+    chunks = [g[i:i + CODE_CHUNK] for g in groups for i in range(0, len(g), CODE_CHUNK)]
+    load_from = (start - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    load_to = end.strftime("%Y-%m-%d")
+
+    frames = []
+    for i, chunk in enumerate(chunks):
+        panels = bt.load_panels(chunk, load_from, load_to)
+        if panels is not None:
+            is_us = np.array([is_us_stock(c, meta[c][1]) for c in panels["codes"]])
+            frames.append(scan_dates(panels, start, end, is_us, exclude_penny, params))
+        if progress: progress(i + 1, len(chunks))
+
+    hits = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if hits.empty: return {"dates": 0, "hits": 0, "saved": 0}
+    # 신호 테이블은 전략 필터와 무관하게 전체 기록
+    db.save_daily_signals(signal_rows_from_hits(hits, meta))
+    if strategies:
+        keep = hits.loc[hits["strategy"].isin(strategies), ["scan_date", "code"]].drop_duplicates()
+        hits = hits.merge(keep, on=["scan_date", "code"])
+    if hits.empty: return {"dates": 0, "hits": 0, "saved": 0}
+
+    records = [(d, s, c, meta[c][0], float(p), meta[c][1])
+               for d, s, c, p in zip(hits["scan_date"], hits["strategy_name"], hits["code"], hits["close"])]
+    saved = db.save_scan_results(records)
+    return {"dates": int(hits["scan_date"].nunique()), "hits": len(records), "saved": saved}
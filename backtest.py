@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import database as db
+import bar_store
+from strategies import DEFAULT_PARAMS
+
+# -----------------------------------------------------------------------------
+# 포트폴리오 백테스트 엔진 (7개 전략)
+# - 일봉 저장소에서 (날짜 x 종목) 패널을 만들고, 지표/신호도 패널 단위로 계산
+# - 시간 축만 루프, 종목 축은 NumPy 벡터 연산
+# - 진입: 신호 발생일 종가 / 손절·목표: analyze_strategy_deep_dive 규칙 / 수량: 2% 리스크 규칙
+# -----------------------------------------------------------------------------
+BAR_COLUMNS = bar_store.BAR_COLUMNS
+TRADING_DAYS = 252
+
+# (내부 키, 표시 이름) - 표시 이름은 strategies.DEEP_DIVE_STRATEGIES 의 짧은 이름과 같음
+STRATEGIES = [
+    ("turtle", "🐢 터틀"), ("elite", "⚡ 엘리트"), ("dbb", "🔥 DBB"), ("bnf", "💧 BNF"),
+    ("squeeze", "🤖 AI스퀴즈"), ("buffett", "🛡️ 버핏"), ("vwap", "⚓ VWAP"),
+]
+
+def load_panels(codes=None, start=None, end=None):
+    """
+    저장소 일봉 → {'dates', 'codes', 'Open', 'High', 'Low', 'Close', 'Volume'} (각 T x N float64 배열)
+    codes 가 없으면 저장소의 전체 종목
+    """
+    codes = list(codes) if codes is not None else db.get_bar_codes()
+    rows = db.get_bar_panel_rows(codes, start, end)
+    if not rows: return None
+    df = pd.DataFrame(rows, columns=["code", "date"] + BAR_COLUMNS)
+    wide = df.pivot(index="date", columns="code").sort_index()
+    panels = {
+        "dates": pd.to_datetime(wide.index),
+        "codes": list(wide["Close"].columns),
+    }
+    for col in BAR_COLUMNS:
+        panels[col] = np.ascontiguousarray(wide[col].values, dtype=np.float64)
+    return panels
+
+def extend_history(codes, years, max_workers=8):
+    """백테스트 기간만큼 저장소 일봉을 채움 (부족한 종목만 네트워크 조회)"""
+    start = datetime.now() - timedelta(days=int(365 * years))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(lambda c: bool(bar_store.update_bars(c, start)), codes))
+
+# -----------------------------------------------------------------------------
+# 지표 / 신호 패널
+# -----------------------------------------------------------------------------
+def donchian(panels, entry_win, exit_win):
+    """터틀 채널: (직전 entry_win 일 고가 최대, 직전 exit_win 일 저가 최소)"""
+    H = pd.DataFrame(panels["High"])
+    L = pd.DataFrame(panels["Low"])
+    return H.rolling(entry_win).max().shift(1).values, L.rolling(exit_win).min().shift(1).values
+
+def compute_indicators(panels, params=None):
+    """strategies.calculate_indicators 와 같은 정의를 종목 축 전체에 한 번에 적용"""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    C = pd.DataFrame(panels["Close"])
+    H = pd.DataFrame(panels["High"])
+    L = pd.DataFrame(panels["Low"])
+    V = pd.DataFrame(panels["Volume"])
+
+    ind = {}
+    ind["MA20"] = C.rolling(20).mean()
+    ind["MA25"] = C.rolling(25).mean()
+    ind["MA200"] = C.rolling(200).mean()
+    ind["EMA10"] = C.ewm(span=10, adjust=False).mean()
+    ind["EMA20"] = C.ewm(span=20, adjust=False).mean()
+    ind["EMA60"] = C.ewm(span=60, adjust=False).mean()
+    ind["MACD"] = C.ewm(span=12, adjust=False).mean() - C.ewm(span=26, adjust=False).mean()
+    ind["Signal"] = ind["MACD"].ewm(span=9, adjust=False).mean()
+
+    std20 = C.rolling(20).std()
+    ind["BB_Up2"] = ind["MA20"] + std20 * 2
+    ind["Bandwidth"] = (std20 * 4) / ind["MA20"]
+    ind["AvgBW120"] = ind["Bandwidth"].rolling(120).mean()
+    ind["Disparity25"] = C / ind["MA25"] * 100
+    ind["VolAvg20"] = V.rolling(20).mean()
+
+
+    prev_c = C.shift(1)
+    tr = np.fmax(np.fmax(H - L, (H - prev_c).abs()), (L - prev_c).abs())
+    ind["ATR"] = tr.rolling(20).mean()
+
+    # 스캐너의 VWAP 는 '마지막 봉 기준 150일 최저점'에서 시작하는 앵커 VWAP 라 과거 시점에 쓰면 미래 정보가 섞임
+    # → 백테스트는 60일 롤링 VWAP 로 대체
+    tp = (H + L + C) / 3
+    ind["VWAP"] = (tp * V).rolling(60).sum() / V.rolling(60).sum()
+    ind = {k: v.values for k, v in ind.items()}
+    ind["High20"], ind["Low10"] = donchian(panels, params["donchian_entry"], params["donchian_exit"])
+    return ind
+
+def _shift(arr, n=1):
+    out = np.full_like(arr, np.nan)
+    out[n:] = arr[:-n]
+    return out
+
+def build_signals(panels, ind, params=None):
+    """
+    params: strategies.DEFAULT_PARAMS 중 바꿀 값 (채널 기간은 compute_indicators 에서 반영)
+    Returns: {내부 키: (진입 신호, 손절가, 목표가, 청산 신호)} - 모두 T x N 배열, 신호일 종가 기준
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    O, C = panels["Open"], panels["Close"]
+    prev_c = _shift(C)
+    with np.errstate(invalid="ignore"):
+        aligned = (ind["EMA10"] > ind["EMA20"]) & (ind["EMA20"] > ind["EMA60"])
+        macd_cross = (ind["MACD"] > ind["Signal"]) & (_shift(ind["MACD"]) <= _shift(ind["Signal"]))
+        sqz = (ind["Bandwidth"] < params["sqz_bw"]) | (ind["Bandwidth"] < ind["AvgBW120"] * params["sqz_bw_ratio"])
+        vol = panels["Volume"] > ind["VolAvg20"] * params["vol_mult"]
+        turtle_entry = ind["High20"]
+        vwap = ind["VWAP"]
+        no_exit = np.zeros(C.shape, dtype=bool)
+
+        signals = {
+            "turtle": ((C > ind["High20"]) & (prev_c <= _shift(ind["High20"])) & (C > ind["MA200"]),
+                       turtle_entry - 2 * ind["ATR"], turtle_entry + 4 * ind["ATR"],
+                       C < ind["Low10"]),
+            "elite": (aligned & macd_cross, ind["MA20"], C * 1.1, no_exit),
+            "dbb": ((C > ind["BB_Up2"]) & (prev_c <= _shift(ind["BB_Up2"])), C * 0.97, ind["BB_Up2"] * 1.15, no_exit),
+            "bnf": (ind["Disparity25"] <= params["bnf_disparity"], C * 0.95, ind["MA25"], no_exit),
+            "squeeze": (sqz & vol & (C > ind["MA20"]), ind["MA20"], C * 1.2, no_exit),
+            "buffett": ((C > ind["MA200"]) & (prev_c <= _shift(ind["MA200"])), ind["MA200"], C * 1.2, no_exit),
+            "vwap": ((C >= vwap) & (C <= vwap * (1 + params["vwap_band"])) & (C >= O), vwap * 0.97, vwap * 1.15, no_exit),
+        }
+    return signals
+
+# -----------------------------------------------------------------------------
+# 시뮬레이션
+# -----------------------------------------------------------------------------
+def simulate(panels, entry, stop, target, exit_sig, capital=10_000_000, risk_pct=0.02,
+             max_hold=20, fee_rate=0.0015):
+    """
+    종목당 최대 1포지션. 진입은 신호일 종가, 다음 날부터 손절 → 목표 → 청산 신호/보유기간 순으로 확인
+    Returns: (일별 평가금액 배열, 거래별 수익률 배열)
+    """
+    O, H, L, C = panels["Open"], panels["High"], panels["Low"], panels["Close"]
+    C_mark = pd.DataFrame(C).ffill().fillna(0.0).values  # 거래정지일은 직전 종가로 평가
+    T, N = C.shape
+
+    with np.errstate(invalid="ignore"):
+        valid = entry & np.isfinite(stop) & np.isfinite(target) & (stop < C) & (target > C) & (C > 0)
+
+    cash = float(capital)
+    shares = np.zeros(N)
+    entry_px = np.zeros(N)
+    stop_px = np.zeros(N)
+    tgt_px = np.zeros(N)
+    held = np.zeros(N, dtype=np.int64)
+    equity = np.empty(T)
+    trade_rets = []
+
+    for t in range(T):
+        is_open = shares > 0
+        if t > 0 and is_open.any():
+            held[is_open] += 1
+            with np.errstate(invalid="ignore"):
+                hit_stop = is_open & (L[t] <= stop_px)
+                hit_tgt = is_open & ~hit_stop & (H[t] >= tgt_px)
+                other = is_open & ~hit_stop & ~hit_tgt & np.isfinite(C[t]) & (exit_sig[t] | (held >= max_hold))
+            op = np.where(np.isfinite(O[t]), O[t], C[t])
+            px = np.zeros(N)
+            px[hit_stop] = np.minimum(op, stop_px)[hit_stop]   # 갭 하락이면 시가 체결
+            px[hit_tgt] = np.maximum(op, tgt_px)[hit_tgt]
+            px[other] = C[t][other]
+            ex = hit_stop | hit_tgt | other
+            if ex.any():
+                cash += float(np.sum(shares[ex] * px[ex])) * (1 - fee_rate)
+                trade_rets.append(px[ex] * (1 - fee_rate) / (entry_px[ex] * (1 + fee_rate)) - 1)
+                shares[ex] = 0
+                held[ex] = 0
+
+        cand = valid[t] & (shares == 0)
+        if cand.any():
+            eq_now = cash + float(np.sum(shares * C_mark[t]))
+            idx = np.nonzero(cand)[0]
+            px = C[t, idx]
+            n_sh = np.floor(eq_now * risk_pct / (px - stop[t, idx]))
+            n_sh = np.minimum(n_sh, np.floor(eq_now / px))  # 종목당 투입금은 총자산 이내 (정밀 분석과 같은 상한)
+            cost = np.where(n_sh > 0, n_sh * px * (1 + fee_rate), 0.0)
+            ok = (n_sh > 0) & (np.cumsum(cost) <= cash)
+            if ok.any():
+                sel = idx[ok]
+                shares[sel] = n_sh[ok]
+                entry_px[sel] = px[ok]
+                stop_px[sel] = stop[t, sel]
+                tgt_px[sel] = target[t, sel]
+                held[sel] = 0
+                cash -= float(cost[ok].sum())
+
+        equity[t] = cash + float(np.sum(shares * C_mark[t]))
+
+    trades = np.concatenate(trade_rets) if trade_rets else np.array([])
+    return equity, trades
+
+def perf_metrics(equity, dates, trades):
+    """Returns: dict(CAGR%, Sharpe, MDD%, 거래 수, 승률%, 평균 거래수익률%)"""
+    rets = equity[1:] / equity[:-1] - 1 if len(equity) > 1 else np.array([0.0])
+    years = max((dates[-1] - dates[0]).days / 365.25, 1 / 365.25)
+    std = rets.std()
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    return {
+        "cagr": float((equity[-1] / equity[0]) ** (1 / years) - 1) * 100 if equity[0] > 0 else 0.0,
+        "sharpe": float(rets.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+        "mdd": float(drawdown.min()) * 100,
+        "trades": int(len(trades)),
+        "win_rate": float((trades > 0).mean() * 100) if len(trades) else 0.0,
+        "avg_trade": float(trades.mean() * 100) if len(trades) else 0.0,
+    }
+
+def forward_returns(close, hold, exit_sig=None):
+    """
+    hold 거래일 뒤 종가 수익률 (T x N, 끝부분은 NaN)
+    exit_sig 가 있으면 그 전에 처음 청산 신호가 난 날 종가로 조기 청산
+    """
+    fwd = np.full_like(close, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fwd[:-hold] = close[hold:] / close[:-hold] - 1
+        if exit_sig is not None:
+            alive = np.ones((len(close) - hold, close.shape[1]), dtype=bool)
+            for k in range(1, hold):
+                hit = alive & exit_sig[k:len(close) - hold + k]
+                fwd[:-hold][hit] = (close[k:len(close) - hold + k] / close[:-hold] - 1)[hit]
+                alive &= ~hit
+    return fwd
+
+def event_stats(entry, fwd, row_slice=slice(None)):
+    """신호일별 선행 수익률 통계 (포트폴리오 경로 없이). Returns: (건수, 승률%, 평균수익률%)"""
+    e = entry[row_slice]
+    f = fwd[row_slice]
+    rets = f[e & np.isfinite(f)]
+    if len(rets) == 0: return 0, np.nan, np.nan
+    return int(len(rets)), float((rets > 0).mean() * 100), float(rets.mean() * 100)
+
+def run_backtest(panels, strategies=None, capital=10_000_000, risk_pct=0.02, max_hold=20, fee_rate=0.0015, params=None):
+    """
+    strategies: 내부 키 목록 (없으면 7개 전체)
+    params: strategies.DEFAULT_PARAMS 중 바꿀 값
+    Returns: {표시 이름: {'equity': Series, 'cagr', 'sharpe', 'mdd', 'trades', 'win_rate', 'avg_trade'}}
+    """
+    ind = compute_indicators(panels, params)
+    signals = build_signals(panels, ind, params)
+    results = {}
+    for key, label in STRATEGIES:
+        if strategies and key not in strategies: continue
+        entry, stop, target, exit_sig = signals[key]
+        equity, trades = simulate(panels, entry, stop, target, exit_sig, capital, risk_pct, max_hold, fee_rate)
+        res = perf_metrics(equity, panels["dates"], trades)
+        res["equity"] = pd.Series(equity, index=panels["dates"])
+        results[label] = res
+    return results
@@ -0,0 +1,54 @@
+import FinanceDataReader as fdr
+import pandas as pd
+from datetime import datetime, timedelta
+import database as db
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# -----------------------------------------------------------------------------
+# 일봉 저장소 (Bar Store)
+# - 네트워크는 저장된 마지막 날짜 이후만 증분 조회
+# - 마지막 날짜는 장중 미완성 봉일 수 있으므로 항상 다시 받아 덮어씀
+# -----------------------------------------------------------------------------
+def _to_rows(df):
+    df = df.dropna(subset=['Close'])
+    dates = pd.to_datetime(df.index).strftime('%Y-%m-%d')
+    vals = df[BAR_COLUMNS].astype(float).values.tolist()
+    return [(d, *v) for d, v in zip(dates, vals)]
+
+def _rows_to_df(rows):
+    if not rows: return pd.DataFrame(columns=BAR_COLUMNS)
+    df = pd.DataFrame(rows, columns=['Date'] + BAR_COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.set_index('Date')
+
+def update_bars(code, start):
+    """start(datetime) 이후 일봉이 저장소에 있도록 증분 갱신. 네트워크 실패 시 조용히 무시"""
+    code = str(code)
+    first, last = db.get_bar_date_range(code)
+    start_str = start.strftime('%Y-%m-%d')
+
+    # 요청 구간 앞부분이 비어 있으면 전체 조회 (신규 상장 종목은 매번 전체지만 데이터가 짧음)
+    if first is None or first > start_str:
+        fetch_from = start
+    else:
+        fetch_from = datetime.strptime(last, '%Y-%m-%d')
+    try:
+        df = fdr.DataReader(code, fetch_from)
+        if df is not None and not df.empty:
+            db.save_bars(code, _to_rows(df))
+        return True
+    except Exception:
+        return False
+
+def get_bars(code, start=None, end=None):
+    """저장소에서만 읽음 (네트워크 없음). Returns: Date 인덱스의 OHLCV DataFrame"""
+    s = start.strftime('%Y-%m-%d') if start is not None else None
+    e = end.strftime('%Y-%m-%d') if end is not None else None
+    return _rows_to_df(db.get_bars(str(code), s, e))
+
+def get_history(code, days=365):
+    """최근 days 일 일봉: 증분 갱신 후 저장소에서 읽음"""
+    start = datetime.now() - timedelta(days=days)
+    update_bars(code, start)
+    return get_bars(code, start)
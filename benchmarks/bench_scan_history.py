@@ -0,0 +1,58 @@
+"""
+scan_history 저장 경로 벤치마크 (임시 DB 사용, 실제 Data/ 는 건드리지 않음)
+
+    python benchmarks/bench_scan_history.py [hits]
+
+- per-row : 기존 경로 (save_scan_result 를 (종목, 전략)마다 호출 → 행마다 commit)
+- bulk    : save_scan_results 1회 호출 (executemany + 단일 트랜잭션)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+STRATEGIES = ["⚡엘리트", "🔥DBB", "💧BNF", "🤖AI스퀴즈", "🐢터틀", "🛡️버핏", "⚓VWAP"]
+
+def make_records(scan_date, hits):
+    # 종목당 전략 2개 → hits 300 이면 600행 (요청서의 '300 hit = 600+ fsync' 시나리오)
+    records = []
+    for i in range(hits):
+        code = f"{i:06d}"
+        for s_name in (STRATEGIES[i % 7], STRATEGIES[(i + 3) % 7]):
+            records.append((scan_date, s_name, code, f"종목{i}", 1000.0 + i, "KOSPI"))
+    return records
+
+def bench(label, fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<10} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+def main():
+    hits = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tmp_dir = tempfile.mkdtemp(prefix="bench_db_")
+    db.DB_DIR = tmp_dir
+    db.DB_FILE = os.path.join(tmp_dir, "bench.db")
+    try:
+        db.init_db()
+        rows_a = make_records("2024-01-02", hits)
+        rows_b = make_records("2024-01-03", hits)
+        print(f"{len(rows_a)} rows per scan")
+
+        t_row = bench("per-row", lambda: [db.save_scan_result(*r) for r in rows_a])
+        t_bulk = bench("bulk", lambda: db.save_scan_results(rows_b))
+        # 같은 날 재스캔: UNIQUE(scan_date, strategy_name, code) 로 전부 무시되어야 함
+        inserted = db.save_scan_results(rows_b)
+        print(f"re-run inserted {inserted} rows (expected 0)")
+        print(f"speedup    {t_row / t_bulk:9.1f} x")
+    finally:
+        db.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
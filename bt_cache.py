@@ -0,0 +1,144 @@
+import atexit
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import pandas as pd
+import database as db
+
+# -----------------------------------------------------------------------------
+# 백테스트 결과 캐시 (메모리 LRU + 디스크 spill)
+# - 키: (종류, 종목, 일봉 스탬프(마지막 봉 날짜 + OHLCV 해시), 전략 정의 해시, 파라미터)
+#   → 같은 날 재스캔 / 필터만 바꾼 재스캔은 일봉이 그대로라 재계산 없음
+#   → 장중 미완성 봉이 다시 받아져 값이 바뀌면 날짜가 같아도 키가 달라짐
+#   → 전략 코드나 파라미터가 바뀌면 키가 달라져 자연스럽게 무효화
+# - 메모리에서 밀려난 항목은 디스크로 내려가고, 디스크 적중 시 다시 메모리로 올림
+# -----------------------------------------------------------------------------
+CACHE_SUBDIR = "bt_cache"
+MAX_MEMORY_ENTRIES = 4000
+MAX_DISK_FILES = 50000
+
+_lock = threading.Lock()
+_mem = OrderedDict()  # key -> value (뒤쪽이 최근 사용)
+_stats = {"hit": 0, "disk_hit": 0, "miss": 0}
+
+def _cache_dir():
+    return os.path.join(db.DB_DIR, CACHE_SUBDIR)
+
+def _digest(key):
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+def _disk_path(key):
+    h = _digest(key)
+    return os.path.join(_cache_dir(), h[:2], h + ".pkl")
+
+def _freeze(obj):
+    """dict/list 가 섞인 파라미터를 해시 가능한 튜플로 고정"""
+    if isinstance(obj, dict): return tuple(sorted((k, _freeze(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)): return tuple(_freeze(v) for v in obj)
+    return obj
+
+def bars_stamp(df, columns=("Open", "High", "Low", "Close", "Volume")):
+    """일봉 구간 식별자: 마지막 봉 날짜 + OHLCV 해시 (장중 갱신 / 수정주가 반영 시 바뀜)"""
+    h = hashlib.sha1(pd.util.hash_pandas_object(df[list(columns)], index=True).values.tobytes()).hexdigest()[:16]
+    return f"{df.index[-1]:%Y-%m-%d}:{h}"
+
+def make_key(kind, ticker, last_date, version, params=None):
+    return (kind, str(ticker), str(last_date), version, _freeze(params))
+
+def _spill(key, value):
+    path = _disk_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Backtest Cache Spill Error: {e}")
+
+def _load(key):
+    path = _disk_path(key)
+    if not os.path.exists(path): return None
+    try:
+        with open(path, "rb") as f:
+            stored_key, value = pickle.load(f)
+        if stored_key != key: return None  # 해시 충돌 방지
+        os.utime(path)  # prune_disk 의 LRU 기준
+        return value
+    except Exception:
+        return None
+
+def get(key):
+    with _lock:
+        if key in _mem:
+            _mem.move_to_end(key)
+            _stats["hit"] += 1
+            return _mem[key]
+    value = _load(key)
+    if value is None:
+        with _lock: _stats["miss"] += 1
+        return None
+    with _lock: _stats["disk_hit"] += 1
+    _put_memory(key, value)
+    return value
+
+def _put_memory(key, value):
+    evicted = []
+    with _lock:
+        _mem[key] = value
+        _mem.move_to_end(key)
+        while len(_mem) > MAX_MEMORY_ENTRIES:
+            evicted.append(_mem.popitem(last=False))
+    for k, v in evicted:
+        _spill(k, v)
+
+def put(key, value):
+    _put_memory(key, value)
+
+def get_or_compute(key, fn):
+    """캐시에 있으면 반환, 없으면 fn() 결과를 저장 후 반환 (None 은 저장하지 않음)"""
+    value = get(key)
+    if value is not None: return value
+    value = fn()
+    if value is not None: put(key, value)
+    return value
+
+def stats():
+    with _lock:
+        return {**_stats, "memory": len(_mem)}
+
+def flush():
+    """종료 시 메모리 항목을 디스크로 (재시작 후에도 재사용)"""
+    with _lock:
+        items = list(_mem.items())
+    for k, v in items:
+        if not os.path.exists(_disk_path(k)): _spill(k, v)
+    prune_disk()
+
+def prune_disk(max_files=MAX_DISK_FILES):
+    """디스크 캐시가 max_files 를 넘으면 오래 안 쓴(수정시각 기준) 파일부터 삭제"""
+    root = _cache_dir()
+    if not os.path.isdir(root): return 0
+    files = []
+    for sub in os.listdir(root):
+        d = os.path.join(root, sub)
+        if os.path.isdir(d):
+            files.extend(os.path.join(d, f) for f in os.listdir(d) if f.endswith(".pkl"))
+    if len(files) <= max_files: return 0
+    files.sort(key=lambda f: os.path.getmtime(f))
+    removed = 0
+    for f in files[:len(files) - max_files]:
+        try:
+            os.remove(f)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def clear():
+    with _lock:
+        _mem.clear()
+
+atexit.register(flush)
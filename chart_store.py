@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------------
+# 스캔 결과 부가 데이터 저장소 (프로세스 공용 메모리 LRU)
+# - 키: (종류, 종목, 마지막 봉 날짜)
+#   "chart"  → 차트 구간 DataFrame (숫자 블록 1개)
+#   "detail" → 전략 목록 / 전략별 점수 / 보유기간 성과 / 유의성 (중첩 dict)
+# - 스캔 결과 행에는 스칼라만 두고, 행을 선택했을 때 여기서 꺼내 씀
+#   → 세션 메모리 / rerun 비용이 포착 종목 수에 비례해 늘지 않음
+# - 밀려난 항목은 저장소 일봉으로 다시 계산 (strategies.chart_series / scan_detail)
+# -----------------------------------------------------------------------------
+MAX_ENTRIES = 2000
+
+_lock = threading.Lock()
+_mem = OrderedDict()  # key -> DataFrame (뒤쪽이 최근 사용)
+_stats = {"hit": 0, "miss": 0}
+
+def make_key(code, last_date, kind="chart"):
+    return (kind, str(code), str(last_date)[:10])
+
+def get(key):
+    with _lock:
+        if key in _mem:
+            _mem.move_to_end(key)
+            _stats["hit"] += 1
+            return _mem[key]
+        _stats["miss"] += 1
+        return None
+
+def put(key, value):
+    with _lock:
+        _mem[key] = value
+        _mem.move_to_end(key)
+        while len(_mem) > MAX_ENTRIES:
+            _mem.popitem(last=False)
+
+def get_or_compute(key, fn):
+    """저장소에 있으면 반환, 없으면 fn() 결과를 저장 후 반환 (None 은 저장하지 않음)"""
+    value = get(key)
+    if value is not None: return value
+    value = fn()
+    if value is not None: put(key, value)
+    return value
+
+def stats():
+    with _lock:
+        return {**_stats, "entries": len(_mem)}
+
+def clear():
+    with _lock:
+        _mem.clear()
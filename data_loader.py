@@ -1,6 +1,14 @@
 import streamlit as st
 import FinanceDataReader as fdr
 import pandas as pd
+import threading
+import database as db
+
+# KRX 시장 구분 → yfinance 접미사
+YF_SUFFIX = {'KOSPI': '.KS', 'KOSDAQ': '.KQ', 'KOSDAQ GLOBAL': '.KQ'}
+
+_symbol_lock = threading.Lock()
+_symbol_map = None  # code -> (market, yf_symbol, name)
 
 @st.cache_data(ttl=3600)
 def get_master_data(market_code):
@@ -11,6 +19,7 @@ def get_master_data(market_code):
             df_krx = fdr.StockListing('KRX') # 전체 데이터
             if 'Code' not in df_krx.columns and 'Symbol' in df_krx.columns:
                 df_krx = df_krx.rename(columns={'Symbol': 'Code'})
+            sync_symbol_map(df_krx)
             
             # 시장 구분
             if market_code == "KOSPI":
@@ -80,4 +89,60 @@ def get_stock_name(code):
             row = df[df['Code'] == str(code)]
             if not row.empty: return row.iloc[0]['Name']
         return code
-    except: return code
\ No newline at end of file
+    except: return code
+
+# -----------------------------------------------------------------------------
+# 거래소 심볼 매핑 (code → .KS/.KQ) - DB에 영구 저장, 상장 목록이 바뀔 때만 갱신
+# -----------------------------------------------------------------------------
+def _load_symbol_map():
+    global _symbol_map
+    if _symbol_map is None:
+        with _symbol_lock:
+            if _symbol_map is None:
+                try: _symbol_map = db.get_symbol_map()
+                except Exception: _symbol_map = {}
+    return _symbol_map
+
+def sync_symbol_map(df_krx):
+    """KRX 전체 상장 목록으로 매핑 갱신. 새로 상장되거나 시장/이름이 바뀐 종목만 기록"""
+    try:
+        current = _load_symbol_map()
+        changed = []
+        for code, name, market in df_krx[['Code', 'Name', 'Market']].itertuples(index=False):
+            suffix = YF_SUFFIX.get(market)
+            if not suffix: continue
+            code = str(code)
+            entry = (market, f"{code}{suffix}", name)
+            if current.get(code) != entry: changed.append((code,) + entry)
+        if changed:
+            db.save_symbol_map(changed)
+            with _symbol_lock:
+                for code, market, sym, name in changed: current[code] = (market, sym, name)
+        return len(changed)
+    except Exception:
+        return 0
+
+def resolve_yf_symbols(codes, refresh=True):
+    """
+    yfinance 심볼로 변환. 한국 종목은 저장된 매핑 사용 (없으면 KRX 목록을 1회 불러와 갱신)
+    refresh=False: 저장된 매핑만 사용 (백그라운드 스레드용 - st.cache_data / KRX 다운로드 없이 .KS 로 대체)
+    Returns: ({code: symbol}, 매핑에 없는 한국 종목 코드 목록)
+    """
+    mapping = _load_symbol_map()
+    kr = [str(c) for c in codes if str(c).isdigit() and len(str(c)) == 6]
+    if refresh and any(c not in mapping for c in kr):
+        get_master_data("KOSPI")  # 캐시 만료 시 KRX 목록을 받아 sync_symbol_map 호출
+    out, unknown = {}, []
+    for code in codes:
+        code = str(code)
+        if code.isdigit() and len(code) == 6:
+            if code in mapping: out[code] = mapping[code][1]
+            else:
+                out[code] = f"{code}.KS"
+                unknown.append(code)
+        else:
+            out[code] = code
+    return out, unknown
+
+def resolve_yf_symbol(code):
+    return resolve_yf_symbols([code])[0][str(code)]
@@ -1,33 +1,82 @@
 import sqlite3
 import hashlib
+import json
 import os
+import queue
+import atexit
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_DIR = "Data"
 DB_FILE = os.path.join(DB_DIR, "quant_scanner.db")
 
-def init_db():
-    if not os.path.exists(DB_DIR):
-        os.makedirs(DB_DIR)
+# [최적화] 커넥션 풀: 스키마 준비는 프로세스당 1회, 커넥션은 재사용
+# 읽기는 풀의 읽기 전용 커넥션, 쓰기는 전용 writer 스레드 1개가 큐로 받아 그룹 커밋
+POOL_SIZE = 8
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_MAX = 64
+WRITE_WAIT_POLL_SEC = 1.0  # 대기 중인 쓰기 호출이 writer 스레드 생존을 확인하는 주기
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+)
 
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    c = conn.cursor()
-    
+# daily_signals 비트 순서 (bit i = 1 << i, 컬럼 score_<키>) - 스캐너 필터 키와 같음, 새 전략은 끝에만 추가
+SIGNAL_KEYS = ["elite", "dbb", "bnf", "ai", "turtle", "buffett", "vwap"]
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_open_conns = set()
+_conn_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+_write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+_writer_lock = threading.Lock()
+_writer_thread = None
+
+def _open_conn(read_only=False):
+    # isolation_level=None: 트랜잭션은 BEGIN/COMMIT 으로 직접 관리
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=5.0, isolation_level=None)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    with _conn_lock:
+        _open_conns.add(conn)
+    return conn
+
+def _close_conn(conn):
+    with _conn_lock:
+        _open_conns.discard(conn)
+    try: conn.close()
+    except sqlite3.Error: pass
+
+# -----------------------------------------------------------------------------
+# 스키마 마이그레이션 (schema_version 기준, 순서대로 1회씩 적용)
+# -----------------------------------------------------------------------------
+def _add_column_if_missing(c, table, column, decl):
+    cols = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _m001_base_tables(c):
     c.execute('''CREATE TABLE IF NOT EXISTS users 
                  (username TEXT PRIMARY KEY, password TEXT, email TEXT, role TEXT)''')
     
     c.execute('''CREATE TABLE IF NOT EXISTS favorites 
                  (username TEXT, code TEXT, PRIMARY KEY (username, code))''')
     
-    # [마이그레이션] 기존 컬럼들
-    try: c.execute("ALTER TABLE favorites ADD COLUMN added_date TEXT")
-    except sqlite3.OperationalError: pass
-    try: c.execute("ALTER TABLE favorites ADD COLUMN initial_price REAL DEFAULT 0")
-    except sqlite3.OperationalError: pass
-    try: c.execute("ALTER TABLE favorites ADD COLUMN strategies TEXT DEFAULT ''")
-    except sqlite3.OperationalError: pass
-    try: c.execute("ALTER TABLE favorites ADD COLUMN name TEXT DEFAULT ''")
-    except sqlite3.OperationalError: pass
+    # 기존 DB(스키마 버전 도입 이전)에는 컬럼이 이미 있을 수 있음
+    _add_column_if_missing(c, "favorites", "added_date", "TEXT")
+    _add_column_if_missing(c, "favorites", "initial_price", "REAL DEFAULT 0")
+    _add_column_if_missing(c, "favorites", "strategies", "TEXT DEFAULT ''")
+    _add_column_if_missing(c, "favorites", "name", "TEXT DEFAULT ''")
 
     # 성과 추적 히스토리
     c.execute('''CREATE TABLE IF NOT EXISTS scan_history 
@@ -40,153 +89,737 @@ def init_db():
                   market TEXT,
                   UNIQUE(scan_date, strategy_name, code))''')
                   
-    # [신규] 전략별 전역 승률 통계 저장 (공유 데이터)
+    # 전략별 전역 승률 통계 저장 (공유 데이터)
     c.execute('''CREATE TABLE IF NOT EXISTS strategy_stats 
                  (strategy_name TEXT PRIMARY KEY,
                   win_rate REAL,
                   total_count INTEGER,
                   last_updated TEXT)''')
 
-    conn.commit()
-    return conn
+def _m002_query_indexes(c):
+    # scan_date 단독 조회는 UNIQUE(scan_date, strategy_name, code) 인덱스가 담당
+    # favorites 의 username 조회는 PRIMARY KEY (username, code) 가 담당
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scan_history_code ON scan_history (code, scan_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scan_history_strategy ON scan_history (strategy_name, scan_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_favorites_code ON favorites (code)")
+    c.execute("ANALYZE")
+
+def _m003_bars_and_outcomes(c):
+    # 일봉 저장소 (bar store)
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_bars 
+                 (code TEXT, date TEXT,
+                  open REAL, high REAL, low REAL, close REAL, volume REAL,
+                  PRIMARY KEY (code, date)) WITHOUT ROWID''')
+    
+    # scan_history 행별 고정 호라이즌(거래일) 선행 수익률
+    c.execute('''CREATE TABLE IF NOT EXISTS scan_outcomes 
+                 (history_id INTEGER, horizon INTEGER,
+                  exit_date TEXT, exit_price REAL, return_pct REAL,
+                  PRIMARY KEY (history_id, horizon)) WITHOUT ROWID''')
+    
+    # 모든 호라이즌이 채워지면 1 → 미완료 행만 부분 인덱스로 빠르게 조회
+    _add_column_if_missing(c, "scan_history", "outcome_complete", "INTEGER DEFAULT 0")
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_scan_history_pending 
+                 ON scan_history (code) WHERE outcome_complete = 0''')
+
+def _m004_strategy_perf(c):
+    # 전략 × 시장 × 호라이즌 × 기간(월) 누적 합계 (outcome 저장 시 증분 갱신)
+    c.execute('''CREATE TABLE IF NOT EXISTS strategy_perf 
+                 (strategy_name TEXT, market TEXT, horizon INTEGER, period TEXT,
+                  n INTEGER, wins INTEGER, sum_ret REAL, sum_ret_sq REAL,
+                  last_updated TEXT,
+                  PRIMARY KEY (strategy_name, market, horizon, period)) WITHOUT ROWID''')
+    
+    # 이미 쌓인 outcome 으로 초기값 채움
+    c.execute('''INSERT OR REPLACE INTO strategy_perf 
+                 SELECT h.strategy_name, COALESCE(h.market, ''), o.horizon, substr(h.scan_date, 1, 7),
+                        COUNT(*), SUM(o.return_pct > 0), SUM(o.return_pct), SUM(o.return_pct * o.return_pct),
+                        datetime('now', 'localtime')
+                 FROM scan_outcomes o JOIN scan_history h ON h.id = o.history_id
+                 GROUP BY 1, 2, 3, 4''')
+    
+    # 마지막으로 분석한 하루치 결과만 덮어쓰던 테이블 (strategy_perf 로 대체)
+    c.execute("DROP TABLE IF EXISTS strategy_stats")
+
+def _m005_symbol_map(c):
+    # 한국 종목 코드 → yfinance 심볼(.KS/.KQ) 확정 매핑 (KRX 상장 목록 기준)
+    c.execute('''CREATE TABLE IF NOT EXISTS symbol_map 
+                 (code TEXT PRIMARY KEY, market TEXT, yf_symbol TEXT, name TEXT,
+                  updated_at TEXT) WITHOUT ROWID''')
+
+def _m006_daily_signals(c):
+    # 종목 x 날짜별 전략 발생 비트마스크 + 전략별 점수 (스캔 / 구간 백필 때마다 증분 저장)
+    # 비트 순서는 SIGNAL_KEYS (1 << i), 신호가 없는 종목은 행을 만들지 않음
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_signals 
+                 (date TEXT, code TEXT, name TEXT, market TEXT, mask INTEGER,
+                  score_elite REAL, score_dbb REAL, score_bnf REAL, score_ai REAL,
+                  score_turtle REAL, score_buffett REAL, score_vwap REAL,
+                  PRIMARY KEY (date, code)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_signals_code ON daily_signals (code, date)")
+    # 전략별 부분 인덱스: "WHERE mask & <비트> AND date ..." 조회가 해당 전략 행만 훑음
+    for i, key in enumerate(SIGNAL_KEYS):
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_daily_signals_{key} ON daily_signals (date, market) WHERE mask & {1 << i}")
+
+# (버전, 설명, 함수) - 새 단계는 항상 끝에 추가
+MIGRATIONS = [
+    (1, "base tables", _m001_base_tables),
+    (2, "query indexes", _m002_query_indexes),
+    (3, "daily bars and scan outcomes", _m003_bars_and_outcomes),
+    (4, "materialized strategy performance", _m004_strategy_perf),
+    (5, "exchange symbol map", _m005_symbol_map),
+    (6, "materialized daily signals", _m006_daily_signals),
+]
+
+def _migrate(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version 
+                    (version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)''')
+    current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    for version, desc, step in MIGRATIONS:
+        if version <= current: continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn.cursor())
+            conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, desc, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def get_schema_version():
+    with connection() as conn:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def init_db():
+    """스키마 준비 (프로세스당 1회). 이후 호출은 즉시 반환"""
+    global _schema_ready
+    if _schema_ready: return
+    with _schema_lock:
+        if _schema_ready: return
+        if not os.path.exists(DB_DIR):
+            os.makedirs(DB_DIR)
+        conn = _open_conn()
+        try: _migrate(conn)
+        finally: _close_conn(conn)
+        _schema_ready = True
+
+@contextmanager
+def connection():
+    """풀에서 읽기 전용 커넥션을 빌려주고 사용 후 반납"""
+    init_db()
+    try: conn = _pool.get_nowait()
+    except queue.Empty: conn = _open_conn(read_only=True)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction: conn.rollback()
+        try: _pool.put_nowait(conn)
+        except queue.Full: _close_conn(conn)
+
+# -----------------------------------------------------------------------------
+# 단일 writer 스레드: 큐에 쌓인 쓰기 작업을 모아 한 트랜잭션으로 커밋
+# 작업마다 SAVEPOINT 를 걸어 한 작업의 실패가 같은 배치의 다른 작업에 영향 주지 않음
+# 트랜잭션 밖에서 돌아야 하는 작업(VACUUM 등)은 배치에 섞지 않고 같은 스레드에서 단독 실행
+# → 쓰기 락을 잡는 커넥션이 항상 writer 하나뿐
+# 큐 항목: (fn, Future, 트랜잭션 안 실행 여부)
+# -----------------------------------------------------------------------------
+def _fail_batch(batch, err):
+    for _, fut, _ in batch:
+        if not fut.done(): fut.set_exception(err)
+
+def _run_batch(conn, batch):
+    results = []
+    try:
+        # busy_timeout 초과 ("database is locked") 도 배치 전체 실패로 처리 → 대기 중인 호출이 멈추지 않음
+        conn.execute("BEGIN IMMEDIATE")
+        for fn, fut, _ in batch:
+            conn.execute("SAVEPOINT job")
+            try:
+                res = fn(conn.cursor())
+                conn.execute("RELEASE job")
+                results.append((fut, res, None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+                results.append((fut, None, e))
+        conn.execute("COMMIT")
+    except Exception as e:
+        try:
+            if conn.in_transaction: conn.execute("ROLLBACK")
+        except sqlite3.Error: pass
+        _fail_batch(batch, e)
+        return
+    for fut, res, err in results:
+        if err is not None: fut.set_exception(err)
+        else: fut.set_result(res)
+
+def _run_single(conn, job):
+    fn, fut, _ = job
+    try: fut.set_result(fn(conn.cursor()))
+    except Exception as e: fut.set_exception(e)
+
+def _writer_loop():
+    conn = _open_conn()
+    running = True
+    pending = None  # 배치를 모으다 만난 단독 작업
+    while running:
+        job, pending = pending or _write_queue.get(), None
+        if job is None: break
+        if not job[2]:
+            _run_single(conn, job)
+            continue
+        batch = [job]
+        while len(batch) < WRITE_BATCH_MAX:
+            try: nxt = _write_queue.get_nowait()
+            except queue.Empty: break
+            if nxt is None:
+                running = False
+                break
+            if not nxt[2]:
+                pending = nxt
+                break
+            batch.append(nxt)
+        try:
+            _run_batch(conn, batch)
+        except Exception as e:
+            # 어떤 오류에도 스레드가 죽지 않도록 (죽으면 이후 모든 쓰기가 큐에 쌓이기만 함)
+            print(f"DB Writer Error: {e}")
+            _fail_batch(batch, e)
+    _close_conn(conn)
+
+def _ensure_writer():
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive(): return
+    with _writer_lock:
+        if _writer_thread is not None and _writer_thread.is_alive(): return
+        init_db()
+        _writer_thread = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+        _writer_thread.start()
+
+def submit_write(fn, in_transaction=True):
+    """
+    fn(cursor) 를 writer 스레드에 넘기고 Future 반환 (큐가 가득 차면 대기)
+    in_transaction=False: 배치 트랜잭션 밖에서 단독 실행 (VACUUM 처럼 트랜잭션 안에서 못 도는 작업)
+    """
+    _ensure_writer()
+    fut = Future()
+    _write_queue.put((fn, fut, in_transaction))
+    return fut
+
+def _write(fn, wait=True, in_transaction=True):
+    fut = submit_write(fn, in_transaction)
+    if not wait: return fut
+    # writer 스레드가 죽었으면 무한 대기 대신 오류
+    while True:
+        try: return fut.result(timeout=WRITE_WAIT_POLL_SEC)
+        except FutureTimeout:
+            writer = _writer_thread
+            if writer is None or not writer.is_alive():
+                if fut.done(): return fut.result()
+                raise RuntimeError("DB writer thread is not running")
+
+def close_all():
+    """writer 큐를 비우고 풀 및 열린 커넥션 전부 정리 (프로세스 종료 시 자동 호출)"""
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is not None and _writer_thread.is_alive():
+            _write_queue.put(None)
+            _writer_thread.join(timeout=10)
+        _writer_thread = None
+    while True:
+        try: _pool.get_nowait()
+        except queue.Empty: break
+    with _conn_lock:
+        conns = list(_open_conns)
+        _open_conns.clear()
+    for conn in conns:
+        try: conn.close()
+        except sqlite3.Error: pass
+
+atexit.register(close_all)
 
 def hash_pw(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def sign_up(username, password, email):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT count(*) FROM users")
-    user_count = c.fetchone()[0]
-    role = 'admin' if user_count == 0 else 'user'
-    
-    try:
+    def job(c):
+        c.execute("SELECT count(*) FROM users")
+        user_count = c.fetchone()[0]
+        role = 'admin' if user_count == 0 else 'user'
         c.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)", 
                   (username, hash_pw(password), email, role))
-        conn.commit()
+    try:
+        _write(job)
         return True
     except sqlite3.IntegrityError:
         return False
 
 def check_login(username, password):
-    conn = init_db()
-    c = conn.cursor()
-    hashed = hash_pw(password)
-    c.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, hashed))
-    return c.fetchone() is not None
+    with connection() as conn:
+        c = conn.cursor()
+        hashed = hash_pw(password)
+        c.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, hashed))
+        return c.fetchone() is not None
 
 def get_user_role(username):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT role FROM users WHERE username = ?", (username,))
-    result = c.fetchone()
-    return result[0] if result else 'user'
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT role FROM users WHERE username = ?", (username,))
+        result = c.fetchone()
+        return result[0] if result else 'user'
 
 def verify_user_email(username, email):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username = ? AND email = ?", (username, email))
-    return c.fetchone() is not None
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM users WHERE username = ? AND email = ?", (username, email))
+        return c.fetchone() is not None
 
 def update_password(username, new_password):
-    conn = init_db()
-    c = conn.cursor()
     hashed = hash_pw(new_password)
-    c.execute("UPDATE users SET password = ? WHERE username = ?", (hashed, username))
-    conn.commit()
+    _write(lambda c: c.execute("UPDATE users SET password = ? WHERE username = ?", (hashed, username)))
 
 def get_all_users():
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT username, email, role FROM users")
-    return c.fetchall()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT username, email, role FROM users")
+        return c.fetchall()
 
 def delete_user(target_username):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("DELETE FROM users WHERE username = ?", (target_username,))
-    c.execute("DELETE FROM favorites WHERE username = ?", (target_username,))
-    conn.commit()
+    def job(c):
+        c.execute("DELETE FROM users WHERE username = ?", (target_username,))
+        c.execute("DELETE FROM favorites WHERE username = ?", (target_username,))
+    _write(job)
 
 # --- 관심종목 기능 ---
 def get_favorites(username):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT code, added_date, initial_price, strategies, name FROM favorites WHERE username = ?", (username,))
-    return c.fetchall()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT code, added_date, initial_price, strategies, name FROM favorites WHERE username = ?", (username,))
+        return c.fetchall()
+
+def get_all_favorite_codes():
+    """전체 사용자 관심종목의 중복 제거된 코드 목록 (idx_favorites_code 사용)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT DISTINCT code FROM favorites")
+        return [row[0] for row in c.fetchall()]
 
 def add_favorite(username, code, name="", price=0.0, strategies="Manual"):
-    conn = init_db()
-    c = conn.cursor()
     today = datetime.now().strftime("%Y-%m-%d")
-    c.execute('''INSERT OR IGNORE INTO favorites 
-                 (username, code, added_date, initial_price, strategies, name) 
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (username, code, today, price, strategies, name))
-    conn.commit()
+    _write(lambda c: c.execute('''INSERT OR IGNORE INTO favorites 
+                                  (username, code, added_date, initial_price, strategies, name) 
+                                  VALUES (?, ?, ?, ?, ?, ?)''', 
+                               (username, code, today, price, strategies, name)))
 
 def remove_favorite(username, code):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("DELETE FROM favorites WHERE username = ? AND code = ?", (username, code))
-    conn.commit()
+    _write(lambda c: c.execute("DELETE FROM favorites WHERE username = ? AND code = ?", (username, code)))
 
 def update_favorite_price(username, code, new_price):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("UPDATE favorites SET initial_price = ? WHERE username = ? AND code = ?", 
-              (new_price, username, code))
-    conn.commit()
+    _write(lambda c: c.execute("UPDATE favorites SET initial_price = ? WHERE username = ? AND code = ?", 
+                               (new_price, username, code)))
 
 def update_favorite_date(username, code, new_date_str):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("UPDATE favorites SET added_date = ? WHERE username = ? AND code = ?", 
-              (new_date_str, username, code))
-    conn.commit()
+    _write(lambda c: c.execute("UPDATE favorites SET added_date = ? WHERE username = ? AND code = ?", 
+                               (new_date_str, username, code)))
+
+# [최적화] 편집 결과 일괄 반영: 삭제/매수가/등록일 변경을 1개 작업(1 트랜잭션)으로
+def apply_favorite_changes(username, deletes=(), price_updates=(), date_updates=()):
+    """
+    deletes: [code, ...] / price_updates: [(code, price), ...] / date_updates: [(code, 'YYYY-MM-DD'), ...]
+    Returns: 반영된 행 수
+    """
+    def job(c):
+        before = c.connection.total_changes
+        c.executemany("DELETE FROM favorites WHERE username = ? AND code = ?",
+                      [(username, code) for code in deletes])
+        c.executemany("UPDATE favorites SET initial_price = ? WHERE username = ? AND code = ?",
+                      [(price, username, code) for code, price in price_updates])
+        c.executemany("UPDATE favorites SET added_date = ? WHERE username = ? AND code = ?",
+                      [(d, username, code) for code, d in date_updates])
+        return c.connection.total_changes - before
+    if not (deletes or price_updates or date_updates): return 0
+    return _write(job)
 
 # --- 성과 추적 (History) 기능 ---
 def save_scan_result(scan_date, strategy_name, code, name, entry_price, market):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute('''INSERT OR IGNORE INTO scan_history 
-                 (scan_date, strategy_name, code, name, entry_price, market) 
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (scan_date, strategy_name, code, name, entry_price, market))
-    conn.commit()
+    _write(lambda c: c.execute('''INSERT OR IGNORE INTO scan_history 
+                                  (scan_date, strategy_name, code, name, entry_price, market) 
+                                  VALUES (?, ?, ?, ?, ?, ?)''', 
+                               (scan_date, strategy_name, code, name, entry_price, market)))
+
+# [최적화] 스캔 결과 일괄 저장: 1 트랜잭션 + executemany (UNIQUE 중복은 무시)
+def save_scan_results(records, wait=True):
+    """
+    records: [(scan_date, strategy_name, code, name, entry_price, market), ...]
+    Returns: 새로 저장된 행 수 (wait=False 면 Future)
+    """
+    if not records: return 0
+    def job(c):
+        before = c.connection.total_changes
+        c.executemany('''INSERT OR IGNORE INTO scan_history 
+                         (scan_date, strategy_name, code, name, entry_price, market) 
+                         VALUES (?, ?, ?, ?, ?, ?)''', records)
+        return c.connection.total_changes - before
+    return _write(job, wait)
 
 def get_scan_history_dates():
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT DISTINCT scan_date FROM scan_history ORDER BY scan_date DESC")
-    return [row[0] for row in c.fetchall()]
+    with connection() as conn:
+        c = conn.cursor()
+        # [최적화] DISTINCT 전체 스캔 대신 인덱스 skip-scan (날짜 수만큼만 탐색)
+        c.execute('''WITH RECURSIVE d(scan_date) AS (
+                         SELECT MAX(scan_date) FROM scan_history
+                         UNION ALL
+                         SELECT (SELECT MAX(scan_date) FROM scan_history WHERE scan_date < d.scan_date)
+                         FROM d WHERE d.scan_date IS NOT NULL)
+                     SELECT scan_date FROM d WHERE scan_date IS NOT NULL''')
+        return [row[0] for row in c.fetchall()]
 
 def get_history_by_date(target_date):
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT strategy_name, code, name, entry_price, market FROM scan_history WHERE scan_date = ?", (target_date,))
-    return c.fetchall()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT strategy_name, code, name, entry_price, market FROM scan_history WHERE scan_date = ?", (target_date,))
+        return c.fetchall()
 
-# [신규] 전역 승률 통계 관리
-def update_strategy_stats(stats_dict):
+def _codes_filter(codes):
+    """종목 집합 조건 (종목 수가 많아도 바인딩 변수 1개: JSON 배열 → json_each)"""
+    if codes is None: return "", []
+    return " AND code IN (SELECT value FROM json_each(?))", [json.dumps([str(c) for c in codes])]
+
+def get_previous_scan_date(scan_date, codes=None):
+    """codes: 이번에 스캔한 종목 집합 - 주어지면 그 종목들이 기록된 직전 날짜"""
+    cond, params = _codes_filter(codes)
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(f"SELECT MAX(scan_date) FROM scan_history WHERE scan_date < ?{cond}", [scan_date] + params)
+        return c.fetchone()[0]
+
+def get_scan_diff(scan_date, prev_date, strategies=None, codes=None):
     """
-    stats_dict: {'전략명': {'win': 10, 'total': 20}, ...}
+    두 스캔 날짜의 (종목, 전략) 집합 차 (UNIQUE(scan_date, strategy_name, code) 인덱스 범위 조회 + EXCEPT)
+    strategies: 비교할 전략 이름 목록 (없으면 전체)
+    codes: 이번에 스캔한 종목 집합 - EXCEPT 양쪽을 모두 이 범위로 제한
+           (다른 시장 / 같은 날 앞선 스캔의 기록이 신규 / 이탈로 잡히지 않도록)
+    Returns: (신규 [(code, name, market, strategy_name)], 이탈 [(code, name, market, strategy_name, entry_price)])
     """
-    conn = init_db()
-    c = conn.cursor()
-    today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    for strat, data in stats_dict.items():
-        win_rate = (data['win'] / data['total']) * 100 if data['total'] > 0 else 0
-        c.execute('''INSERT OR REPLACE INTO strategy_stats 
-                     (strategy_name, win_rate, total_count, last_updated)
-                     VALUES (?, ?, ?, ?)''', 
-                  (strat, win_rate, data['total'], today))
-    conn.commit()
-
-def get_strategy_stats():
-    """Returns: {'전략명': win_rate, ...}"""
-    conn = init_db()
-    c = conn.cursor()
-    c.execute("SELECT strategy_name, win_rate FROM strategy_stats")
-    return {row[0]: row[1] for row in c.fetchall()}
\ No newline at end of file
+    where = "scan_date = ?"
+    params = []
+    if strategies:
+        where += f" AND strategy_name IN ({','.join('?' * len(strategies))})"
+        params = list(strategies)
+    cond, code_params = _codes_filter(codes)
+    where += cond
+    params += code_params
+    diff_sql = f'''SELECT h.code, h.name, h.market, h.strategy_name{{extra}}
+                    FROM scan_history h JOIN
+                         (SELECT code, strategy_name FROM scan_history WHERE {where}
+                          EXCEPT
+                          SELECT code, strategy_name FROM scan_history WHERE {where}) d
+                      ON h.code = d.code AND h.strategy_name = d.strategy_name
+                    WHERE h.scan_date = ?
+                    ORDER BY h.strategy_name, h.code'''
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(diff_sql.format(extra=""), [scan_date] + params + [prev_date] + params + [scan_date])
+        new = c.fetchall()
+        c.execute(diff_sql.format(extra=", h.entry_price"), [prev_date] + params + [scan_date] + params + [prev_date])
+        dropped = c.fetchall()
+    return new, dropped
+
+# --- 일봉 저장소 (Bar Store) ---
+def save_bars(code, rows):
+    """rows: [(date 'YYYY-MM-DD', open, high, low, close, volume), ...] - 같은 날짜는 덮어씀"""
+    if not rows: return
+    records = [(code,) + tuple(r) for r in rows]
+    _write(lambda c: c.executemany('''INSERT OR REPLACE INTO daily_bars 
+                                      (code, date, open, high, low, close, volume) 
+                                      VALUES (?, ?, ?, ?, ?, ?, ?)''', records))
+
+def get_bars(code, start=None, end=None):
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT date, open, high, low, close, volume FROM daily_bars 
+                     WHERE code = ? AND date >= ? AND date <= ? ORDER BY date''',
+                  (code, start or "0000-00-00", end or "9999-99-99"))
+        return c.fetchall()
+
+def get_close_panel_rows(codes, start=None, end=None):
+    """여러 종목 종가를 한 번에: [(code, date, close), ...] (종목, 날짜 순)"""
+    codes = list(codes)
+    if not codes: return []
+    marks = ",".join("?" * len(codes))
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(f'''SELECT code, date, close FROM daily_bars 
+                     WHERE code IN ({marks}) AND date >= ? AND date <= ? ORDER BY code, date''',
+                  (*codes, start or "0000-00-00", end or "9999-99-99"))
+        return c.fetchall()
+
+def get_bar_panel_rows(codes, start=None, end=None):
+    """여러 종목 OHLCV 를 한 번에: [(code, date, open, high, low, close, volume), ...]"""
+    codes = list(codes)
+    if not codes: return []
+    marks = ",".join("?" * len(codes))
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(f'''SELECT code, date, open, high, low, close, volume FROM daily_bars 
+                     WHERE code IN ({marks}) AND date >= ? AND date <= ? ORDER BY code, date''',
+                  (*codes, start or "0000-00-00", end or "9999-99-99"))
+        return c.fetchall()
+
+def get_bar_codes():
+    """일봉 저장소에 있는 종목 코드 (PK 선두 컬럼 skip-scan)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''WITH RECURSIVE codes(code) AS (
+                         SELECT MIN(code) FROM daily_bars
+                         UNION ALL
+                         SELECT (SELECT MIN(code) FROM daily_bars WHERE code > codes.code) FROM codes
+                         WHERE codes.code IS NOT NULL)
+                     SELECT code FROM codes WHERE code IS NOT NULL''')
+        return [row[0] for row in c.fetchall()]
+
+def get_bar_date_range(code):
+    """Returns: (첫 날짜, 마지막 날짜) 또는 (None, None)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT MIN(date), MAX(date) FROM daily_bars WHERE code = ?", (code,))
+        return c.fetchone()
+
+# --- 선행 수익률 (Outcome) ---
+def get_pending_outcome_rows():
+    """아직 모든 호라이즌이 채워지지 않은 scan_history 행: [(id, scan_date, code, entry_price), ...]"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT id, scan_date, code, entry_price FROM scan_history 
+                     WHERE outcome_complete = 0 ORDER BY code''')
+        return c.fetchall()
+
+def count_pending_outcomes(start_date, end_date):
+    """기간 안에서 아직 모든 호라이즌이 채워지지 않은 행 수 (미완료 부분 인덱스 사용)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM scan_history WHERE outcome_complete = 0 AND scan_date >= ? AND scan_date <= ?",
+                  (start_date, end_date))
+        return c.fetchone()[0]
+
+def save_outcomes(records, completed_ids):
+    """
+    records: [(history_id, horizon, exit_date, exit_price, return_pct), ...]
+    completed_ids: 모든 호라이즌이 채워진 history_id 목록
+    Returns: 새로 저장된 outcome 행 수
+    """
+    if not records and not completed_ids: return 0
+    def job(c):
+        new_rows = []
+        for rec in records:
+            c.execute('''INSERT OR IGNORE INTO scan_outcomes 
+                         (history_id, horizon, exit_date, exit_price, return_pct) 
+                         VALUES (?, ?, ?, ?, ?)''', rec)
+            if c.rowcount == 1: new_rows.append(rec)
+        c.executemany("UPDATE scan_history SET outcome_complete = 1 WHERE id = ?",
+                      [(i,) for i in completed_ids])
+        _accumulate_strategy_perf(c, new_rows)
+        return len(new_rows)
+    return _write(job)
+
+def _accumulate_strategy_perf(c, new_rows):
+    """새로 저장된 outcome 만큼 strategy_perf 누적 합계를 증분 (같은 트랜잭션)"""
+    if not new_rows: return
+    ids = sorted({r[0] for r in new_rows})
+    meta = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        c.execute(f"SELECT id, strategy_name, COALESCE(market, ''), substr(scan_date, 1, 7) FROM scan_history "
+                  f"WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        for hid, strat, mkt, period in c.fetchall():
+            meta[hid] = (strat, mkt, period)
+
+    deltas = {}
+    for hid, horizon, _, _, ret in new_rows:
+        if hid not in meta: continue
+        key = meta[hid] + (horizon,)
+        d = deltas.setdefault(key, [0, 0, 0.0, 0.0])
+        d[0] += 1
+        d[1] += 1 if ret > 0 else 0
+        d[2] += ret
+        d[3] += ret * ret
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c.executemany('''INSERT INTO strategy_perf 
+                     (strategy_name, market, period, horizon, n, wins, sum_ret, sum_ret_sq, last_updated)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (strategy_name, market, horizon, period) DO UPDATE SET
+                         n = n + excluded.n, wins = wins + excluded.wins,
+                         sum_ret = sum_ret + excluded.sum_ret, sum_ret_sq = sum_ret_sq + excluded.sum_ret_sq,
+                         last_updated = excluded.last_updated''',
+                  [key + tuple(d) + (now,) for key, d in deltas.items()])
+
+def get_outcomes_by_date(target_date, horizon):
+    """해당 날짜 포착 종목 + 지정 호라이즌 결과 (미도래는 None)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT h.strategy_name, h.code, h.name, h.entry_price, h.market,
+                            o.exit_date, o.exit_price, o.return_pct
+                     FROM scan_history h
+                     LEFT JOIN scan_outcomes o ON o.history_id = h.id AND o.horizon = ?
+                     WHERE h.scan_date = ?''', (horizon, target_date))
+        return c.fetchall()
+
+def get_outcome_daily_agg(start_date, end_date):
+    """
+    포착일 x 전략 x 호라이즌 집계 (GROUP BY 1회)
+    Returns: [(scan_date, strategy_name, horizon, 건수, 승수, 수익률 합), ...]
+    """
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT h.scan_date, h.strategy_name, o.horizon,
+                            COUNT(*), SUM(o.return_pct > 0), SUM(o.return_pct)
+                     FROM scan_outcomes o JOIN scan_history h ON h.id = o.history_id
+                     WHERE h.scan_date >= ? AND h.scan_date <= ?
+                     GROUP BY h.scan_date, h.strategy_name, o.horizon''', (start_date, end_date))
+        return c.fetchall()
+
+def get_pick_counts(start_date, end_date):
+    """Returns: [(scan_date, strategy_name, 포착 수), ...]"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute('''SELECT scan_date, strategy_name, COUNT(*) FROM scan_history 
+                     WHERE scan_date >= ? AND scan_date <= ? 
+                     GROUP BY scan_date, strategy_name''', (start_date, end_date))
+        return c.fetchall()
+
+# --- 일별 신호 (daily_signals) ---
+def save_daily_signals(rows, wait=True):
+    """
+    rows: [(date, code, name, market, mask, score_<SIGNAL_KEYS 순서> ...), ...]
+    같은 (날짜, 종목) 은 최신 스캔 결과로 덮어씀
+    """
+    if not rows: return 0
+    cols = ", ".join(f"score_{k}" for k in SIGNAL_KEYS)
+    marks = ", ".join("?" * (5 + len(SIGNAL_KEYS)))
+    def job(c):
+        c.executemany(f"INSERT OR REPLACE INTO daily_signals (date, code, name, market, mask, {cols}) VALUES ({marks})", rows)
+        return len(rows)
+    return _write(job, wait)
+
+def query_signal_counts(strategy_key, start_date, end_date, market=None, min_count=1):
+    """
+    기간 안에 strategy_key 신호가 min_count 번 이상 발생한 종목
+    Returns: [(code, name, market, 발생 수, 첫 발생일, 마지막 발생일, 최고 점수), ...] (발생 수 많은 순)
+    """
+    bit = 1 << SIGNAL_KEYS.index(strategy_key)
+    # 비트는 부분 인덱스 조건과 같은 리터럴이어야 인덱스를 탐
+    sql = f'''SELECT code, MAX(name), MAX(market), COUNT(*), MIN(date), MAX(date), MAX(score_{strategy_key})
+              FROM daily_signals WHERE mask & {bit} AND date >= ? AND date <= ?'''
+    params = [start_date, end_date]
+    if market:
+        sql += " AND market = ?"
+        params.append(market)
+    sql += " GROUP BY code HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC, MAX(date) DESC"
+    params.append(int(min_count))
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(sql, params)
+        return c.fetchall()
+
+def get_signal_date_range():
+    """Returns: (첫 날짜, 마지막 날짜) - 저장된 신호가 없으면 (None, None)"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT MIN(date), MAX(date) FROM daily_signals")
+        return c.fetchone()
+
+# --- 거래소 심볼 매핑 ---
+def get_symbol_map():
+    """Returns: {code: (market, yf_symbol, name)}"""
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT code, market, yf_symbol, name FROM symbol_map")
+        return {row[0]: (row[1], row[2], row[3]) for row in c.fetchall()}
+
+def save_symbol_map(rows):
+    """rows: [(code, market, yf_symbol, name), ...] - 바뀐 종목만 넘김"""
+    if not rows: return
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = [tuple(r) + (now,) for r in rows]
+    _write(lambda c: c.executemany('''INSERT OR REPLACE INTO symbol_map 
+                                      (code, market, yf_symbol, name, updated_at) 
+                                      VALUES (?, ?, ?, ?, ?)''', records))
+
+# --- 보관(Archive) 지원 ---
+def get_history_with_outcomes(start_date, end_date, horizons, strategy=None, code=None):
+    """
+    scan_history + 호라이즌별 결과를 가로로 펼친 행 (보관 파일과 같은 컬럼 순서)
+    Returns: (컬럼 목록, 행 목록)
+    """
+    cols = ["id", "scan_date", "strategy_name", "code", "name", "entry_price", "market"]
+    pivots = []
+    for h in horizons:
+        pivots.append(f"MAX(CASE WHEN o.horizon = {int(h)} THEN o.return_pct END)")
+        pivots.append(f"MAX(CASE WHEN o.horizon = {int(h)} THEN o.exit_price END)")
+        pivots.append(f"MAX(CASE WHEN o.horizon = {int(h)} THEN o.exit_date END)")
+        cols += [f"ret_{h}", f"exit_price_{h}", f"exit_date_{h}"]
+    sql = f'''SELECT h.id, h.scan_date, h.strategy_name, h.code, h.name, h.entry_price, h.market,
+                      {", ".join(pivots)}
+               FROM scan_history h LEFT JOIN scan_outcomes o ON o.history_id = h.id
+               WHERE h.scan_date >= ? AND h.scan_date <= ?'''
+    params = [start_date, end_date]
+    if strategy:
+        sql += " AND h.strategy_name = ?"
+        params.append(strategy)
+    if code:
+        sql += " AND h.code = ?"
+        params.append(code)
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute(sql + " GROUP BY h.id ORDER BY h.scan_date, h.id", params)
+        return cols, c.fetchall()
+
+def delete_history_range(start_date, end_date):
+    """보관 완료된 구간의 scan_history / scan_outcomes 삭제 (strategy_perf 누적값은 유지)"""
+    def job(c):
+        c.execute('''DELETE FROM scan_outcomes WHERE history_id IN 
+                     (SELECT id FROM scan_history WHERE scan_date >= ? AND scan_date <= ?)''',
+                  (start_date, end_date))
+        c.execute("DELETE FROM scan_history WHERE scan_date >= ? AND scan_date <= ?", (start_date, end_date))
+        return c.rowcount
+    return _write(job)
+
+def vacuum():
+    """
+    삭제로 생긴 빈 페이지 반환
+    writer 스레드에서 단독 실행 (별도 커넥션이면 writer 와 쓰기 락을 다툼), 락을 못 잡으면 OperationalError
+    """
+    _write(lambda c: c.execute("VACUUM"), in_transaction=False)
+
+# --- 전략별 누적 성과 (strategy_perf) ---
+def get_strategy_stats(horizon=5, market=None):
+    """Returns: {'전략명': win_rate, ...} - 전체 기간 누적 (선택 시 시장 한정)"""
+    with connection() as conn:
+        c = conn.cursor()
+        sql = "SELECT strategy_name, SUM(wins) * 100.0 / SUM(n) FROM strategy_perf WHERE horizon = ?"
+        params = [horizon]
+        if market:
+            sql += " AND market = ?"
+            params.append(market)
+        c.execute(sql + " GROUP BY strategy_name HAVING SUM(n) > 0", params)
+        return {row[0]: row[1] for row in c.fetchall()}
+
+def get_strategy_perf_summary(market=None):
+    """Returns: [(전략, 호라이즌, 건수, 승률, 평균수익률, 표준편차), ...]"""
+    with connection() as conn:
+        c = conn.cursor()
+        sql = '''SELECT strategy_name, horizon, SUM(n), SUM(wins), SUM(sum_ret), SUM(sum_ret_sq)
+                   FROM strategy_perf'''
+        params = []
+        if market:
+            sql += " WHERE market = ?"
+            params.append(market)
+        c.execute(sql + " GROUP BY strategy_name, horizon ORDER BY strategy_name, horizon", params)
+        rows = []
+        for strat, horizon, n, wins, s1, s2 in c.fetchall():
+            if not n: continue
+            mean = s1 / n
+            var = max(0.0, s2 / n - mean * mean)
+            rows.append((strat, horizon, n, wins * 100.0 / n, mean, var ** 0.5))
+        return rows
@@ -0,0 +1,194 @@
+import os
+import threading
+import pandas as pd
+from datetime import datetime
+import database as db
+import outcomes
+
+# -----------------------------------------------------------------------------
+# scan_history 월 단위 파티션 보관 (Parquet) + 라이브/보관 통합 조회
+# - 최근 HOT_MONTHS 개월은 SQLite(라이브), 그 이전 달은 month=YYYY-MM/ 파티션으로 이동
+# - strategy_perf 누적 통계는 DB에 그대로 남음
+# - 결과가 모두 채워진 달만 보관 (만기 전 호라이즌이 보관 후 사라지지 않도록)
+# - 같은 키가 라이브/보관 양쪽에 있으면 (보관된 달에 백필로 다시 저장 등) 키 단위로 병합
+# -----------------------------------------------------------------------------
+ARCHIVE_SUBDIR = os.path.join("archive", "scan_history")
+HOT_MONTHS = 6
+KEY_COLUMNS = ["scan_date", "strategy_name", "code"]
+
+_dates_lock = threading.Lock()
+_dates_cache = {}  # month -> (파일 mtime, [scan_date, ...])
+
+def _archive_dir():
+    return os.path.join(db.DB_DIR, ARCHIVE_SUBDIR)
+
+def _month_path(month):
+    return os.path.join(_archive_dir(), f"month={month}", "part.parquet")
+
+def _month_bounds(month):
+    return f"{month}-01", f"{month}-31"
+
+def _shift_month(month, delta):
+    y, m = int(month[:4]), int(month[5:7]) - 1 + delta
+    return f"{y + m // 12:04d}-{m % 12 + 1:02d}"
+
+def get_archived_months():
+    archive_dir = _archive_dir()
+    if not os.path.isdir(archive_dir): return []
+    months = []
+    for d in os.listdir(archive_dir):
+        if d.startswith("month=") and os.path.exists(os.path.join(archive_dir, d, "part.parquet")):
+            months.append(d[len("month="):])
+    return sorted(months)
+
+def _normalize(df):
+    """달마다 전부 NULL 인 컬럼이 있어도 파티션 간 스키마가 같도록 타입 고정"""
+    for col in df.columns:
+        if col == "id": df[col] = df[col].astype("int64")
+        elif col == "entry_price" or col.startswith(("ret_", "exit_price_")): df[col] = df[col].astype("float64")
+        elif col.startswith("exit_date_"): df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+def _read_month(month, columns=None):
+    return pd.read_parquet(_month_path(month), columns=columns)
+
+def _write_month(month, df):
+    path = _month_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        df = pd.concat([_read_month(month), df], ignore_index=True)
+        df = df.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+    df = _normalize(df.sort_values(["scan_date", "strategy_name", "code"]).reset_index(drop=True))
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False, compression="zstd")
+    os.replace(tmp, path)
+
+def archive_old_months(keep_months=HOT_MONTHS):
+    """
+    keep_months 개월보다 오래된 달을 Parquet 파티션으로 옮기고 라이브 DB에서 삭제
+    아직 결과가 다 채워지지 않은 행(outcome_complete=0)이 있는 달은 건너뜀
+    Returns: {month: 행 수}
+    """
+    cutoff = _shift_month(datetime.now().strftime("%Y-%m"), -keep_months + 1)
+    live_months = sorted({d[:7] for d in db.get_scan_history_dates()})
+    moved = {}
+    for month in live_months:
+        if month >= cutoff: break
+        start, end = _month_bounds(month)
+        if db.count_pending_outcomes(start, end): continue
+        cols, rows = db.get_history_with_outcomes(start, end, outcomes.HORIZONS)
+        if not rows: continue
+        _write_month(month, pd.DataFrame(rows, columns=cols))
+        # 파일 교체가 끝난 뒤에만 삭제 → 중간에 실패해도 데이터는 최소 한쪽에 존재
+        db.delete_history_range(start, end)
+        moved[month] = len(rows)
+    return moved
+
+# -----------------------------------------------------------------------------
+# 통합 조회 계층
+# -----------------------------------------------------------------------------
+def _merge_by_key(frames, keys=KEY_COLUMNS):
+    """라이브(앞쪽) 우선으로 키 단위 병합, 비어 있는 결과 컬럼은 다른 쪽 값으로 채움"""
+    frames = [f for f in frames if not f.empty]
+    if not frames: return None
+    df = pd.concat(frames, ignore_index=True)
+    if not df.duplicated(subset=keys).any(): return df
+    return df.groupby(keys, sort=False, as_index=False, dropna=False).first()[df.columns]
+
+def _archived_dates(month):
+    path = _month_path(month)
+    mtime = os.path.getmtime(path)
+    with _dates_lock:
+        cached = _dates_cache.get(month)
+        if cached and cached[0] == mtime: return cached[1]
+    dates = sorted(_read_month(month, columns=["scan_date"])["scan_date"].unique().tolist())
+    with _dates_lock:
+        _dates_cache[month] = (mtime, dates)
+    return dates
+
+def get_scan_dates():
+    """라이브 + 보관 파티션의 스캔 날짜 (최신순)"""
+    dates = set(db.get_scan_history_dates())
+    for month in get_archived_months():
+        dates.update(_archived_dates(month))
+    return sorted(dates, reverse=True)
+
+def query_history(start_date=None, end_date=None, strategy=None, code=None):
+    """
+    기간/전략/종목으로 scan_history + 호라이즌별 결과 조회 (라이브와 보관 파티션을 합침)
+    Returns: DataFrame (id, scan_date, strategy_name, code, name, entry_price, market, ret_N, exit_price_N, exit_date_N ...)
+    """
+    start_date = start_date or "0000-00-00"
+    end_date = end_date or "9999-99-99"
+    cols, rows = db.get_history_with_outcomes(start_date, end_date, outcomes.HORIZONS, strategy, code)
+    frames = [pd.DataFrame(rows, columns=cols)]
+
+    # 파티션 프루닝: 기간에 걸치는 달만 읽음
+    for month in get_archived_months():
+        if month < start_date[:7] or month > end_date[:7]: continue
+        df = _read_month(month)
+        mask = (df["scan_date"] >= start_date) & (df["scan_date"] <= end_date)
+        if strategy: mask &= df["strategy_name"] == strategy
+        if code: mask &= df["code"] == code
+        frames.append(df[mask])
+
+    df = _merge_by_key([_normalize(f) for f in frames])
+    if df is None: return _normalize(pd.DataFrame(columns=cols))
+    return _normalize(df).sort_values(["scan_date", "id"]).reset_index(drop=True)
+
+def get_outcomes_by_date(target_date, horizon):
+    """db.get_outcomes_by_date 와 같은 형식, 보관된 날짜도 조회"""
+    rows = db.get_outcomes_by_date(target_date, horizon)
+    if target_date[:7] not in get_archived_months(): return rows
+    cols = ["strategy_name", "code", "name", "entry_price", "market", "exit_date", "exit_price", "ret"]
+    df = _read_month(target_date[:7])
+    df = df[df["scan_date"] == target_date]
+    df = df[cols[:5] + [f"exit_date_{horizon}", f"exit_price_{horizon}", f"ret_{horizon}"]]
+    df.columns = cols
+    df = _merge_by_key([pd.DataFrame(rows, columns=cols), df], keys=["strategy_name", "code"])
+    if df is None: return []
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+def backcheck_timeseries(start_date=None, end_date=None):
+    """
+    전체 기간 백체크: 포착일 x 전략 x 호라이즌별 포착 수 / 결과 건수 / 승률 / 평균수익률
+    보관되지 않은 달은 SQL 집계, 보관된 달은 라이브 행과 보관 행을 키 단위로 병합한 뒤 벡터 연산 집계
+    Returns: DataFrame (scan_date, strategy_name, horizon, hits, n, wins, win_rate, avg_ret)
+    """
+    start_date = start_date or "0000-00-00"
+    end_date = end_date or "9999-99-99"
+    keys = ["scan_date", "strategy_name", "horizon"]
+    archived = [m for m in get_archived_months() if start_date[:7] <= m <= end_date[:7]]
+    agg = pd.DataFrame(db.get_outcome_daily_agg(start_date, end_date), columns=keys + ["n", "wins", "sum_ret"])
+    hits = pd.DataFrame(db.get_pick_counts(start_date, end_date), columns=["scan_date", "strategy_name", "hits"])
+    agg = [agg[~agg["scan_date"].str[:7].isin(archived)]]
+    hits = [hits[~hits["scan_date"].str[:7].isin(archived)]]
+
+    ret_cols = [f"ret_{h}" for h in outcomes.HORIZONS]
+    for month in archived:
+        m_start, m_end = max(start_date, _month_bounds(month)[0]), min(end_date, _month_bounds(month)[1])
+        live_cols, live_rows = db.get_history_with_outcomes(m_start, m_end, outcomes.HORIZONS)
+        live = _normalize(pd.DataFrame(live_rows, columns=live_cols)[KEY_COLUMNS + ret_cols])
+        df = _read_month(month, columns=KEY_COLUMNS + ret_cols)
+        df = df[(df["scan_date"] >= m_start) & (df["scan_date"] <= m_end)]
+        df = _merge_by_key([live, df])
+        if df is None: continue
+        df = df[["scan_date", "strategy_name"] + ret_cols]
+        hits.append(df.groupby(["scan_date", "strategy_name"]).size().rename("hits").reset_index())
+        long_df = df.melt(id_vars=["scan_date", "strategy_name"], var_name="horizon", value_name="ret").dropna(subset=["ret"])
+        long_df["horizon"] = long_df["horizon"].str[len("ret_"):].astype(int)
+        long_df["win"] = long_df["ret"] > 0
+        agg.append(long_df.groupby(keys).agg(n=("ret", "size"), wins=("win", "sum"), sum_ret=("ret", "sum")).reset_index())
+
+    agg = pd.concat([a for a in agg if not a.empty] or [agg[0]], ignore_index=True)
+    hits = pd.concat([h for h in hits if not h.empty] or [hits[0]], ignore_index=True)
+    # 아직 만기 전인 호라이즌도 행이 있도록 (포착일, 전략) x 호라이즌 격자에 결과를 붙임
+    grid = hits.merge(pd.DataFrame({"horizon": list(outcomes.HORIZONS)}), how="cross")
+    agg["horizon"] = agg["horizon"].astype(int)
+    out = grid.merge(agg, on=keys, how="left")
+    out[["n", "wins", "sum_ret"]] = out[["n", "wins", "sum_ret"]].fillna(0)
+    n = out["n"].where(out["n"] > 0)
+    out["win_rate"] = out["wins"] / n * 100
+    out["avg_ret"] = out["sum_ret"] / n
+    return out.sort_values(keys).reset_index(drop=True)
@@ -0,0 +1,116 @@
+import threading
+import time
+import numpy as np
+from datetime import datetime, timedelta
+import database as db
+import bar_store
+import quote_service as qs
+
+# 선행 수익률 호라이즌 (거래일)
+HORIZONS = (1, 5, 10, 20)
+
+_worker_lock = threading.Lock()
+_worker_started = False
+
+def evaluate_code(rows, bars, today_str, history_checked=False):
+    """
+    한 종목의 미완료 scan_history 행들을 일봉으로 한 번에 평가 (벡터 연산)
+    rows: [(id, scan_date, code, entry_price), ...]
+    history_checked: 포착일 이전 구간까지 네트워크로 조회한 결과인지
+        → 그래도 포착일 이전 봉이 없으면 (상장 전 날짜 등) 평가 불가로 완료 처리해 매번 전체 재조회하지 않음
+    진입가가 0 이하 / 비어 있는 행도 평가 불가 → 결과 없이 완료 처리
+    Returns: (outcome 레코드, 완료된 id 목록)
+    """
+    ids = np.array([r[0] for r in rows])
+    entries = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=float)
+    invalid = ~(entries > 0)
+    if bars.empty: return [], [int(i) for i in ids[invalid]]
+
+    bar_dates = bars.index.strftime('%Y-%m-%d').values
+    closes = bars['Close'].values
+    # 장중 미완성 봉은 결과로 쓰지 않음
+    n_final = int(np.searchsorted(bar_dates, today_str, side='left'))
+
+    scan_dates = np.array([r[1] for r in rows])
+
+    # 포착일(0일차) = 포착일 당일 또는 그 이전 마지막 거래일
+    base = np.searchsorted(bar_dates, scan_dates, side='right') - 1
+    horizons = np.array(HORIZONS)
+    exit_idx = base[:, None] + horizons[None, :]
+    matured = (base[:, None] >= 0) & (exit_idx < n_final) & (entries[:, None] > 0)
+
+    safe_idx = np.clip(exit_idx, 0, len(closes) - 1)
+    exit_prices = closes[safe_idx]
+    rets = (exit_prices - entries[:, None]) / np.where(entries > 0, entries, 1)[:, None] * 100
+
+    records = []
+    for r, c in zip(*np.nonzero(matured)):
+        records.append((int(ids[r]), int(horizons[c]), bar_dates[safe_idx[r, c]],
+                        float(exit_prices[r, c]), float(rets[r, c])))
+    done = matured.all(axis=1) | invalid
+    if history_checked: done |= base < 0
+    completed = [int(i) for i in ids[done]]
+    return records, completed
+
+def evaluate_pending_outcomes(refresh_bars=True):
+    """
+    새로 만기가 도래한 호라이즌만 채움.
+    종목별로 저장소 일봉을 1회 읽고(필요 시 증분 갱신) 해당 종목의 모든 미완료 행을 한 번에 평가
+    증분 갱신 기준은 달력 날짜가 아니라 시장별 '마지막 거래일' (주말 / 휴장일 / 장 마감 전 재조회 방지)
+    - 마지막 거래일 = 같은 시장 종목 중 저장소에 있는 가장 최근 봉 날짜 (직전 정규장 마감일을 넘지 않음, 장중 봉 제외)
+    - 그 날짜가 직전 정규장 마감일보다 오래됐으면 시장마다 1종목만 먼저 받아 새 봉이 생겼는지 확인
+    Returns: 새로 저장된 outcome 수
+    """
+    pending = db.get_pending_outcome_rows()
+    if not pending: return 0
+
+    now = datetime.now().astimezone()
+    today_str = now.strftime('%Y-%m-%d')
+    by_code = {}
+    for row in pending:
+        by_code.setdefault(row[2], []).append(row)
+
+    ranges = {code: db.get_bar_date_range(code) for code in by_code} if refresh_bars else {}
+    market_last = {}  # region -> 저장된 가장 최근 봉 날짜
+    for code, (_, last) in ranges.items():
+        region = qs._region(code)
+        if last and last > market_last.get(region, ""): market_last[region] = last
+    probed = set()
+
+    saved = 0
+    for code, rows in by_code.items():
+        first_scan = min(r[1] for r in rows)
+        start = datetime.strptime(first_scan, '%Y-%m-%d') - timedelta(days=7)
+        fetched = False
+        if refresh_bars:
+            first, last = ranges[code]
+            region = qs._region(code)
+            close_day = qs._last_close(region, now).strftime('%Y-%m-%d')
+            latest = min(market_last.get(region, ""), close_day)
+            probe = last is not None and last >= latest and latest < close_day and region not in probed
+            if last is None or first > start.strftime('%Y-%m-%d') or last < latest or probe:
+                fetched = bar_store.update_bars(code, start)
+                new_last = db.get_bar_date_range(code)[1]
+                if new_last and new_last > market_last.get(region, ""): market_last[region] = new_last
+                if probe: probed.add(region)
+        bars = bar_store.get_bars(code, start)
+        records, completed = evaluate_code(rows, bars, today_str, history_checked=fetched)
+        saved += db.save_outcomes(records, completed)
+    return saved
+
+def _worker_loop(interval_sec):
+    while True:
+        try:
+            evaluate_pending_outcomes()
+        except Exception as e:
+            print(f"Outcome Worker Error: {e}")
+        time.sleep(interval_sec)
+
+def start_outcome_worker(interval_sec=3600):
+    """프로세스당 1개의 백그라운드 평가 스레드 시작 (중복 호출 무시)"""
+    global _worker_started
+    with _worker_lock:
+        if _worker_started: return
+        t = threading.Thread(target=_worker_loop, args=(interval_sec,), daemon=True)
+        t.start()
+        _worker_started = True
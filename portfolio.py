@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+import database as db
+import bar_store
+
+# -----------------------------------------------------------------------------
+# 관심종목 포트폴리오 분석 (NumPy 벡터 연산)
+# - 관심종목에는 수량이 없으므로 종목당 1주 보유로 손익 합계를 계산
+# - 위험 지표는 동일 비중 포트폴리오 기준, 일봉은 저장소에서만 읽음 (rerun 마다 네트워크 없음)
+# -----------------------------------------------------------------------------
+TRADING_DAYS = 252
+VAR_LEVELS = (95, 99)
+
+def position_pnl(buy, price, days):
+    """
+    buy, price, days: 종목별 매수가 / 현재가 / 등록기간(일) 배열
+    Returns: (수익률%, 일간수익률%) - 매수가나 현재가가 0 이하이면 0
+    """
+    buy = np.asarray(buy, dtype=float)
+    price = np.asarray(price, dtype=float)
+    days = np.asarray(days, dtype=float)
+    valid = (buy > 0) & (price > 0)
+    ret = np.where(valid, (price - buy) / np.where(valid, buy, 1.0) * 100, 0.0)
+    return ret, ret / np.maximum(days, 1)
+
+def krw_totals(buy, price, is_kr, usd_rate):
+    """종목당 1주 기준 원화 환산 합계. Returns: dict(매수금액, 평가금액, 손익, 수익률)"""
+    buy = np.asarray(buy, dtype=float)
+    price = np.asarray(price, dtype=float)
+    fx = np.where(np.asarray(is_kr, dtype=bool), 1.0, float(usd_rate))
+    # 시세 조회 실패(0) 종목은 합계에서 제외해야 손익이 왜곡되지 않음
+    valid = (buy > 0) & (price > 0)
+    cost = float(np.sum(buy * fx, where=valid))
+    value = float(np.sum(price * fx, where=valid))
+    pnl = value - cost
+    return {"cost": cost, "value": value, "pnl": pnl,
+            "ret_pct": pnl / cost * 100 if cost > 0 else 0.0, "count": int(valid.sum())}
+
+def load_close_panel(codes, days=365, refresh=False):
+    """
+    저장소 종가를 (날짜 x 종목) 패널로. 한국/미국 휴장일 차이는 직전 값으로 채움
+    refresh=True 이면 종목별 증분 갱신 후 읽음
+    """
+    codes = [str(c) for c in codes]
+    start = datetime.now() - timedelta(days=days)
+    if refresh:
+        for code in codes: bar_store.update_bars(code, start)
+    rows = db.get_close_panel_rows(codes, start.strftime('%Y-%m-%d'))
+    if not rows: return pd.DataFrame()
+    long_df = pd.DataFrame(rows, columns=["code", "date", "close"])
+    panel = long_df.pivot(index="date", columns="code", values="close")
+    panel.index = pd.to_datetime(panel.index)
+    return panel.sort_index().ffill()
+
+def risk_metrics(panel, weights=None):
+    """
+    panel: load_close_panel 결과
+    Returns: dict(vol, corr, drawdown, mdd, var, codes) - 변동성은 연율화(%), VaR 는 1일 손실률(%)
+    """
+    if panel.empty or len(panel) < 3: return None
+    closes = panel.values
+    # 상장 전 구간(NaN)은 수익률 0 으로 취급
+    rets = np.nan_to_num(closes[1:] / closes[:-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+    n = rets.shape[1]
+    w = np.full(n, 1.0 / n) if weights is None else np.asarray(weights, dtype=float) / np.sum(weights)
+
+    vol = rets.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+    std = rets.std(axis=0)
+    centered = rets - rets.mean(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (centered.T @ centered) / len(rets) / np.outer(std, std)
+    corr = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(corr, 1.0)
+
+    port = rets @ w
+    equity = np.cumprod(1.0 + port)
+    drawdown = (equity / np.maximum.accumulate(equity) - 1.0) * 100
+    var = {lv: float(-np.percentile(port, 100 - lv) * 100) for lv in VAR_LEVELS}
+
+    codes = list(panel.columns)
+    return {
+        "codes": codes,
+        "vol": pd.Series(vol, index=codes),
+        "corr": pd.DataFrame(corr, index=codes, columns=codes),
+        "drawdown": pd.Series(drawdown, index=panel.index[1:]),
+        "mdd": float(drawdown.min()),
+        "var": var,
+    }
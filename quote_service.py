@@ -0,0 +1,229 @@
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+import pandas as pd
+import yfinance as yf
+import database as db
+import data_loader as dl
+
+# -----------------------------------------------------------------------------
+# 프로세스 공용 시세 서비스
+# - 장중에는 짧은 TTL, 장 마감 후 조회한 값은 다음 개장 전까지 유효
+# - 여러 종목을 yf.download 한 번으로 묶어서 조회
+# - 같은 종목을 여러 세션이 동시에 요청하면 네트워크 요청은 1번만 (coalescing)
+# -----------------------------------------------------------------------------
+OPEN_TTL_SEC = 60
+CLOSED_TTL_SEC = 1800
+BATCH_SIZE = 100
+
+MARKET_HOURS = {
+    "KR": (ZoneInfo("Asia/Seoul"), dtime(9, 0), dtime(15, 30)),
+    "US": (ZoneInfo("America/New_York"), dtime(9, 30), dtime(16, 0)),
+}
+
+LIVE_POLL_SEC = 30
+LIVE_SESSION_GRACE = 3  # 세션이 이 주기 수만큼 신호가 없으면 (탭 닫힘 등) 종료된 것으로 봄
+
+_lock = threading.Lock()
+_cache = {}     # code -> (price, fetched_at epoch)
+_inflight = {}  # code -> Future
+_seq = 0        # 가격이 바뀔 때마다 증가
+_versions = {}  # code -> 마지막으로 가격이 바뀐 시점의 _seq
+
+_poller_lock = threading.Lock()
+_poller_thread = None
+_live_sessions = {}  # session_id -> (주기 초, 마지막 신호 epoch)
+
+def is_kr_code(code):
+    s_code = str(code)
+    return s_code.isdigit() and len(s_code) == 6
+
+def _region(code):
+    return "KR" if is_kr_code(code) else "US"
+
+def is_market_open(region, now=None):
+    tz, t_open, t_close = MARKET_HOURS[region]
+    local = (now or datetime.now(tz)).astimezone(tz)
+    return local.weekday() < 5 and t_open <= local.time() < t_close
+
+def _last_close(region, now):
+    """now 직전의 정규장 마감 시각 (휴장일은 고려하지 않음)"""
+    tz, _, t_close = MARKET_HOURS[region]
+    local = now.astimezone(tz)
+    day = local.date()
+    if local.time() < t_close: day -= timedelta(days=1)
+    while day.weekday() >= 5: day -= timedelta(days=1)
+    return datetime.combine(day, t_close, tzinfo=tz)
+
+def _is_fresh(code, fetched_at, now):
+    region = _region(code)
+    age = now.timestamp() - fetched_at
+    if is_market_open(region, now): return age < OPEN_TTL_SEC
+    # 마감 이후 받은 값은 확정 종가 → 다음 개장 전까지 재조회 불필요
+    if fetched_at >= _last_close(region, now).timestamp(): return True
+    return age < CLOSED_TTL_SEC
+
+def _download_last_close(symbols):
+    """symbols 를 묶어서 조회. Returns: {symbol: 마지막 가격}"""
+    prices = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        chunk = symbols[i:i + BATCH_SIZE]
+        try:
+            df = yf.download(chunk, period="5d", interval="1d", progress=False,
+                             auto_adjust=False, threads=True)
+        except Exception:
+            continue
+        if df is None or df.empty or 'Close' not in df: continue
+        close = df['Close']
+        if isinstance(close, pd.Series): close = close.to_frame(chunk[0])
+        last = close.ffill().iloc[-1]
+        for sym, val in last.items():
+            if pd.notnull(val) and val > 0: prices[sym] = float(val)
+    return prices
+
+def _fetch(codes, refresh_symbols=True):
+    """
+    네트워크 조회: 미국 종목은 코드 그대로, 한국 종목은 저장된 거래소 심볼 매핑으로 조회
+    refresh_symbols=False: 매핑 갱신(KRX 목록 조회) 없이 저장된 매핑만 사용 - 폴러 스레드용
+    """
+    symbol_of, unknown = dl.resolve_yf_symbols(codes, refresh=refresh_symbols)
+
+    by_symbol = _download_last_close(list(symbol_of.values()))
+    prices = {c: by_symbol.get(sym, 0.0) for c, sym in symbol_of.items()}
+
+    # 매핑에 없는 한국 종목(상장 목록에 없는 코드)만 .KQ 로 한 번 더 (묶음 1회)
+    retry = {f"{c}.KQ": c for c in unknown if prices[c] <= 0}
+    if retry:
+        alt = _download_last_close(list(retry.keys()))
+        for sym, c in retry.items():
+            if sym in alt: prices[c] = alt[sym]
+    return prices
+
+def get_prices(codes, max_age=None, refresh_symbols=True):
+    """
+    codes: 종목 코드 목록 (한국 6자리 / 미국 티커)
+    max_age: 초 단위 강제 유효기간 (0 이면 새로 조회). None 이면 장 운영시간 기준 TTL
+    refresh_symbols: 심볼 매핑에 없는 한국 종목이 있을 때 KRX 목록으로 갱신할지 (스크립트 스레드에서만 True)
+    Returns: {code: price} (조회 실패 시 0.0)
+    """
+    global _seq
+    codes = list(dict.fromkeys(str(c) for c in codes))
+    if not codes: return {}
+    now = datetime.now().astimezone()
+    result, waits, mine = {}, {}, {}
+
+    with _lock:
+        for code in codes:
+            cached = _cache.get(code)
+            if cached:
+                price, fetched_at = cached
+                fresh = (now.timestamp() - fetched_at < max_age) if max_age is not None else _is_fresh(code, fetched_at, now)
+                if fresh:
+                    result[code] = price
+                    continue
+            if code in _inflight:
+                waits[code] = _inflight[code]
+            else:
+                fut = Future()
+                _inflight[code] = fut
+                mine[code] = fut
+
+    if mine:
+        try:
+            fetched = _fetch(list(mine.keys()), refresh_symbols)
+        except Exception:
+            fetched = {}
+        fetched_at = time.time()
+        with _lock:
+            for code, fut in mine.items():
+                price = fetched.get(code, 0.0)
+                if price > 0:
+                    if code not in _cache or _cache[code][0] != price:
+                        _seq += 1
+                        _versions[code] = _seq
+                    _cache[code] = (price, fetched_at)
+                elif code in _cache: price = _cache[code][0]  # 조회 실패 시 직전 값 유지
+                _inflight.pop(code, None)
+                fut.set_result(price)
+                result[code] = price
+
+    for code, fut in waits.items():
+        try: result[code] = fut.result(timeout=30)
+        except Exception: result[code] = 0.0
+    return result
+
+def get_price(code, max_age=None):
+    return get_prices([code], max_age).get(str(code), 0.0)
+
+# -----------------------------------------------------------------------------
+# 실시간 모드: 백그라운드 폴러가 전체 사용자 관심종목(중복 제거)을 장중에만 주기 갱신
+# 세션은 네트워크 없이 캐시에서 바뀐 종목만 가져감
+# -----------------------------------------------------------------------------
+def current_seq():
+    with _lock:
+        return _seq
+
+def changed_since(codes, since_seq):
+    """
+    since_seq 이후 가격이 바뀐 종목만 반환
+    Returns: ({code: price}, 현재 seq)
+    """
+    with _lock:
+        changed = {}
+        for code in codes:
+            code = str(code)
+            if _versions.get(code, 0) > since_seq and code in _cache:
+                changed[code] = _cache[code][0]
+        return changed, _seq
+
+def _poll_once(interval):
+    codes = db.get_all_favorite_codes()
+    now = datetime.now().astimezone()
+    open_codes = [c for c in codes if is_market_open(_region(c), now)]
+    if open_codes:
+        # 직전 주기 이후 다른 세션이 이미 받은 값은 재사용
+        # 스크립트 컨텍스트가 없는 스레드라 심볼 매핑은 DB 에 있는 것만 사용 (갱신은 화면 쪽 조회가 담당)
+        get_prices(open_codes, max_age=interval / 2, refresh_symbols=False)
+
+def _active_interval():
+    """만료된 세션을 정리하고 남은 세션 중 가장 짧은 주기 반환 (없으면 None). _poller_lock 안에서 호출"""
+    now = time.time()
+    for sid, (cadence, seen) in list(_live_sessions.items()):
+        if now - seen > cadence * LIVE_SESSION_GRACE:
+            del _live_sessions[sid]
+    if not _live_sessions: return None
+    return min(cadence for cadence, _ in _live_sessions.values())
+
+def _poller_loop():
+    global _poller_thread
+    while True:
+        with _poller_lock:
+            interval = _active_interval()
+            if interval is None:
+                # 실시간 세션이 모두 끝나면 종료 (다음 세션이 새로 시작)
+                _poller_thread = None
+                return
+        try:
+            _poll_once(interval)
+        except Exception as e:
+            print(f"Quote Poller Error: {e}")
+        time.sleep(interval)
+
+def start_live_poller(session_id, interval_sec=LIVE_POLL_SEC):
+    """
+    세션의 실시간 모드 등록 / 유지 신호 (fragment 가 주기마다 호출)
+    폴러는 프로세스당 1개, 활성 세션 중 가장 짧은 주기로 돌고 세션이 없으면 멈춤
+    """
+    global _poller_thread
+    with _poller_lock:
+        _live_sessions[session_id] = (max(5, int(interval_sec)), time.time())
+        if _poller_thread is not None and _poller_thread.is_alive(): return
+        _poller_thread = threading.Thread(target=_poller_loop, name="quote-poller", daemon=True)
+        _poller_thread.start()
+
+def stop_live_poller(session_id):
+    """세션의 실시간 모드 해제 (마지막 세션이면 폴러는 다음 주기에 종료)"""
+    with _poller_lock:
+        _live_sessions.pop(session_id, None)
@@ -0,0 +1,72 @@
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# 전략 승률 유의성 검정 (벡터 연산)
+# - 부트스트랩: 신호 결과를 복원추출한 (B x n) 인덱스 행렬로 승률 신뢰구간
+# - 무작위 진입 기준선: 같은 종목/기간의 아무 날이나 n번 진입한 (B x n) 표본과 비교한 단측 p값
+#   → "67% (4/6)" 와 "67% (200/300)" 을 구분
+# -----------------------------------------------------------------------------
+N_RESAMPLES = 2000
+ALPHA = 0.05
+
+def bootstrap_ci(outcomes, n_resamples=N_RESAMPLES, alpha=ALPHA, rng=None):
+    """outcomes: 신호별 수익률 배열. Returns: (승률 하한%, 승률 상한%, 평균 하한%, 평균 상한%)"""
+    outcomes = np.asarray(outcomes, dtype=float)
+    n = len(outcomes)
+    if n == 0: return (np.nan,) * 4
+    rng = rng or np.random.default_rng(0)
+    samples = outcomes[rng.integers(0, n, size=(n_resamples, n))]
+    win = (samples > 0).mean(axis=1) * 100
+    mean = samples.mean(axis=1) * 100
+    q = [alpha / 2 * 100, (1 - alpha / 2) * 100]
+    w_lo, w_hi = np.percentile(win, q)
+    m_lo, m_hi = np.percentile(mean, q)
+    return float(w_lo), float(w_hi), float(m_lo), float(m_hi)
+
+def random_entry_pvalue(outcomes, baseline, n_resamples=N_RESAMPLES, rng=None):
+    """
+    baseline: 같은 기간 모든 날의 수익률 (무작위 진입 모집단)
+    Returns: (승률 p값, 평균수익률 p값) - 무작위 진입이 신호 이상으로 좋을 확률
+    """
+    outcomes = np.asarray(outcomes, dtype=float)
+    baseline = np.asarray(baseline, dtype=float)
+    n = len(outcomes)
+    if n == 0 or len(baseline) == 0: return np.nan, np.nan
+    rng = rng or np.random.default_rng(0)
+    null = baseline[rng.integers(0, len(baseline), size=(n_resamples, n))]
+    null_win = (null > 0).mean(axis=1)
+    null_mean = null.mean(axis=1)
+    p_win = (1 + np.count_nonzero(null_win >= (outcomes > 0).mean())) / (n_resamples + 1)
+    p_mean = (1 + np.count_nonzero(null_mean >= outcomes.mean())) / (n_resamples + 1)
+    return float(p_win), float(p_mean)
+
+def test_signals(fwd, masks, n_resamples=N_RESAMPLES, seed=0):
+    """
+    fwd: (T,) 선행 수익률 (결과 미확정 구간은 NaN)
+    masks: {전략: (T,) bool 신호}
+    Returns: {전략: {'n', 'win', 'ci_lo', 'ci_hi', 'p_value', 'p_mean', 'base_win'}}
+    """
+    fwd = np.asarray(fwd, dtype=float)
+    valid = np.isfinite(fwd)
+    baseline = fwd[valid]
+    base_win = float((baseline > 0).mean() * 100) if len(baseline) else np.nan
+    out = {}
+    for name, mask in masks.items():
+        outcomes = fwd[np.asarray(mask, dtype=bool) & valid]
+        rng = np.random.default_rng(seed)
+        w_lo, w_hi, _, _ = bootstrap_ci(outcomes, n_resamples, rng=rng)
+        p_win, p_mean = random_entry_pvalue(outcomes, baseline, n_resamples, rng=rng)
+        out[name] = {
+            'n': int(len(outcomes)),
+            'win': float((outcomes > 0).mean() * 100) if len(outcomes) else np.nan,
+            'ci_lo': w_lo, 'ci_hi': w_hi, 'p_value': p_win, 'p_mean': p_mean, 'base_win': base_win,
+        }
+    return out
+
+def verdict(p_value, n, min_n=10):
+    """표시용 한 줄 판정"""
+    if n is None or n < min_n or p_value is None or np.isnan(p_value): return "⚪ 표본 부족"
+    if p_value < 0.01: return "🟢 매우 유의"
+    if p_value < 0.05: return "🟢 유의"
+    if p_value < 0.2: return "🟡 약함"
+    return "🔴 우연 수준"
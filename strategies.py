@@ -3,6 +3,37 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+import bar_store
+import bt_cache
+import chart_store
+import significance
+
+# 전략 임계값 기본값 (파라미터 스윕 / 워크포워드 검증의 기준점)
+DEFAULT_PARAMS = {
+    "bnf_disparity": 90,     # BNF: 25일 이격도 이하
+    "sqz_bw": 0.15,          # AI스퀴즈: 밴드폭 절대 기준
+    "sqz_bw_ratio": 0.7,     # AI스퀴즈: 120일 평균 밴드폭 대비
+    "vol_mult": 1.5,         # AI스퀴즈: 20일 평균 거래량 대비
+    "vwap_band": 0.03,       # VWAP: 지지 밴드 폭
+    "donchian_entry": 20,    # 터틀: 돌파 채널 (High20)
+    "donchian_exit": 10,     # 터틀: 청산 채널 (Low10)
+    "hold_days": 5,          # 과거승률: 보유 일수
+}
+P = DEFAULT_PARAMS
+
+# 캐시 형식 / 함수 소스로 드러나지 않는 동작이 바뀌면 수동으로 올림 (STRATEGY_VERSION 에 포함)
+STRATEGY_LOGIC_VERSION = 1
+
+# 정밀 분석 전략 목록: (짧은 이름, 전체 이름)
+DEEP_DIVE_STRATEGIES = [
+    ("🐢 터틀", "🐢 터틀 트레이딩"), ("⚡ 엘리트", "⚡ 엘리트 매매법"),
+    ("🔥 DBB", "🔥 DBB (더블볼린저)"), ("💧 BNF", "💧 BNF (과매도)"),
+    ("🤖 AI스퀴즈", "🤖 AI 스퀴즈"), ("🛡️ 버핏", "🛡️ 버핏 (장기투자)"),
+    ("⚓ VWAP", "⚓ VWAP (지지선)")
+]
 
 def get_exchange_rate():
     try:
@@ -18,10 +49,24 @@ def format_price(val, market="KR", code=None):
         else: return f"{int(val):,}원"
     except: return str(val)
 
-def fetch_data(code):
+def is_us_stock(code, market_raw):
+    mkt_upper = str(market_raw).upper()
+    return bool((code and str(code).isalpha()) or \
+                ("US" in mkt_upper) or \
+                ("NASDAQ" in mkt_upper) or \
+                ("NYSE" in mkt_upper) or \
+                ("S&P" in mkt_upper))
+
+def fetch_data(code, as_of=None, days=365):
     try:
-        # 데이터 기간을 충분히 확보 (백테스팅용)
-        df = fdr.DataReader(str(code), datetime.now() - timedelta(days=365)) 
+        # 데이터 기간을 충분히 확보 (백테스팅용) - days: 조회 기간 (정밀 분석 장기 차트는 수년)
+        # [최적화] 일봉 저장소 경유: 네트워크는 증분 구간만, 저장된 봉은 성과 평가에 재사용
+        if as_of is None:
+            df = bar_store.get_history(str(code), days=days)
+        else:
+            # [신규] 기준일 스캔: 기준일까지 저장된 봉만 사용 (네트워크 없음)
+            as_of = pd.Timestamp(as_of)
+            df = bar_store.get_bars(str(code), as_of - timedelta(days=days), as_of)
         if len(df) < 200: return None 
         return calculate_indicators(df)
     except: return None
@@ -89,10 +134,10 @@ def calculate_indicators(df):
     money_ratio = pos_mf_sum / neg_mf_sum.replace(0, 1) 
     df['MFI'] = 100 - (100 / (1 + money_ratio))
 
-    df['High20'] = df['High'].rolling(window=20).max().shift(1)
+    df['High20'] = df['High'].rolling(window=P['donchian_entry']).max().shift(1)
     df['Low20']  = df['Low'].rolling(window=20).min().shift(1)
     df['High10'] = df['High'].rolling(window=10).max().shift(1)
-    df['Low10']  = df['Low'].rolling(window=10).min().shift(1)
+    df['Low10']  = df['Low'].rolling(window=P['donchian_exit']).min().shift(1)
     
     df['H-L'] = df['High'] - df['Low']
     df['H-PC'] = abs(df['High'] - df['Close'].shift(1))
@@ -102,44 +147,98 @@ def calculate_indicators(df):
         
     return df
 
+# 과거 신호 조건 벡터 (전체 기간에 대해 한 번에)
+def signal_conditions(df, strategy_key):
+    conditions = pd.Series(False, index=df.index)
+    
+    if "엘리트" in strategy_key:
+        conditions = (df['EMA10'] > df['EMA20']) & (df['EMA20'] > df['EMA60']) & \
+                     (df['MACD'] > df['Signal']) & (df['MACD'].shift(1) <= df['Signal'].shift(1))
+                     
+    elif "DBB" in strategy_key:
+        conditions = (df['Close'] > df['BB_Up2']) & (df['Close'].shift(1) <= df['BB_Up2'].shift(1))
+        
+    elif "BNF" in strategy_key:
+        conditions = (df['Disparity25'] <= P['bnf_disparity'])
+        
+    elif "스퀴즈" in strategy_key:
+        # 단순화된 조건 (속도 향상)
+        conditions = (df['Bandwidth'] < 0.2) & \
+                     (df['Volume'] > df['Volume'].shift(1) * P['vol_mult']) & \
+                     (df['Close'] > df['Close'].shift(1))
+                     
+    elif "터틀" in strategy_key:
+        # 터틀 조건 명확화
+        conditions = (df['Close'] > df['High20']) & \
+                     (df['Close'].shift(1) <= df['High20'].shift(1)) & \
+                     (df['Close'] > df['MA200'])
+                     
+    elif "버핏" in strategy_key:
+        conditions = (df['Close'] > df['MA200']) & (df['Close'].shift(1) <= df['MA200'].shift(1))
+        
+    elif "VWAP" in strategy_key:
+         conditions = (abs(df['Close'] - df['VWAP']) / df['VWAP'] <= P['vwap_band'])
+
+    return conditions.fillna(False).astype(bool)
+
+# [신규] 보유기간별 과거 성과: 포착된 모든 전략 x 호라이즌을 한 번의 행렬 연산으로
+SCAN_HORIZONS = (1, 3, 5, 10, 20)
+
+def multi_horizon_stats(df, strategy_names, horizons=SCAN_HORIZONS):
+    """
+    Returns: {전략: {h: {'n': 건수, 'win': 승률%, 'mean': 평균수익률%, 'mae': 평균 최대역행폭%}}}
+    MAE: 진입 후 h일 동안의 최저가 기준 최대 손실 (0 이하)
+    """
+    close = df['Close'].values.astype(float)
+    low = df['Low'].values.astype(float)
+    T, H = len(close), max(horizons)
+    pad = np.full(H, np.nan)
+    # (T x H): k 번째 열 = t+k+1 일의 종가 / 저가
+    fut_close = np.lib.stride_tricks.sliding_window_view(np.concatenate([close[1:], pad]), H)[:T]
+    fut_low = np.lib.stride_tricks.sliding_window_view(np.concatenate([low[1:], pad]), H)[:T]
+    run_low = np.fmin.accumulate(fut_low, axis=1)
+
+    cols = np.array(horizons) - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fwd = fut_close[:, cols] / close[:, None] - 1
+        mae = np.minimum(run_low[:, cols] / close[:, None] - 1, 0)
+    valid = np.isfinite(fwd)
+    fwd_z = np.where(valid, fwd, 0.0)
+    mae_z = np.where(valid & np.isfinite(mae), mae, 0.0)
+
+    names = list(strategy_names)
+    conds = np.array([signal_conditions(df, s).values for s in names], dtype=float).reshape(len(names), T)
+    n = conds @ valid
+    wins = conds @ (valid & (fwd > 0))
+    sum_ret = conds @ fwd_z
+    sum_mae = conds @ mae_z
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate, mean_ret, mean_mae = wins / n * 100, sum_ret / n * 100, sum_mae / n * 100
+
+    return {
+        name: {h: {'n': int(n[i, k]), 'win': float(win_rate[i, k]), 'mean': float(mean_ret[i, k]), 'mae': float(mean_mae[i, k])}
+               for k, h in enumerate(horizons)}
+        for i, name in enumerate(names)
+    }
+
+# [신규] 과거승률 유의성: 보유일수 뒤 수익률로 부트스트랩 신뢰구간 + 무작위 진입 대비 p값
+def signal_significance(df, strategy_names, hold=None):
+    hold = hold or P['hold_days']
+    close = df['Close'].values.astype(float)
+    fwd = np.full(len(close), np.nan)
+    if len(close) > hold: fwd[:-hold] = close[hold:] / close[:-hold] - 1
+    masks = {s: signal_conditions(df, s).values for s in strategy_names}
+    return significance.test_signals(fwd, masks)
+
 # [최적화] 벡터 연산을 사용한 초고속 백테스팅
 def backtest_past_performance(df, strategy_key):
     try:
         if len(df) < 60: return "N/A"
-        
-        # 전체 데이터에 대한 조건 벡터 생성
-        conditions = pd.Series(False, index=df.index)
-        
-        if "엘리트" in strategy_key:
-            conditions = (df['EMA10'] > df['EMA20']) & (df['EMA20'] > df['EMA60']) & \
-                         (df['MACD'] > df['Signal']) & (df['MACD'].shift(1) <= df['Signal'].shift(1))
-                         
-        elif "DBB" in strategy_key:
-            conditions = (df['Close'] > df['BB_Up2']) & (df['Close'].shift(1) <= df['BB_Up2'].shift(1))
-            
-        elif "BNF" in strategy_key:
-            conditions = (df['Disparity25'] <= 90)
-            
-        elif "스퀴즈" in strategy_key:
-            # 단순화된 조건 (속도 향상)
-            conditions = (df['Bandwidth'] < 0.2) & \
-                         (df['Volume'] > df['Volume'].shift(1) * 1.5) & \
-                         (df['Close'] > df['Close'].shift(1))
-                         
-        elif "터틀" in strategy_key:
-            # 터틀 조건 명확화
-            conditions = (df['Close'] > df['High20']) & \
-                         (df['Close'].shift(1) <= df['High20'].shift(1)) & \
-                         (df['Close'] > df['MA200'])
-                         
-        elif "버핏" in strategy_key:
-            conditions = (df['Close'] > df['MA200']) & (df['Close'].shift(1) <= df['MA200'].shift(1))
-            
-        elif "VWAP" in strategy_key:
-             conditions = (abs(df['Close'] - df['VWAP']) / df['VWAP'] <= 0.03)
+        conditions = signal_conditions(df, strategy_key)
 
-        # 신호가 발생한 날들의 인덱스 (마지막 5일은 결과 확인 불가하므로 제외)
-        signal_indices = np.where(conditions.iloc[:-5])[0]
+        # 신호가 발생한 날들의 인덱스 (마지막 보유일수 만큼은 결과 확인 불가하므로 제외)
+        hold = P['hold_days']
+        signal_indices = np.where(conditions.iloc[:-hold])[0]
         
         total = len(signal_indices)
         if total == 0: return "0% (0/0)"
@@ -147,7 +246,7 @@ def backtest_past_performance(df, strategy_key):
         # 5일 뒤 수익 여부 확인 (벡터 연산)
         # signal_indices에 해당하는 날짜의 Close와 5일 뒤 Close 비교
         entry_prices = df['Close'].iloc[signal_indices].values
-        future_prices = df['Close'].iloc[signal_indices + 5].values
+        future_prices = df['Close'].iloc[signal_indices + hold].values
         
         wins = np.sum(future_prices > entry_prices)
         win_rate = (wins / total) * 100
@@ -156,20 +255,35 @@ def backtest_past_performance(df, strategy_key):
     except Exception as e:
         return "Err"
 
-def analyze_single_stock(code, name_raw, market_raw, exclude_penny=False):
+# 전략 정의 버전 (백테스트 캐시 키): 캐시되는 결과를 정하는 입력만 해시
+# - 기본 파라미터 / 수동 버전 / 호라이즌 / 유의성 설정 + 지표·신호·성과 계산 함수 소스
+# - 같은 파일의 다른 코드, UI 문구 수정으로는 캐시가 무효화되지 않음
+VERSION_FUNCTIONS = (calculate_indicators, signal_conditions, multi_horizon_stats, signal_significance,
+                     backtest_past_performance, significance.bootstrap_ci, significance.random_entry_pvalue,
+                     significance.test_signals)
+STRATEGY_VERSION = hashlib.sha1(repr((
+    STRATEGY_LOGIC_VERSION, sorted(DEFAULT_PARAMS.items()), SCAN_HORIZONS, significance.N_RESAMPLES, significance.ALPHA,
+    [inspect.getsource(fn) for fn in VERSION_FUNCTIONS],
+)).encode("utf-8")).hexdigest()[:12]
+
+# 스캐너 상세 차트 구간 / 시계열 (chart_store 에 보관)
+CHART_BARS = 100
+CHART_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'MA20', 'BB_Up2', 'BB_Dn2',
+                 'MACD', 'Signal', 'MACD_Hist', 'Stoch_D', 'Stoch_SlowD', 'RSI', 'VWAP']
+
+def analyze_single_stock(code, name_raw, market_raw, exclude_penny=False, as_of=None, with_scores=False):
+    """
+    as_of: 과거 기준일 (None 이면 현재 시점, 네트워크로 최신 봉 갱신)
+    with_scores: True 면 (결과 행, {전략 이름: 점수}) 반환 - 스캐너가 daily_signals 를 저장소 재조회 없이 기록
+    """
     try:
-        df = fetch_data(code)
+        df = fetch_data(code, as_of)
         if df is None: return None
         curr = df.iloc[-1]
         prev = df.iloc[-2]
         if curr['Volume'] == 0: return None
         
-        mkt_upper = str(market_raw).upper()
-        is_us = (code and str(code).isalpha()) or \
-                ("US" in mkt_upper) or \
-                ("NASDAQ" in mkt_upper) or \
-                ("NYSE" in mkt_upper) or \
-                ("S&P" in mkt_upper)
+        is_us = is_us_stock(code, market_raw)
 
         if exclude_penny:
             if is_us and curr['Close'] < 1: return None 
@@ -190,15 +304,15 @@ def analyze_single_stock(code, name_raw, market_raw, exclude_penny=False):
             scored_strategies.append(("🔥DBB", score))
 
         # 3. BNF
-        if pd.notnull(curr['Disparity25']) and curr['Disparity25'] <= 90: 
+        if pd.notnull(curr['Disparity25']) and curr['Disparity25'] <= P['bnf_disparity']: 
             score = (100 - curr['Disparity25']) * 2
             scored_strategies.append(("💧BNF", score))
         
         # 4. AI 스퀴즈
         avg_bw = df['Bandwidth'].rolling(120).mean().iloc[-1]
-        is_squeeze_prev = (prev['Bandwidth'] < 0.15) or (prev['Bandwidth'] < avg_bw * 0.7)
+        is_squeeze_prev = (prev['Bandwidth'] < P['sqz_bw']) or (prev['Bandwidth'] < avg_bw * P['sqz_bw_ratio'])
         vol_avg = df['Volume'].rolling(20).mean().iloc[-1]
-        vol_explode = curr['Volume'] > vol_avg * 1.5
+        vol_explode = curr['Volume'] > vol_avg * P['vol_mult']
         is_up = curr['Close'] > prev['Close'] 
         if is_squeeze_prev and vol_explode and is_up:
             score = (curr['Volume'] / vol_avg) * 10
@@ -221,8 +335,8 @@ def analyze_single_stock(code, name_raw, market_raw, exclude_penny=False):
         # 7. VWAP
         if pd.notnull(curr['VWAP']):
             diff_pct = abs(curr['Close'] - curr['VWAP']) / curr['VWAP']
-            if diff_pct <= 0.03: 
-                score = (1 - (diff_pct / 0.03)) * 50
+            if diff_pct <= P['vwap_band']: 
+                score = (1 - (diff_pct / P['vwap_band'])) * 50
                 scored_strategies.append(("⚓VWAP", score))
 
         if not scored_strategies: return None
@@ -231,43 +345,71 @@ def analyze_single_stock(code, name_raw, market_raw, exclude_penny=False):
         strategies = [s[0] for s in scored_strategies]
         
         # [백테스팅] 가장 높은 점수 전략에 대해 5일 보유 승률 계산
+        # [최적화] 일봉이 그대로면 (같은 날 재스캔 등) 캐시된 결과 사용 - 장중 봉이 바뀌면 다시 계산
         top_strategy = strategies[0]
-        past_win_rate = backtest_past_performance(df, top_strategy)
+        bt_key = bt_cache.make_key("scan", code, bt_cache.bars_stamp(df), STRATEGY_VERSION, (P, tuple(strategies)))
+        cached = bt_cache.get_or_compute(bt_key, lambda: {
+            "past": backtest_past_performance(df, top_strategy),
+            "horizon": multi_horizon_stats(df, strategies),
+            "signif": signal_significance(df, strategies),
+        })
+        past_win_rate, horizon_stats, signif = cached["past"], cached["horizon"], cached["signif"]
+        top_sig = signif[top_strategy]
         
         strategies_str = " > ".join(strategies)
 
-        df_chart = df.tail(100).copy()
+        # [최적화] 차트 시계열 / 중첩 통계는 결과 행에 넣지 않고 공용 저장소에 1회 보관
+        # (행 선택 시 chart_series / scan_detail 로 조회)
+        chart_store.put(chart_store.make_key(code, df.index[-1]), df.iloc[-CHART_BARS:][CHART_COLUMNS])
+        scores = {s_name: round(float(score), 2) for s_name, score in scored_strategies}
+        chart_store.put(chart_store.make_key(code, df.index[-1], "detail"), {
+            "전략_리스트": strategies, "전략_점수": scores,
+            "horizon_stats": horizon_stats, "significance": signif,
+        })
         atr_val = curr['ATR'] if pd.notnull(curr['ATR']) else curr['Close']*0.01
         
         item = {
             "종목명": name_raw, "코드": code, "시장": market_raw,
             "현재가_RAW": curr['Close'], "현재가": format_price(curr['Close'], market_raw, code),
-            "발견된_전략": strategies_str, "전략_리스트": strategies,
-            "과거승률": f"{top_strategy}: {past_win_rate}", 
+            "기준일": df.index[-1].strftime('%Y-%m-%d'),
+            "발견된_전략": strategies_str,
+            "과거승률": f"{top_strategy}: {past_win_rate}",
+            "승률_CI": f"{top_sig['ci_lo']:.0f}~{top_sig['ci_hi']:.0f}%" if top_sig['n'] else "-",
+            "p값": top_sig['p_value'], "유의성": significance.verdict(top_sig['p_value'], top_sig['n']),
             "RSI": round(curr['RSI'], 0), "Bandwidth": round(curr['Bandwidth'], 3),
             "Disparity25": round(curr['Disparity25'], 1), "MA20": curr['MA20'], "MA5": curr['MA5'],
-            "ATR": atr_val, "High20": curr['High20'],
-            "chart_dates": df_chart.index.strftime('%Y-%m-%d').tolist(),
-            "chart_open": df_chart['Open'].tolist(), "chart_high": df_chart['High'].tolist(),
-            "chart_low": df_chart['Low'].tolist(), "chart_close": df_chart['Close'].tolist(),
-            "chart_vol": df_chart['Volume'].tolist(),
-            "chart_ma": df_chart['MA20'].fillna(0).tolist(),
-            "chart_up": df_chart['BB_Up2'].fillna(0).tolist(), "chart_down": df_chart['BB_Dn2'].fillna(0).tolist(),
-            "chart_up1": df_chart['BB_Up1'].fillna(0).tolist(), "chart_down1": df_chart['BB_Dn1'].fillna(0).tolist(),
-            "macd": df_chart['MACD'].fillna(0).tolist(), "macd_sig": df_chart['Signal'].fillna(0).tolist(),
-            "macd_hist": df_chart['MACD_Hist'].fillna(0).tolist(),
-            "stoch_k": df_chart['Stoch_D'].fillna(0).tolist(), "stoch_d": df_chart['Stoch_SlowD'].fillna(0).tolist(),
-            "rsi_line": df_chart['RSI'].fillna(0).tolist(),
-            "vwap_val": [x if x > 0 else None for x in df_chart['VWAP'].fillna(0).tolist()],
-            "mfi_line": df_chart['MFI'].fillna(50).tolist()
+            "ATR": atr_val, "High20": curr['High20']
         }
+        # 최우선 전략의 보유기간별 성과 (정렬용 스칼라 컬럼)
+        for h, hs in horizon_stats[top_strategy].items():
+            item[f"승률_{h}일"] = hs['win']
+            item[f"수익_{h}일"] = hs['mean']
+            item[f"MAE_{h}일"] = hs['mae']
         item["ai_report_html"] = generate_ai_report_html(item)
-        return item
+        return (item, scores) if with_scores else item
     except: return None
 
+def chart_series(code, last_date):
+    """스캔 결과 행의 차트 시계열 (저장소에서 밀려났으면 기준일까지의 저장된 일봉으로 다시 계산, 네트워크 없음)"""
+    def build():
+        df = fetch_data(code, as_of=last_date)
+        return None if df is None else df.iloc[-CHART_BARS:][CHART_COLUMNS]
+    return chart_store.get_or_compute(chart_store.make_key(code, last_date), build)
+
+def scan_detail(code, name_raw, market_raw, last_date):
+    """
+    스캔 결과 행의 중첩 통계 {전략_리스트, 전략_점수, horizon_stats, significance}
+    저장소에서 밀려났으면 기준일로 다시 분석 (저장된 일봉 + 백테스트 캐시, 네트워크 없음)
+    """
+    key = chart_store.make_key(code, last_date, "detail")
+    def build():
+        if analyze_single_stock(code, name_raw, market_raw, as_of=pd.Timestamp(last_date)) is None: return None
+        return chart_store.get(key)
+    return chart_store.get_or_compute(key, build)
+
 def generate_ai_report_html(item):
     try:
-        strategies = item.get('전략_리스트', [])
+        strategies = [s for s in item.get('발견된_전략', '').split(" > ") if s]
         if not strategies: return "리포트 오류"
         
         main_strat = strategies[0]
@@ -310,7 +452,31 @@ def generate_ai_report_html(item):
         return f"""<div style="background-color:#1a1c24; padding:15px; border-radius:10px;"><div style="font-size:1.4em; font-weight:bold; color:#fff;">{title}</div><ul style="color:#ddd; margin:10px 0;">{analysis}</ul><div style="background-color:#25262b; border-left:5px solid #00d2d3; padding:10px; color:#fff;">{action}</div></div>"""
     except: return "리포트 오류"
 
-def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_code):
+# [최적화] 전략별 조건 벡터를 종목당 1회만 계산 → 7개 전략 정밀 분석이 공유
+def deep_dive_conditions(df):
+    close_prev = df['Close'].shift(1)
+    aligned = (df['EMA10'] > df['EMA20']) & (df['EMA20'] > df['EMA60'])
+    avg_bw = df['Bandwidth'].rolling(120).mean()
+    sqz = (df['Bandwidth'] < P['sqz_bw']) | (df['Bandwidth'] < avg_bw * P['sqz_bw_ratio'])
+    vol = df['Volume'] > df['Volume'].rolling(20).mean() * P['vol_mult']
+    return {
+        'vwap_buy': (df['Close'] >= df['VWAP']) & (df['Close'] <= df['VWAP'] * (1 + P['vwap_band'])) & (df['Close'] >= df['Open']),
+        'turtle_buy': (df['Close'] > df['High20']) & (close_prev <= df['High20'].shift(1)) & (df['Close'] > df['MA200']),
+        'turtle_exit': (df['Close'] < df['Low10']) & (close_prev >= df['Low10'].shift(1)),
+        'aligned': aligned,
+        'macd_cross': (df['MACD'] > df['Signal']) & (df['MACD'].shift(1) <= df['Signal'].shift(1)),
+        'dbb_breakout': (df['Close'] > df['BB_Up2']) & (close_prev <= df['BB_Up2'].shift(1)),
+        'bnf_oversold': (df['Disparity25'] <= P['bnf_disparity']) & (df['Disparity25'].shift(1) > P['bnf_disparity']),
+        'sqz_trigger': sqz & vol & (df['Close'] > df['MA20']),
+        'buffett_cross': (df['Close'] > df['MA200']) & (close_prev <= df['MA200'].shift(1)),
+    }
+
+def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_code, conds=None, include_chart=True, chart_bars=150):
+    """
+    conds: deep_dive_conditions(df) 결과 (여러 전략을 연달아 분석할 때 재사용)
+    include_chart: False 이면 차트용 DataFrame 복사/신호 표시를 생략 (일괄 분석용)
+    chart_bars: 차트에 넘길 최근 봉 수 (None 이면 전체 - 장기 차트는 그리는 쪽에서 LTTB 로 줄임)
+    """
     try:
         curr = df.iloc[-1]
         prev = df.iloc[-2]
@@ -319,8 +485,15 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
         atr = curr['ATR']
         if pd.isna(atr) or atr == 0: atr = curr['Close'] * 0.01
         atr_pct = (atr / curr['Close']) * 100
-        df = df.copy()
-        df['Chart_Signal'] = 0
+        if conds is None: conds = deep_dive_conditions(df)
+        chart_df = None
+        if include_chart:
+            chart_df = df.copy()
+            chart_df['Chart_Signal'] = 0
+        
+        def mark(cond, value=1):
+            if chart_df is not None: chart_df.loc[cond, 'Chart_Signal'] = value
+        
         signal = "관망"
         entry_price = curr['Close']
         stop_price = 0
@@ -329,13 +502,12 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
         if "VWAP" in strategy_type:
             if pd.notnull(curr['VWAP']):
                 entry_price = curr['VWAP']
-                is_buy = abs(curr['Close'] - curr['VWAP']) / curr['VWAP'] <= 0.03
+                is_buy = abs(curr['Close'] - curr['VWAP']) / curr['VWAP'] <= P['vwap_band']
                 
                 if is_buy: signal = "BUY (지지권)"
                 else: signal = "Wait"
                 
-                buy_cond = (df['Close'] >= df['VWAP']) & (df['Close'] <= df['VWAP'] * 1.03) & (df['Close'] >= df['Open'])
-                df.loc[buy_cond, 'Chart_Signal'] = 1
+                mark(conds['vwap_buy'])
                 
                 stop_price = curr['VWAP'] * 0.97
                 target_price = entry_price * 1.15
@@ -343,10 +515,9 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
 
         elif "터틀" in strategy_type:
             entry_price = curr['High20']
-            buy_cond = (df['Close'] > df['High20']) & (df['Close'].shift(1) <= df['High20'].shift(1)) & (df['Close'] > df['MA200'])
-            exit_cond = (df['Close'] < df['Low10']) & (df['Close'].shift(1) >= df['Low10'].shift(1))
-            df.loc[buy_cond, 'Chart_Signal'] = 1
-            df.loc[exit_cond, 'Chart_Signal'] = -1
+            buy_cond = conds['turtle_buy']
+            mark(buy_cond)
+            mark(conds['turtle_exit'], -1)
             
             if buy_cond.iloc[-1]: signal = "BUY"
             elif (curr['Close'] < curr['Low10']): signal = "EXIT"
@@ -357,9 +528,8 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
 
         elif "엘리트" in strategy_type:
             entry_price = curr['Close']
-            aligned = (df['EMA10'] > df['EMA20']) & (df['EMA20'] > df['EMA60'])
-            macd_cross = (df['MACD'] > df['Signal']) & (df['MACD'].shift(1) <= df['Signal'].shift(1))
-            df.loc[aligned & macd_cross, 'Chart_Signal'] = 1
+            aligned, macd_cross = conds['aligned'], conds['macd_cross']
+            mark(aligned & macd_cross)
             
             if aligned.iloc[-1] and macd_cross.iloc[-1]: signal = "BUY"
             elif aligned.iloc[-1]: signal = "HOLD"
@@ -369,8 +539,8 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
 
         elif "DBB" in strategy_type:
             entry_price = curr['BB_Up2']
-            breakout = (df['Close'] > df['BB_Up2']) & (df['Close'].shift(1) <= df['BB_Up2'].shift(1))
-            df.loc[breakout, 'Chart_Signal'] = 1
+            breakout = conds['dbb_breakout']
+            mark(breakout)
             
             if breakout.iloc[-1]: signal = "BUY"
             elif curr['Close'] > curr['BB_Up2']: signal = "HOLD"
@@ -380,21 +550,17 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
 
         elif "BNF" in strategy_type:
             entry_price = curr['Close']
-            oversold = (df['Disparity25'] <= 90) & (df['Disparity25'].shift(1) > 90)
-            df.loc[oversold, 'Chart_Signal'] = 1
+            mark(conds['bnf_oversold'])
             
-            if curr['Disparity25'] <= 90: signal = "BUY"
+            if curr['Disparity25'] <= P['bnf_disparity']: signal = "BUY"
             else: signal = "Wait"
             stop_price = curr['Close'] * 0.95
             target_price = curr['MA25']
 
         elif "스퀴즈" in strategy_type:
             entry_price = curr['Close']
-            avg_bw = df['Bandwidth'].rolling(120).mean()
-            sqz = (df['Bandwidth'] < 0.15) | (df['Bandwidth'] < avg_bw * 0.7)
-            vol = df['Volume'] > df['Volume'].rolling(20).mean() * 1.5
-            trigger = sqz & (vol) & (df['Close'] > df['MA20']) 
-            df.loc[trigger, 'Chart_Signal'] = 1
+            trigger = conds['sqz_trigger']
+            mark(trigger)
             
             if trigger.iloc[-1]: signal = "BUY"
             else: signal = "Wait"
@@ -403,8 +569,8 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
 
         elif "버핏" in strategy_type:
             entry_price = curr['Close']
-            cross_up = (df['Close'] > df['MA200']) & (df['Close'].shift(1) <= df['MA200'].shift(1))
-            df.loc[cross_up, 'Chart_Signal'] = 1
+            cross_up = conds['buffett_cross']
+            mark(cross_up)
             
             if cross_up.iloc[-1]: signal = "BUY"
             elif curr['Close'] > curr['MA200']: signal = "HOLD"
@@ -425,13 +591,51 @@ def analyze_strategy_deep_dive(df, capital_krw, usd_rate, strategy_type, ticker_
             "high20": curr['High20'], "low10": curr['Low10'], "ma200": curr['MA200'],
             "entry_price": entry_price, "stop_price": stop_price, "target_price": target_price,
             "shares": shares, "allowable_risk": allowable_risk, "total_loss": total_loss,
-            "df": df.tail(150), "strategy": strategy_type,
+            "df": (chart_df if chart_bars is None else chart_df.tail(chart_bars)) if chart_df is not None else None, "strategy": strategy_type,
             "bandwidth": curr['Bandwidth'], "disparity": curr['Disparity25'],
             "vwap_val": curr['VWAP'] if pd.notnull(curr['VWAP']) else 0,
             "applied_capital": applied_capital, "is_us": is_us
         }
     except Exception as e: return None
 
+def deep_dive_all(df, capital_krw, usd_rate, ticker_code, include_chart=True, chart_bars=150):
+    """
+    7개 전략 정밀 분석 (조건 벡터 공유). Returns: {전체 이름: 결과 또는 None}
+    현재 시세 기준 스냅샷(신호 / 수량 / 손절가)이라 백테스트 캐시에 넣지 않음
+    """
+    conds = deep_dive_conditions(df)
+    return {full_name: analyze_strategy_deep_dive(df, capital_krw, usd_rate, full_name, ticker_code, conds, include_chart, chart_bars)
+            for _, full_name in DEEP_DIVE_STRATEGIES}
+
+def batch_deep_dive(tickers, capital_krw, usd_rate, names=None, max_workers=8):
+    """
+    여러 종목 일괄 정밀 분석 (차트 생략). 일봉은 저장소 경유로 종목당 1회만 읽음
+    names: {코드: 종목명} (없으면 코드 표시)
+    Returns: 종목 x 전략 long 형식 DataFrame
+    """
+    names = names or {}
+    def job(ticker):
+        df = fetch_data(ticker)
+        if df is None or df.empty: return []
+        name = names.get(ticker, ticker)
+        rows = []
+        for (short_name, _), res in zip(DEEP_DIVE_STRATEGIES, deep_dive_all(df, capital_krw, usd_rate, ticker, include_chart=False).values()):
+            if not res: continue
+            rows.append({
+                "코드": ticker, "종목명": name, "전략": short_name, "신호": res['signal'],
+                "현재가": res['price'], "진입가": res['entry_price'], "손절가": res['stop_price'],
+                "목표가": res['target_price'], "추천수량": res['shares'], "예상손실": res['total_loss'],
+                "ATR(%)": res['atr_pct'], "is_us": res['is_us'],
+            })
+        return rows
+
+    tickers = list(dict.fromkeys(str(t) for t in tickers if t))
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(job, tickers):
+            rows.extend(result)
+    return pd.DataFrame(rows)
+
 def get_all_strategies_status(df):
     curr = df.iloc[-1]
     prev = df.iloc[-2]
@@ -456,12 +660,12 @@ def get_all_strategies_status(df):
         else: s_dbb = "HOLD"
         
     s_bnf = "Wait"
-    if curr['Disparity25'] <= 90: s_bnf = "BUY"
+    if curr['Disparity25'] <= P['bnf_disparity']: s_bnf = "BUY"
     
     s_sqz = "Wait"
     avg_bw = df['Bandwidth'].rolling(120).mean().iloc[-1]
-    is_sqz_prev = (prev['Bandwidth'] < 0.15) or (prev['Bandwidth'] < avg_bw * 0.7)
-    vol_exp = curr['Volume'] > df['Volume'].rolling(20).mean().iloc[-1] * 1.5
+    is_sqz_prev = (prev['Bandwidth'] < P['sqz_bw']) or (prev['Bandwidth'] < avg_bw * P['sqz_bw_ratio'])
+    vol_exp = curr['Volume'] > df['Volume'].rolling(20).mean().iloc[-1] * P['vol_mult']
     if is_sqz_prev and vol_exp and (curr['Close'] > prev['Close']): s_sqz = "BUY"
     
     s_buff = "Wait"
@@ -471,7 +675,7 @@ def get_all_strategies_status(df):
     
     s_vwap = "Wait"
     if pd.notnull(curr['VWAP']):
-        if abs(curr['Close'] - curr['VWAP']) / curr['VWAP'] <= 0.03:
+        if abs(curr['Close'] - curr['VWAP']) / curr['VWAP'] <= P['vwap_band']:
             s_vwap = "BUY"
         elif curr['Close'] > curr['VWAP']:
             s_vwap = "HOLD"
@@ -0,0 +1,174 @@
+import itertools
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import backtest as bt
+from strategies import DEFAULT_PARAMS
+
+# -----------------------------------------------------------------------------
+# 전략 임계값 파라미터 스윕
+# - 가격 패널은 공유 메모리에 한 번만 올리고 워커는 이름으로 붙어서 읽음 (DataFrame pickling 없음)
+# - 워커는 기본 지표 / 채널 / 선행 수익률 패널을 캐시해서 여러 작업에 재사용
+# - 앞 구간(IS) / 뒤 구간(OOS) 으로 나눠 OOS 성과로 순위
+# -----------------------------------------------------------------------------
+DEFAULT_GRID = {
+    "bnf_disparity": [85, 88, 90, 92],
+    "sqz_bw": [0.10, 0.15, 0.20],
+    "sqz_bw_ratio": [0.6, 0.7, 0.8],
+    "vol_mult": [1.3, 1.5, 2.0],
+    "vwap_band": [0.02, 0.03, 0.05],
+    "donchian_entry": [20, 55],
+    "donchian_exit": [10, 20],
+    "hold_days": [5, 10, 20],
+}
+
+# 전략별로 결과에 영향을 주는 파라미터 (보유 일수는 공통)
+STRATEGY_PARAMS = {
+    "turtle": ["donchian_entry", "donchian_exit"],
+    "elite": [],
+    "dbb": [],
+    "bnf": ["bnf_disparity"],
+    "squeeze": ["sqz_bw", "sqz_bw_ratio", "vol_mult"],
+    "buffett": [],
+    "vwap": ["vwap_band"],
+}
+
+# -----------------------------------------------------------------------------
+# 공유 메모리 패널
+# -----------------------------------------------------------------------------
+def share_panels(panels):
+    """Returns: (SharedMemory 목록 - 호출 측에서 release_panels 로 해제, 워커에 넘길 spec)"""
+    blocks = []
+    spec = {"dates": panels["dates"], "codes": panels["codes"], "arrays": {}}
+    try:
+        for col in bt.BAR_COLUMNS:
+            arr = panels[col]
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            spec["arrays"][col] = (shm.name, arr.shape, arr.dtype.str)
+    except Exception:
+        release_panels(blocks)
+        raise
+    return blocks, spec
+
+def release_panels(blocks):
+    for shm in blocks:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def attach_panels(spec):
+    """Returns: (읽기 전용 패널 dict, SharedMemory 핸들 목록 - 패널을 쓰는 동안 유지해야 함)"""
+    panels = {"dates": spec["dates"], "codes": spec["codes"]}
+    handles = []
+    for col, (name, shape, dtype) in spec["arrays"].items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        panels[col] = arr
+    return panels, handles
+
+# -----------------------------------------------------------------------------
+# 워커 (프로세스당 1회 attach, 지표 캐시)
+# -----------------------------------------------------------------------------
+_worker = {}
+
+def _init_worker(spec):
+    _worker["panels"], _worker["handles"] = attach_panels(spec)
+    _worker["cache"] = {}
+
+def _cached(key, fn):
+    cache = _worker["cache"]
+    if key not in cache: cache[key] = fn()
+    return cache[key]
+
+def worker_indicators(params):
+    """기본 지표는 1회 계산, 터틀 채널만 기간별로 캐시"""
+    panels = _worker["panels"]
+    base = _cached("base", lambda: bt.compute_indicators(panels))
+    ch = (params["donchian_entry"], params["donchian_exit"])
+    if ch == (DEFAULT_PARAMS["donchian_entry"], DEFAULT_PARAMS["donchian_exit"]): return base
+    high, low = _cached(("donchian",) + ch, lambda: bt.donchian(panels, *ch))
+    return {**base, "High20": high, "Low10": low}
+
+def worker_forward_returns(hold, exit_sig=None, exit_key=None):
+    """exit_key: 청산 신호를 구분하는 캐시 키 (예: 터틀 청산 채널 기간)"""
+    close = _worker["panels"]["Close"]
+    return _cached(("fwd", hold, exit_key), lambda: bt.forward_returns(close, hold, exit_sig))
+
+def worker_entry_and_returns(strategy, params):
+    """전략 진입 신호와 선행 수익률 패널 (영향 파라미터 조합별 캐시)"""
+    params = {**DEFAULT_PARAMS, **params}
+    key = ("sig", strategy) + tuple(params[k] for k in STRATEGY_PARAMS[strategy])
+    if key not in _worker["cache"]:
+        entry, _, _, exit_sig = bt.build_signals(_worker["panels"], worker_indicators(params), params)[strategy]
+        _worker["cache"][key] = (entry, exit_sig)
+    entry, exit_sig = _worker["cache"][key]
+    if strategy == "turtle":
+        # 터틀은 청산 채널 이탈 시 보유 기간 전에 청산
+        fwd = worker_forward_returns(params["hold_days"], exit_sig, ("turtle", params["donchian_exit"]))
+    else:
+        fwd = worker_forward_returns(params["hold_days"])
+    return entry, fwd
+
+def _eval_task(task):
+    strategy, params, split = task
+    params = {**DEFAULT_PARAMS, **params}
+    entry, fwd = worker_entry_and_returns(strategy, params)
+    # IS 구간 끝의 신호는 결과가 OOS 구간에 걸치므로 제외
+    is_n, is_win, is_mean = bt.event_stats(entry, fwd, slice(0, max(0, split - params["hold_days"])))
+    oos_n, oos_win, oos_mean = bt.event_stats(entry, fwd, slice(split, None))
+    return {"strategy": strategy, **{k: params[k] for k in STRATEGY_PARAMS[strategy] + ["hold_days"]},
+            "is_n": is_n, "is_win": is_win, "is_mean": is_mean,
+            "oos_n": oos_n, "oos_win": oos_win, "oos_mean": oos_mean}
+
+# -----------------------------------------------------------------------------
+# 스윕 실행
+# -----------------------------------------------------------------------------
+def make_tasks(grid=None, strategies=None, split=0):
+    """전략별로 영향을 주는 파라미터만 조합 (무관한 파라미터 조합은 중복 계산하지 않음)"""
+    grid = {**{k: [v] for k, v in DEFAULT_PARAMS.items()}, **(grid or DEFAULT_GRID)}
+    tasks = []
+    for strategy, keys in STRATEGY_PARAMS.items():
+        if strategies and strategy not in strategies: continue
+        keys = keys + ["hold_days"]
+        for combo in itertools.product(*(grid[k] for k in keys)):
+            tasks.append((strategy, dict(zip(keys, combo)), split))
+    return tasks
+
+def pool_executor(spec, max_workers=None):
+    """공유 패널에 붙은 워커 풀 (Streamlit 스레드와 fork 충돌을 피하려고 spawn)"""
+    workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                               initializer=_init_worker, initargs=(spec,))
+
+def run_sweep(panels, grid=None, strategies=None, oos_ratio=0.3, min_trades=30, max_workers=None):
+    """
+    grid: {파라미터: [값, ...]} (없으면 DEFAULT_GRID)
+    Returns: 전략 x 파라미터 조합별 IS/OOS 통계 DataFrame (전략별 OOS 평균수익률 순위 포함)
+    """
+    split = int(len(panels["dates"]) * (1 - oos_ratio))
+    tasks = make_tasks(grid, strategies, split)
+    if not tasks: return pd.DataFrame()
+
+    blocks, spec = share_panels(panels)
+    try:
+        with pool_executor(spec, max_workers) as executor:
+            rows = list(executor.map(_eval_task, tasks, chunksize=max(1, len(tasks) // 32)))
+    finally:
+        release_panels(blocks)
+
+    df = pd.DataFrame(rows)
+    eligible = df["oos_n"] >= min_trades
+    df["rank"] = df["oos_mean"].where(eligible).groupby(df["strategy"]).rank(ascending=False, method="min")
+    df["is_default"] = np.all([df[k].isna() | (df[k] == v) for k, v in DEFAULT_PARAMS.items() if k in df], axis=0)
+    labels = dict(bt.STRATEGIES)
+    df.insert(0, "전략", df["strategy"].map(labels))
+    return df.sort_values(["strategy", "rank"], na_position="last").reset_index(drop=True)
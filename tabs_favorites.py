@@ -1,11 +1,14 @@
 import streamlit as st
 import pandas as pd
 import yfinance as yf
+import plotly.graph_objects as go
 from datetime import datetime, date
-from concurrent.futures import ThreadPoolExecutor
 import database as db
 import data_loader as dl
+import quote_service as qs
+import portfolio
 import re
+import uuid
 
 # -----------------------------------------------------------------------------
 # [유틸리티] 포맷팅 및 파싱 함수
@@ -34,6 +37,12 @@ def parse_price(price_str):
     except:
         return 0.0
 
+def parse_prices(series):
+    """parse_price 의 벡터 버전 (Series 전체를 한 번에)"""
+    if pd.api.types.is_numeric_dtype(series): return series.astype(float).fillna(0.0)
+    clean = series.astype(str).str.replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(clean, errors="coerce").astype(float).fillna(0.0)
+
 # -----------------------------------------------------------------------------
 # 종목 검색 헬퍼 함수
 # -----------------------------------------------------------------------------
@@ -67,99 +76,157 @@ def search_stock_info(keyword):
         
     return None, None
 
-# -----------------------------------------------------------------------------
-# 시세 조회 함수
-# -----------------------------------------------------------------------------
-def fetch_prices_threaded(codes):
-    if not codes: return {}
-    results = {}
-    
-    try:
-        kospi_df = dl.get_master_data("KOSPI")
-        kosdaq_df = dl.get_master_data("KOSDAQ")
-        kospi_set = set(kospi_df['Code'].values)
-        kosdaq_set = set(kosdaq_df['Code'].values)
-    except:
-        kospi_set = set()
-        kosdaq_set = set()
-    
-    def fetch_one(code):
-        try:
-            target_ticker = code
-            if str(code).isdigit() and len(str(code)) == 6:
-                if code in kospi_set: target_ticker = f"{code}.KS"
-                elif code in kosdaq_set: target_ticker = f"{code}.KQ"
-                else: target_ticker = f"{code}.KS"
-            
-            ticker = yf.Ticker(target_ticker)
-            price = ticker.fast_info.get('last_price', 0.0)
-            
-            if (price is None or price <= 0) and str(code).isdigit() and len(str(code)) == 6:
-                alt_ticker = f"{code}.KQ" if ".KS" in target_ticker else f"{code}.KS"
-                ticker_alt = yf.Ticker(alt_ticker)
-                price = ticker_alt.fast_info.get('last_price', 0.0)
-                if price > 0: ticker = ticker_alt
-
-            if price is None or price <= 0:
-                hist = ticker.history(period='5d')
-                if not hist.empty: price = hist['Close'].iloc[-1]
-                else: price = 0.0
-            return code, price
-        except: return code, 0.0
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(fetch_one, c) for c in codes]
-        for f in futures:
-            c, p = f.result()
-            results[c] = p
-    return results
-
 # -----------------------------------------------------------------------------
 # 헬퍼: 한국 주식 여부 판별
 # -----------------------------------------------------------------------------
 def is_korean_stock(code):
     s_code = str(code)
-    if s_code.isdigit() and len(s_code) == 6: return True
+    if qs.is_kr_code(s_code): return True
     if s_code.endswith(".KS") or s_code.endswith(".KQ"): return True
     return False
 
+# -----------------------------------------------------------------------------
+# 수익률 계산 (전체 행 또는 시세가 바뀐 행만)
+# -----------------------------------------------------------------------------
+def add_return_columns(df):
+    # 일간수익률 (평균수익률): 등록기간이 0일(오늘)이면 1로 나누어 에러 방지
+    buy = pd.to_numeric(df["매수가"], errors="coerce").fillna(0.0)
+    df["수익률(%)"], df["일간수익률(%)"] = portfolio.position_pnl(buy, df["현재가_숫자"], df["등록기간(일)"])
+    return df
+
+# -----------------------------------------------------------------------------
+# 포트폴리오 분석 (원화 환산 손익, 변동성, 상관관계, 낙폭, VaR)
+# -----------------------------------------------------------------------------
+def render_portfolio_analysis(df):
+    with st.expander("📐 포트폴리오 분석", expanded=False):
+        usd_rate = st.session_state.get("usd_rate", 1400.0)
+        buy = pd.to_numeric(df["매수가"], errors="coerce").fillna(0.0)
+        totals = portfolio.krw_totals(buy, df["현재가_숫자"], df["is_kr"], usd_rate)
+
+        st.caption(f"종목당 1주 보유 기준 · USD/KRW {usd_rate:.1f}원 · 매수가/시세가 있는 {totals['count']}개 종목")
+        m1, m2, m3 = st.columns(3)
+        m1.metric("총 매수금액", f"₩{totals['cost']:,.0f}")
+        m2.metric("총 평가금액", f"₩{totals['value']:,.0f}")
+        m3.metric("평가손익", f"₩{totals['pnl']:,.0f}", f"{totals['ret_pct']:.2f}%")
+
+        c_days, c_ref = st.columns([3, 1])
+        days = c_days.select_slider("분석 기간", options=[90, 180, 365, 730], value=365,
+                                    format_func=lambda x: f"{x}일", key="pf_days")
+        refresh = c_ref.button("📥 일봉 갱신", key="pf_refresh", help="저장소에 없는 최근 일봉을 받아옵니다.")
+        if refresh:
+            with st.spinner("일봉 갱신 중..."):
+                panel = portfolio.load_close_panel(df["코드"], days, refresh=True)
+        else:
+            panel = portfolio.load_close_panel(df["코드"], days)
+
+        risk = portfolio.risk_metrics(panel)
+        if risk is None:
+            st.info("저장된 일봉이 부족합니다. '📥 일봉 갱신'을 눌러주세요.")
+            return
+
+        r1, r2, r3 = st.columns(3)
+        r1.metric("최대 낙폭 (MDD)", f"{risk['mdd']:.2f}%")
+        r2.metric("1일 VaR 95%", f"{risk['var'][95]:.2f}%")
+        r3.metric("1일 VaR 99%", f"{risk['var'][99]:.2f}%")
+        st.caption("위험 지표는 동일 비중 포트폴리오의 과거 일간 수익률 기준입니다.")
+
+        st.markdown("###### 📉 낙폭 추이 (%)")
+        st.area_chart(risk["drawdown"], height=200)
+
+        names = df.set_index("코드")["종목명"]
+        vol_df = pd.DataFrame({
+            "종목명": names.reindex(risk["codes"]).values,
+            "연 변동성(%)": risk["vol"].values,
+        }, index=risk["codes"]).sort_values("연 변동성(%)", ascending=False)
+        st.markdown("###### 🌪️ 종목별 변동성")
+        st.dataframe(vol_df, column_config={"연 변동성(%)": st.column_config.NumberColumn(format="%.1f%%")},
+                     use_container_width=True)
+
+        st.markdown("###### 🔗 상관관계")
+        corr = risk["corr"]
+        fig = go.Figure(go.Heatmap(z=corr.values, x=corr.columns, y=corr.index, zmin=-1, zmax=1,
+                                   colorscale="RdBu_r", text=corr.round(2).values, texttemplate="%{text}"))
+        fig.update_layout(height=max(300, 28 * len(corr)), margin=dict(l=10, r=10, t=10, b=10))
+        st.plotly_chart(fig, use_container_width=True)
+
+# -----------------------------------------------------------------------------
+# 실시간 모드: 폴러가 갱신한 공용 캐시에서 바뀐 종목만 반영 (세션별 네트워크 조회 없음)
+# - 표시용 표(포맷 완료)를 세션에 두고 주기마다 바뀐 종목 행만 다시 계산해 덮어씀
+# -----------------------------------------------------------------------------
+LIVE_COLUMNS = ["종목명", "매수가", "현재가", "수익률(%)", "등록기간(일)", "일간수익률(%)"]
+
+def live_session_id():
+    return st.session_state.setdefault("fav_live_sid", uuid.uuid4().hex)
+
+def render_live_table(df, since_seq, cadence):
+    base = df[["코드", "종목명", "매수가", "현재가_숫자", "등록기간(일)", "수익률(%)", "일간수익률(%)"]].copy()
+    base["is_kr"] = base["코드"].apply(is_korean_stock)
+    base = base.set_index("코드")
+    show = base.copy()
+    show["매수가"] = [format_price(v, kr) for v, kr in zip(base["매수가"], base["is_kr"])]
+    show["현재가"] = [format_price(v, kr) for v, kr in zip(base["현재가_숫자"], base["is_kr"])]
+    st.session_state["fav_live"] = {"df": base, "show": show[LIVE_COLUMNS].copy(), "seq": since_seq}
+    sid = live_session_id()
+
+    @st.fragment(run_every=cadence)
+    def live_view():
+        qs.start_live_poller(sid, cadence)  # 세션 유지 신호
+        state = st.session_state["fav_live"]
+        live_df, show = state["df"], state["show"]
+        changed, state["seq"] = qs.changed_since(live_df.index, state["seq"])
+        if changed:
+            idx = list(changed.keys())
+            live_df.loc[idx, "현재가_숫자"] = pd.Series(changed)
+            rows = add_return_columns(live_df.loc[idx].copy())
+            live_df.loc[idx] = rows
+            show.loc[idx, "현재가"] = [format_price(v, kr) for v, kr in zip(rows["현재가_숫자"], rows["is_kr"])]
+            show.loc[idx, ["수익률(%)", "일간수익률(%)"]] = rows[["수익률(%)", "일간수익률(%)"]]
+
+        st.dataframe(
+            show,
+            column_config={
+                "_index": st.column_config.TextColumn("코드"),
+                "수익률(%)": st.column_config.NumberColumn("수익률", format="%.2f%%"),
+                "등록기간(일)": st.column_config.NumberColumn("기간(일)", format="%d일"),
+                "일간수익률(%)": st.column_config.NumberColumn("일간수익률", format="%.2f%%"),
+            },
+            use_container_width=True
+        )
+        st.caption(f"⏱ {datetime.now():%H:%M:%S} 기준 · 이번 갱신에서 {len(changed)}개 종목 시세 변경 · 장 운영 시간에만 갱신됩니다.")
+
+    live_view()
+
 # -----------------------------------------------------------------------------
 # DB 업데이트 공통 함수
+# - 편집본과 원본을 코드 기준으로 한 번 조인해서 변경분(삭제/매수가/등록일)만 계산
+# - 계산된 변경분은 1개 트랜잭션으로 반영
 # -----------------------------------------------------------------------------
+def diff_favorites(edited_df, original_df):
+    """Returns: (삭제 코드 목록, [(코드, 매수가)], [(코드, 'YYYY-MM-DD')])"""
+    deletes = edited_df.loc[edited_df["선택"] == True, "코드"].tolist()
+
+    merged = edited_df[["코드", "선택", "매수가", "관심등록일"]].merge(
+        original_df[["코드", "매수가", "관심등록일"]], on="코드", how="inner", suffixes=("", "_orig"))
+    merged = merged[merged["선택"] != True]
+
+    new_price = parse_prices(merged["매수가"])
+    price_changed = (new_price - parse_prices(merged["매수가_orig"])).abs() > 0.001
+    price_updates = list(zip(merged.loc[price_changed, "코드"], new_price[price_changed]))
+
+    # 비워 두거나 잘못 입력한 날짜는 NULL 로 저장하지 않고 기존 날짜 유지
+    new_date = pd.to_datetime(merged["관심등록일"], errors="coerce")
+    date_changed = new_date.notna() & (new_date != pd.to_datetime(merged["관심등록일_orig"]))
+    date_updates = list(zip(merged.loc[date_changed, "코드"], new_date[date_changed].dt.strftime("%Y-%m-%d")))
+    return deletes, price_updates, date_updates
+
 def process_db_updates(user, edited_df, original_df):
-    changes = False
-    
-    # 삭제 처리
-    to_delete = edited_df[edited_df["선택"] == True]
-    if not to_delete.empty:
-        for c in to_delete["코드"]:
-            db.remove_favorite(user, c)
-            if "fav_prices" in st.session_state and c in st.session_state["fav_prices"]:
-                del st.session_state["fav_prices"][c]
-        st.success(f"{len(to_delete)}개 종목이 삭제되었습니다.")
-        changes = True
-
-    # 수정 처리
-    for idx, row in edited_df.iterrows():
-        orig_rows = original_df[original_df['코드'] == row['코드']]
-        if orig_rows.empty: continue
-        orig_row = orig_rows.iloc[0]
-
-        # 매수가 변경 (파싱 필요)
-        new_price_val = parse_price(row["매수가"])
-        orig_price_val = parse_price(orig_row["매수가"])
-        
-        if abs(new_price_val - orig_price_val) > 0.001:
-            db.update_favorite_price(user, row["코드"], new_price_val)
-            changes = True
-        
-        # 등록일 변경
-        if row["관심등록일"] != orig_row["관심등록일"]:
-            new_date_str = row["관심등록일"].strftime("%Y-%m-%d")
-            db.update_favorite_date(user, row["코드"], new_date_str)
-            changes = True
-            
-    return changes
+    deletes, price_updates, date_updates = diff_favorites(edited_df, original_df)
+    if not (deletes or price_updates or date_updates): return False
+
+    db.apply_favorite_changes(user, deletes, price_updates, date_updates)
+    if deletes:
+        st.success(f"{len(deletes)}개 종목이 삭제되었습니다.")
+    return True
 
 # -----------------------------------------------------------------------------
 # 메인 실행 함수
@@ -181,7 +248,6 @@ def run():
                 if found_code:
                     db.add_favorite(user, found_code, name=found_name, price=new_price, strategies="Manual")
                     st.success(f"✅ 등록 완료: {found_name} ({found_code})")
-                    if "fav_prices" in st.session_state: del st.session_state["fav_prices"]
                     st.rerun()
                 else:
                     st.error(f"❌ '{input_keyword}' 종목을 찾을 수 없습니다.")
@@ -201,22 +267,22 @@ def run():
         except: return date.today()
     df["관심등록일"] = df["관심등록일"].apply(parse_date)
 
-    # 3. 시세 조회
-    if "fav_prices" not in st.session_state: st.session_state["fav_prices"] = {}
+    # 3. 시세 조회 (프로세스 공용 시세 서비스: TTL 캐시 + 묶음 조회 + 세션 간 요청 병합)
     codes = df["코드"].tolist()
-    need_fetch = any(c not in st.session_state["fav_prices"] for c in codes)
+    since_seq = qs.current_seq()
     
-    c_ref, _ = st.columns([1, 5])
+    c_ref, c_live, c_cad, _ = st.columns([1, 1, 1, 3])
+    live_mode = c_live.toggle("⚡ 실시간 모드", value=False, key="fav_live_mode")
+    cadence = c_cad.selectbox("갱신 주기", [10, 30, 60], index=1, format_func=lambda x: f"{x}초",
+                              key="fav_live_cadence", disabled=not live_mode, label_visibility="collapsed")
     if c_ref.button("🔄 시세 새로고침"):
         with st.spinner("최신 시세 조회 중..."):
-            new_prices = fetch_prices_threaded(codes)
-            st.session_state["fav_prices"].update(new_prices)
-    elif need_fetch:
+            prices = qs.get_prices(codes, max_age=0)
+    else:
         with st.spinner("데이터 로딩 중..."):
-            new_prices = fetch_prices_threaded(codes)
-            st.session_state["fav_prices"].update(new_prices)
+            prices = qs.get_prices(codes)
 
-    df["현재가_숫자"] = df["코드"].map(st.session_state["fav_prices"]).fillna(0.0)
+    df["현재가_숫자"] = df["코드"].map(prices).fillna(0.0)
 
     # 4. 계산 로직 (수익률, 기간, 일간수익률)
     today = date.today()
@@ -224,19 +290,16 @@ def run():
     # (1) 등록기간(일) 계산
     df['등록기간(일)'] = df['관심등록일'].apply(lambda d: (today - d).days)
     
-    # (2) 수익률 계산
-    def calc_return(row):
-        try:
-            cp = float(row["현재가_숫자"])
-            bp = float(row["매수가"])
-            if bp > 0 and cp > 0: return ((cp - bp) / bp) * 100
-        except: pass
-        return 0.0
-    df["수익률(%)"] = df.apply(calc_return, axis=1)
-    
-    # (3) 일간수익률 (평균수익률) 계산
-    # 등록기간이 0일(오늘)이면 1로 나누어 에러 방지
-    df['일간수익률(%)'] = df.apply(lambda x: x['수익률(%)'] / max(1, x['등록기간(일)']), axis=1)
+    # (2) 수익률 / 일간수익률 계산
+    df = add_return_columns(df)
+
+    if live_mode:
+        qs.start_live_poller(live_session_id(), cadence)
+        st.info("실시간 모드에서는 편집이 비활성화됩니다. 편집하려면 실시간 모드를 끄세요.")
+        render_live_table(df, since_seq, cadence)
+        return
+
+    qs.stop_live_poller(live_session_id())
 
     # 5. 국가별 분리 및 포맷팅
     df['is_kr'] = df['코드'].apply(is_korean_stock)
@@ -329,4 +392,7 @@ def run():
 
         if st.button("💾 해외주식 변경사항 저장", key="btn_save_us"):
             if process_db_updates(user, edited_us, df_us):
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+    st.divider()
+    render_portfolio_analysis(df)
\ No newline at end of file
@@ -1,44 +1,334 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import database as db
 import data_loader as dl
 import strategies as st_algo
 import ui_components as ui
+import outcomes
+import history_store
+import quote_service as qs
+import backtest
+import sweep
+import walkforward
 
-def fetch_current_prices_batch(codes_markets):
-    results = {}
-    if not codes_markets: return results
+# -----------------------------------------------------------------------------
+# 일괄 정밀 분석: 관심종목(또는 입력 목록) 전체를 한 번에 → 종목 x 전략 매트릭스
+# -----------------------------------------------------------------------------
+SIGNAL_ORDER = {"BUY": 0, "BUY (지지권)": 0, "EXIT": 1, "HOLD": 2, "Wait": 3, "관망": 3, "N/A": 4}
 
-    def fetch_one(code, market):
-        try:
-            ticker = code
-            if str(code).isdigit(): 
-                ticker = f"{code}.KS" if market == "KOSPI" else f"{code}.KQ"
-            
-            yf_ticker = yf.Ticker(ticker)
-            price = yf_ticker.fast_info.get('last_price', 0.0)
-            
-            if price <= 0 and str(code).isdigit():
-                alt_ticker = f"{code}.KQ" if ".KS" in ticker else f"{code}.KS"
-                price = yf.Ticker(alt_ticker).fast_info.get('last_price', 0.0)
-                
-            return code, price
-        except: return code, 0.0
+def run_batch_lab():
+    with st.form("strategy_lab_batch_form"):
+        c1, c2 = st.columns(2)
+        b_source = c1.radio("대상", ["관심종목 전체", "직접 입력"], horizontal=True, key="lab_batch_source")
+        b_input = c1.text_area("직접 입력 (쉼표/줄바꿈 구분, 종목명 또는 티커)", value="", height=80, key="lab_batch_input")
+        b_capital = c2.number_input("총 운용금 (원)", value=10000000, step=100000, key="lab_batch_capital")
+        b_submitted = st.form_submit_button("🧮 일괄 분석 실행", type="primary", use_container_width=True)
+
+    if b_submitted:
+        names = {}
+        if b_source == "관심종목 전체":
+            for item in db.get_favorites(st.session_state["username"]):
+                names[str(item[0])] = item[4] or str(item[0])
+        else:
+            for kw in [k.strip() for k in b_input.replace("\n", ",").split(",") if k.strip()]:
+                code = dl.search_code_by_name(kw) or kw
+                names[str(code)] = dl.get_stock_name(code)
+
+        if not names: st.warning("분석할 종목이 없습니다.")
+        else:
+            t0 = datetime.now()
+            with st.spinner(f"{len(names)}개 종목 x {len(st_algo.DEEP_DIVE_STRATEGIES)}개 전략 분석 중..."):
+                st.session_state['lab_batch_result'] = st_algo.batch_deep_dive(
+                    list(names.keys()), b_capital, st.session_state["usd_rate"], names=names)
+            st.toast(f"{len(names)}개 종목 분석 완료 ({(datetime.now() - t0).total_seconds():.1f}초)", icon="🧮")
+
+    df_res = st.session_state.get('lab_batch_result')
+    if df_res is None: return
+    if df_res.empty:
+        st.warning("데이터를 불러온 종목이 없습니다.")
+        return
+
+    st.markdown("#### 🗺️ 신호 매트릭스")
+    short_names = [s for s, _ in st_algo.DEEP_DIVE_STRATEGIES]
+    matrix = df_res.pivot_table(index=["코드", "종목명"], columns="전략", values="신호", aggfunc="first")
+    matrix = matrix.reindex(columns=[s for s in short_names if s in matrix.columns])
+    matrix.insert(0, "BUY 수", matrix.apply(lambda col: col.str.startswith("BUY", na=False)).sum(axis=1))
+    st.dataframe(matrix.sort_values("BUY 수", ascending=False).reset_index(), hide_index=True, use_container_width=True)
+
+    st.markdown("#### 📋 신호 / 포지션 사이징 상세")
+    f1, f2 = st.columns(2)
+    sel_signals = f1.multiselect("신호 필터", sorted(df_res["신호"].unique(), key=lambda x: SIGNAL_ORDER.get(x, 9)),
+                                 default=[s for s in df_res["신호"].unique() if s.startswith("BUY")], key="lab_batch_sig")
+    sel_strats = f2.multiselect("전략 필터", short_names, default=short_names, key="lab_batch_strat")
+    view = df_res[df_res["신호"].isin(sel_signals) & df_res["전략"].isin(sel_strats)].copy()
+    view["_order"] = view["신호"].map(SIGNAL_ORDER).fillna(9)
+    view = view.sort_values(["_order", "ATR(%)"]).drop(columns=["_order", "is_us"])
+    st.dataframe(
+        view,
+        column_config={
+            "현재가": st.column_config.NumberColumn(format="%.2f"),
+            "진입가": st.column_config.NumberColumn(format="%.2f"),
+            "손절가": st.column_config.NumberColumn(format="%.2f"),
+            "목표가": st.column_config.NumberColumn(format="%.2f"),
+            "추천수량": st.column_config.NumberColumn(format="%d주"),
+            "예상손실": st.column_config.NumberColumn(format="%.0f"),
+            "ATR(%)": st.column_config.NumberColumn(format="%.2f%%"),
+        },
+        hide_index=True, use_container_width=True
+    )
+    st.caption("가격/손실금은 각 종목의 현지 통화 기준입니다. 차트는 개별 종목 정밀 분석 탭에서 확인하세요.")
+
+# -----------------------------------------------------------------------------
+# 전체 기간 백체크: 모든 스캔 날짜를 한 번에 집계 → 전략별 승률/수익률/포착 수 추이
+# -----------------------------------------------------------------------------
+def run_full_backcheck(available_dates):
+    c1, c2, c3 = st.columns([1, 1, 2])
+    horizon = c1.selectbox("보유 기간 (거래일)", list(outcomes.HORIZONS), index=1, format_func=lambda h: f"{h}일", key="bc_full_h")
+    smooth = c2.selectbox("이동 평균", [1, 5, 20], index=1, format_func=lambda x: "없음" if x == 1 else f"{x}회", key="bc_full_smooth")
+    date_range = c3.select_slider("기간", options=sorted(available_dates),
+                                  value=(min(available_dates), max(available_dates)), key="bc_full_range")
+    
+    if c1.button("🔄 성과 데이터 갱신", key="bc_full_refresh"):
+        with st.spinner("모든 스캔 날짜의 미완료 성과를 계산 중..."):
+            n_new = outcomes.evaluate_pending_outcomes()
+        st.toast(f"{n_new}건의 성과가 새로 기록되었습니다.", icon="📡")
+
+    ts = history_store.backcheck_timeseries(date_range[0], date_range[1])
+    if ts.empty:
+        st.caption("선택한 기간에 기록이 없습니다.")
+        return
+    
+    all_strats = sorted(ts["strategy_name"].unique())
+    sel = st.multiselect("전략", all_strats, default=all_strats, key="bc_full_strats")
+    ts = ts[ts["strategy_name"].isin(sel)]
+    ts_h = ts[ts["horizon"] == horizon]
+    
+    # 전략 x 호라이즌 요약 (건수 가중)
+    summary = ts.groupby(["strategy_name", "horizon"]).agg(hits=("hits", "sum"), n=("n", "sum"), wins=("wins", "sum"), sum_ret=("sum_ret", "sum"))
+    summary["승률(%)"] = summary["wins"] / summary["n"].where(summary["n"] > 0) * 100
+    summary["평균수익률(%)"] = summary["sum_ret"] / summary["n"].where(summary["n"] > 0)
+    summary = summary.reset_index().rename(columns={"strategy_name": "전략", "horizon": "보유(일)", "hits": "포착 수", "n": "결과 건수"})
+    st.markdown(f"#### 📋 전략별 요약 ({date_range[0]} ~ {date_range[1]}, {len(ts_h['scan_date'].unique())}개 스캔일)")
+    st.dataframe(summary[["전략", "보유(일)", "포착 수", "결과 건수", "승률(%)", "평균수익률(%)"]],
+                 column_config={"승률(%)": st.column_config.NumberColumn(format="%.1f%%"),
+                                "평균수익률(%)": st.column_config.NumberColumn(format="%.2f%%")},
+                 hide_index=True, use_container_width=True)
+
+    def series(col, weighted=True):
+        if weighted:
+            # 이동 평균도 건수 가중: 구간 합계 비율
+            num = ts_h.pivot_table(index="scan_date", columns="strategy_name", values=col, aggfunc="sum").rolling(smooth, min_periods=1).sum()
+            den = ts_h.pivot_table(index="scan_date", columns="strategy_name", values="n", aggfunc="sum").rolling(smooth, min_periods=1).sum()
+            out = num / den.where(den > 0)
+            return out * 100 if col == "wins" else out
+        return ts_h.pivot_table(index="scan_date", columns="strategy_name", values=col, aggfunc="sum").rolling(smooth, min_periods=1).mean()
+
+    st.markdown(f"#### 📈 승률 추이 ({horizon}일 보유, %)")
+    st.line_chart(series("wins"), height=260)
+    st.markdown(f"#### 💹 평균 수익률 추이 ({horizon}일 보유, %)")
+    st.line_chart(series("sum_ret"), height=260)
+    st.markdown("#### 🎯 포착 수 추이")
+    st.line_chart(series("hits", weighted=False), height=220)
+
+# -----------------------------------------------------------------------------
+# 포트폴리오 백테스트: 저장소 전 종목 x 다년도, 전략별 자산곡선 / CAGR / Sharpe / MDD
+# -----------------------------------------------------------------------------
+def _universe_codes(market):
+    codes = db.get_bar_codes()
+    is_kr = [qs.is_kr_code(c) for c in codes]
+    return [c for c, kr in zip(codes, is_kr) if kr == (market == "🇰🇷 국내")]
+
+def _load_universe_panels(market, years):
+    codes = _universe_codes(market)
+    if not codes: return None
+    start = (datetime.now() - pd.Timedelta(days=int(365 * years))).strftime("%Y-%m-%d")
+    return backtest.load_panels(codes, start)
+
+def run_backtest_lab():
+    with st.form("strategy_lab_bt_form"):
+        c1, c2, c3 = st.columns(3)
+        bt_market = c1.radio("유니버스", ["🇰🇷 국내", "🇺🇸 해외"], horizontal=True, key="lab_bt_market")
+        bt_years = c1.selectbox("기간 (년)", [1, 2, 3, 5], index=2, key="lab_bt_years")
+        bt_capital = c2.number_input("초기 자본 (현지 통화)", value=10000000, step=1000000, key="lab_bt_capital")
+        bt_hold = c2.number_input("최대 보유일", value=20, min_value=1, max_value=120, key="lab_bt_hold")
+        bt_risk = c3.number_input("거래당 리스크 (%)", value=2.0, min_value=0.1, max_value=10.0, step=0.5, key="lab_bt_risk")
+        bt_fee = c3.number_input("편도 비용 (%)", value=0.15, min_value=0.0, max_value=2.0, step=0.05, key="lab_bt_fee")
+        bt_extend = st.checkbox("부족한 과거 일봉을 먼저 수집 (네트워크, 종목 수에 비례해 오래 걸림)", value=False, key="lab_bt_extend")
+        bt_submitted = st.form_submit_button("🧪 백테스트 실행", type="primary", use_container_width=True)
+
+    if bt_submitted:
+        codes = _universe_codes(bt_market)
+        if not codes:
+            st.warning("일봉 저장소에 해당 시장 종목이 없습니다. 먼저 스캐너를 실행하세요.")
+        else:
+            if bt_extend:
+                with st.spinner(f"{len(codes)}개 종목 과거 일봉 수집 중..."):
+                    backtest.extend_history(codes, bt_years)
+            t0 = datetime.now()
+            with st.spinner(f"{len(codes)}개 종목 x {len(backtest.STRATEGIES)}개 전략 시뮬레이션 중..."):
+                panels = _load_universe_panels(bt_market, bt_years)
+                results = backtest.run_backtest(panels, capital=bt_capital, risk_pct=bt_risk / 100,
+                                                max_hold=int(bt_hold), fee_rate=bt_fee / 100) if panels else {}
+            st.session_state['lab_bt_result'] = {
+                'results': results, 'n_codes': len(panels["codes"]) if panels else 0,
+                'elapsed': (datetime.now() - t0).total_seconds(), 'capital': bt_capital,
+            }
+
+    pack = st.session_state.get('lab_bt_result')
+    if not pack: return
+    results = pack['results']
+    if not results:
+        st.warning("시뮬레이션할 일봉 데이터가 없습니다.")
+        return
+
+    st.caption(f"{pack['n_codes']}개 종목 · {pack['elapsed']:.1f}초 · 신호일 종가 진입, 손절/목표는 정밀 분석 규칙, 종목당 1포지션")
+    summary = pd.DataFrame([{
+        "전략": name, "CAGR(%)": r["cagr"], "Sharpe": r["sharpe"], "MDD(%)": r["mdd"],
+        "거래 수": r["trades"], "승률(%)": r["win_rate"], "평균 거래수익률(%)": r["avg_trade"],
+        "최종 자산": r["equity"].iloc[-1],
+    } for name, r in results.items()]).sort_values("Sharpe", ascending=False)
+    st.dataframe(summary, column_config={
+        "CAGR(%)": st.column_config.NumberColumn(format="%.2f%%"),
+        "Sharpe": st.column_config.NumberColumn(format="%.2f"),
+        "MDD(%)": st.column_config.NumberColumn(format="%.2f%%"),
+        "승률(%)": st.column_config.NumberColumn(format="%.1f%%"),
+        "평균 거래수익률(%)": st.column_config.NumberColumn(format="%.2f%%"),
+        "최종 자산": st.column_config.NumberColumn(format="%.0f"),
+    }, hide_index=True, use_container_width=True)
+
+    st.markdown("#### 📈 자산 곡선")
+    st.line_chart(pd.DataFrame({name: r["equity"] for name, r in results.items()}), height=320)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(fetch_one, c, m) for c, m in codes_markets]
-        for f in futures:
-            c, p = f.result()
-            results[c] = p
-    return results
+# -----------------------------------------------------------------------------
+# 파라미터 스윕: 임계값 격자를 유니버스 x 기간 전체에서 평가, OOS 성과로 순위
+# -----------------------------------------------------------------------------
+SWEEP_PARAM_LABELS = {
+    "bnf_disparity": "BNF 이격도 ≤", "sqz_bw": "스퀴즈 밴드폭 <", "sqz_bw_ratio": "스퀴즈 평균 대비 <",
+    "vol_mult": "거래량 배수 >", "vwap_band": "VWAP 밴드", "donchian_entry": "터틀 돌파 채널",
+    "donchian_exit": "터틀 청산 채널", "hold_days": "보유 일수",
+}
+
+def run_sweep_lab():
+    st.caption("신호일 종가 진입 → 보유 일수 뒤 종가 기준(터틀은 청산 채널 이탈 시 조기 청산). 앞 구간(IS)에서 고른 값이 뒤 구간(OOS)에서도 통하는지 봅니다.")
+    with st.form("strategy_lab_sweep_form"):
+        c1, c2, c3 = st.columns(3)
+        sw_market = c1.radio("유니버스", ["🇰🇷 국내", "🇺🇸 해외"], horizontal=True, key="lab_sw_market")
+        sw_years = c1.selectbox("기간 (년)", [1, 2, 3, 5], index=2, key="lab_sw_years")
+        sw_oos = c2.slider("OOS 비율 (%)", 10, 50, 30, step=5, key="lab_sw_oos")
+        sw_min = c2.number_input("최소 OOS 신호 수", value=30, min_value=1, key="lab_sw_min")
+        labels = dict(backtest.STRATEGIES)
+        sw_strats = c3.multiselect("전략", list(labels.keys()), default=list(labels.keys()),
+                                   format_func=lambda k: labels[k], key="lab_sw_strats")
+        grid = {}
+        with st.expander("격자 값 편집 (쉼표 구분)", expanded=False):
+            g_cols = st.columns(4)
+            for i, (k, vals) in enumerate(sweep.DEFAULT_GRID.items()):
+                raw = g_cols[i % 4].text_input(SWEEP_PARAM_LABELS[k], ", ".join(str(v) for v in vals), key=f"lab_sw_grid_{k}")
+                try: grid[k] = [type(vals[0])(x.strip()) for x in raw.split(",") if x.strip()] or vals
+                except ValueError: grid[k] = vals
+        sw_submitted = st.form_submit_button("🎛️ 스윕 실행", type="primary", use_container_width=True)
+
+    if sw_submitted:
+        panels = _load_universe_panels(sw_market, sw_years)
+        if not panels:
+            st.warning("일봉 저장소에 해당 시장 종목이 없습니다. 먼저 스캐너/백테스트에서 일봉을 수집하세요.")
+        else:
+            n_tasks = len(sweep.make_tasks(grid, sw_strats))
+            t0 = datetime.now()
+            with st.spinner(f"{len(panels['codes'])}개 종목 x {n_tasks}개 조합 평가 중 (병렬)..."):
+                res = sweep.run_sweep(panels, grid, sw_strats, oos_ratio=sw_oos / 100, min_trades=int(sw_min))
+            st.session_state['lab_sweep_result'] = {'df': res, 'elapsed': (datetime.now() - t0).total_seconds(),
+                                                    'n_codes': len(panels['codes'])}
+
+    pack = st.session_state.get('lab_sweep_result')
+    if not pack or pack['df'].empty: return
+    df = pack['df']
+    st.caption(f"{pack['n_codes']}개 종목 · {len(df)}개 조합 · {pack['elapsed']:.1f}초")
+
+    st.markdown("#### 🏆 전략별 OOS 1위 vs 기본값")
+    param_cols = [k for k in sweep.DEFAULT_GRID if k in df.columns]
+    best = df[(df["rank"] == 1) | df["is_default"]].copy()
+    best["구분"] = best["is_default"].map({True: "기본값", False: "OOS 1위"})
+    best.loc[(best["rank"] == 1) & best["is_default"], "구분"] = "기본값 = 1위"
+    stat_cfg = {
+        "is_win": st.column_config.NumberColumn("IS 승률", format="%.1f%%"),
+        "is_mean": st.column_config.NumberColumn("IS 평균", format="%.2f%%"),
+        "oos_win": st.column_config.NumberColumn("OOS 승률", format="%.1f%%"),
+        "oos_mean": st.column_config.NumberColumn("OOS 평균", format="%.2f%%"),
+        "is_n": st.column_config.NumberColumn("IS 건수"), "oos_n": st.column_config.NumberColumn("OOS 건수"),
+        **{k: st.column_config.NumberColumn(SWEEP_PARAM_LABELS[k]) for k in param_cols},
+    }
+    st.dataframe(best[["전략", "구분"] + param_cols + ["is_n", "is_win", "is_mean", "oos_n", "oos_win", "oos_mean"]],
+                 column_config=stat_cfg, hide_index=True, use_container_width=True)
+
+    with st.expander("📋 전체 조합", expanded=False):
+        st.dataframe(df[["전략", "rank"] + param_cols + ["is_n", "is_win", "is_mean", "oos_n", "oos_win", "oos_mean"]],
+                     column_config={"rank": st.column_config.NumberColumn("순위", format="%d"), **stat_cfg},
+                     hide_index=True, use_container_width=True)
+
+# -----------------------------------------------------------------------------
+# 워크포워드: 학습/검증 창을 굴려가며 검증 구간 성과의 안정성 확인
+# -----------------------------------------------------------------------------
+def run_walkforward_lab():
+    st.caption("스캔 결과의 '과거승률'은 신호를 만든 같은 1년에서 계산한 값입니다. 여기서는 학습 구간 이후의 검증 구간 성과만 모아 창마다 얼마나 일정한지 봅니다.")
+    with st.form("strategy_lab_wf_form"):
+        c1, c2, c3 = st.columns(3)
+        wf_market = c1.radio("유니버스", ["🇰🇷 국내", "🇺🇸 해외"], horizontal=True, key="lab_wf_market")
+        wf_years = c1.selectbox("기간 (년)", [2, 3, 5], index=1, key="lab_wf_years")
+        wf_train = c2.number_input("학습 창 (거래일)", value=252, min_value=60, step=21, key="lab_wf_train")
+        wf_test = c2.number_input("검증 창 (거래일)", value=63, min_value=10, step=21, key="lab_wf_test")
+        wf_mode = c3.radio("평가 대상", ["기본 파라미터", "스윕 격자에서 창마다 선택"], key="lab_wf_mode")
+        wf_min = c3.number_input("최소 학습 신호 수", value=20, min_value=1, key="lab_wf_min")
+        wf_submitted = st.form_submit_button("🚶 워크포워드 실행", type="primary", use_container_width=True)
+
+    if wf_submitted:
+        panels = _load_universe_panels(wf_market, wf_years)
+        if not panels:
+            st.warning("일봉 저장소에 해당 시장 종목이 없습니다. 먼저 스캐너/백테스트에서 일봉을 수집하세요.")
+        else:
+            t0 = datetime.now()
+            try:
+                with st.spinner("창별 병렬 평가 중..."):
+                    df, summary = walkforward.run_walkforward(
+                        panels, int(wf_train), int(wf_test), optimize=(wf_mode != "기본 파라미터"), min_trades=int(wf_min))
+                st.session_state['lab_wf_result'] = {'df': df, 'summary': summary,
+                                                     'elapsed': (datetime.now() - t0).total_seconds()}
+            except ValueError as e:
+                st.session_state.pop('lab_wf_result', None)
+                st.warning(str(e))
+
+    pack = st.session_state.get('lab_wf_result')
+    if not pack: return
+    df, summary = pack['df'], pack['summary']
+
+    st.caption(f"{df['window'].nunique()}개 창 · {pack['elapsed']:.1f}초")
+    st.markdown("#### 🧭 전략별 안정성 (검증 구간)")
+    st.dataframe(summary.rename(columns={
+        "windows": "창 수", "test_n": "검증 신호 수", "win_mean": "승률 평균", "win_std": "승률 편차",
+        "ret_mean": "수익률 평균", "ret_std": "수익률 편차", "positive_pct": "수익 창 비율",
+        "decay": "학습 대비 하락", "stability": "안정성(평균/편차)"}),
+        column_config={
+            "승률 평균": st.column_config.NumberColumn(format="%.1f%%"), "승률 편차": st.column_config.NumberColumn(format="%.1f"),
+            "수익률 평균": st.column_config.NumberColumn(format="%.2f%%"), "수익률 편차": st.column_config.NumberColumn(format="%.2f"),
+            "수익 창 비율": st.column_config.NumberColumn(format="%.0f%%"), "학습 대비 하락": st.column_config.NumberColumn(format="%.2f%%p"),
+            "안정성(평균/편차)": st.column_config.NumberColumn(format="%.2f"),
+        }, hide_index=True, use_container_width=True)
+
+    st.markdown("#### 📈 검증 구간별 승률 (%)")
+    st.line_chart(df.pivot_table(index="test_start", columns="전략", values="test_win"), height=260)
+    st.markdown("#### 💹 검증 구간별 평균 수익률 (%)")
+    st.line_chart(df.pivot_table(index="test_start", columns="전략", values="test_mean"), height=260)
+
+    with st.expander("📋 창별 상세", expanded=False):
+        view = df.drop(columns=["strategy"]).copy()
+        view["params"] = view["params"].apply(lambda p: ", ".join(f"{k}={v}" for k, v in p.items()) or "기본값")
+        st.dataframe(view, hide_index=True, use_container_width=True)
 
 def run():
     st.header("🔬 전략 연구소 (Strategy Lab)")
     
-    tab1, tab2 = st.tabs(["🔍 개별 종목 정밀 분석", "📊 전략 성과(승률) 추적"])
+    tab1, tab_batch, tab_bt, tab_sweep, tab_wf, tab2 = st.tabs(["🔍 개별 종목 정밀 분석", "🧮 일괄 정밀 분석", "🧪 포트폴리오 백테스트", "🎛️ 파라미터 스윕", "🚶 워크포워드", "📊 전략 성과(승률) 추적"])
 
     with tab1:
         with st.form("strategy_lab_form"):
@@ -66,6 +356,8 @@ def run():
                 
             t_ticker_select_label = col_in1.selectbox("관심종목 선택", display_list)
             t_capital = col_in2.number_input("총 운용금 (원)", value=10000000, step=100000)
+            # [신규] 장기 차트: 수년치 일봉을 그대로 넘기고 그리는 쪽에서 LTTB 로 화면 해상도만큼 줄임 (최근 4개월은 원본)
+            t_chart_years = col_in2.selectbox("차트 기간", [0, 3, 5, 10], format_func=lambda y: f"{y}년" if y else "최근 150봉")
             
             lab_submitted = st.form_submit_button("🧬 정밀 분석 실행", type="primary", use_container_width=True)
 
@@ -77,18 +369,14 @@ def run():
                 if not real_ticker: real_ticker = target
                 
                 with st.spinner(f"'{real_ticker}' 데이터를 정밀 분석 중입니다..."):
-                    raw_df = st_algo.fetch_data(real_ticker)
+                    raw_df = st_algo.fetch_data(real_ticker, days=365 * max(1, t_chart_years))
                     if raw_df is not None and not raw_df.empty:
-                        strat_mapping = [
-                            ("🐢 터틀", "🐢 터틀 트레이딩"), ("⚡ 엘리트", "⚡ 엘리트 매매법"),
-                            ("🔥 DBB", "🔥 DBB (더블볼린저)"), ("💧 BNF", "💧 BNF (과매도)"),
-                            ("🤖 AI스퀴즈", "🤖 AI 스퀴즈"), ("🛡️ 버핏", "🛡️ 버핏 (장기투자)"),
-                            ("⚓ VWAP", "⚓ VWAP (지지선)")
-                        ]
                         master_consensus = {}
                         master_details = {}
-                        for short_name, full_name in strat_mapping:
-                            res = st_algo.analyze_strategy_deep_dive(raw_df, t_capital, st.session_state["usd_rate"], full_name, real_ticker)
+                        all_res = st_algo.deep_dive_all(raw_df, t_capital, st.session_state["usd_rate"], real_ticker,
+                                                        chart_bars=None if t_chart_years else 150)
+                        for short_name, full_name in st_algo.DEEP_DIVE_STRATEGIES:
+                            res = all_res[full_name]
                             if res:
                                 master_details[full_name] = res
                                 master_consensus[short_name] = res['signal']
@@ -153,58 +441,89 @@ def run():
                         
                         st.plotly_chart(ui.draw_strategy_chart(res['df'], m_pack['ticker'], tab_names[i]), use_container_width=True)
 
+    with tab_batch:
+        run_batch_lab()
+
+    with tab_bt:
+        run_backtest_lab()
+
+    with tab_sweep:
+        run_sweep_lab()
+
+    with tab_wf:
+        run_walkforward_lab()
+
     with tab2:
         st.subheader("📆 과거 추천 종목 검증 (Back-check)")
-        st.info("과거에 포착된 종목들의 성과를 분석하고, 전략별 전역 승률을 갱신합니다.")
+        st.info("포착일 이후 1/5/10/20 거래일 종가 기준 성과입니다. 만기가 도래한 호라이즌은 백그라운드에서 자동으로 채워집니다.")
         
-        available_dates = db.get_scan_history_dates()
+        bc_mode = st.radio("보기", ["📅 날짜별", "📈 전체 기간 추이"], horizontal=True, key="bc_mode", label_visibility="collapsed")
+        available_dates = history_store.get_scan_dates()
         
         if not available_dates:
             st.warning("아직 기록된 스캔 내역이 없습니다.")
+        elif bc_mode == "📈 전체 기간 추이":
+            run_full_backcheck(available_dates)
         else:
             c_sel1, c_sel2 = st.columns([1, 2])
             selected_date = c_sel1.selectbox("과거 날짜 선택", available_dates)
+            horizon = c_sel1.selectbox("보유 기간 (거래일)", list(outcomes.HORIZONS), index=1, format_func=lambda h: f"{h}일")
+            show_live = c_sel2.checkbox("현재가 대비 수익률도 보기 (실시간 조회)", value=False)
+            
+            if c_sel2.button("🔄 성과 데이터 갱신"):
+                with st.spinner("새로 만기가 도래한 성과를 계산 중..."):
+                    n_new = outcomes.evaluate_pending_outcomes()
+                st.toast(f"{n_new}건의 성과가 새로 기록되었습니다.", icon="📡")
+            
+            with st.expander("📈 전략별 누적 성과 (전체 기간)", expanded=False):
+                summary = db.get_strategy_perf_summary()
+                if summary:
+                    df_sum = pd.DataFrame(summary, columns=["전략", "보유(일)", "건수", "승률(%)", "평균수익률(%)", "표준편차(%)"])
+                    st.dataframe(df_sum, hide_index=True, use_container_width=True)
+                else:
+                    st.caption("아직 집계된 성과가 없습니다.")
             
             if selected_date:
-                history_rows = db.get_history_by_date(selected_date)
+                # [최적화] 네트워크 조회 없이 인덱스 조회 1회
+                history_rows = history_store.get_outcomes_by_date(selected_date, horizon)
                 if history_rows:
-                    if c_sel1.button("🚀 성과 분석 시작", type="primary"):
-                        with st.spinner(f"{selected_date} 데이터 분석 및 전역 통계 갱신 중..."):
-                            target_list = [(r[1], r[4]) for r in history_rows]
-                            current_prices = fetch_current_prices_batch(target_list)
-                            
-                            perf_data = []
-                            stats = {} 
-                            
-                            for row in history_rows:
-                                strat, code, name, entry, mkt = row
-                                curr = current_prices.get(code, 0.0)
-                                
-                                if curr > 0:
-                                    ret = ((curr - entry) / entry) * 100
-                                    is_win = ret > 0 
-                                    win_str = "🔴승" if is_win else "🔵패"
-                                    
-                                    if strat not in stats: stats[strat] = {'win':0, 'total':0}
-                                    stats[strat]['total'] += 1
-                                    if is_win: stats[strat]['win'] += 1
-                                    
-                                    perf_data.append({
-                                        "전략": strat, "종목명": name, "코드": code,
-                                        "포착당시가": entry, "현재가": curr,
-                                        "수익률(%)": ret, "결과": win_str
-                                    })
+                    current_prices = {}
+                    if show_live:
+                        with st.spinner("현재가 조회 중..."):
+                            current_prices = qs.get_prices([r[1] for r in history_rows])
+                    
+                    perf_data = []
+                    stats = {} 
+                    
+                    for row in history_rows:
+                        strat, code, name, entry, mkt, exit_date, exit_price, ret = row
+                        item = {
+                            "전략": strat, "종목명": name, "코드": code,
+                            "포착당시가": entry, "청산일": exit_date, "청산가": exit_price,
+                            "수익률(%)": ret, "결과": "⏳대기"
+                        }
+                        if ret is not None:
+                            is_win = ret > 0 
+                            item["결과"] = "🔴승" if is_win else "🔵패"
                             
-                            if stats:
-                                db.update_strategy_stats(stats)
-                                st.toast("전략별 전역 승률이 업데이트 되었습니다!", icon="📡")
-
-                            st.divider()
-                            st.markdown(f"### 📊 {selected_date} 전략별 성적표")
-                            cols = st.columns(len(stats)) if stats else []
-                            for idx, (s_name, stat) in enumerate(stats.items()):
-                                win_rate = (stat['win'] / stat['total']) * 100
-                                with cols[idx]:
-                                    st.metric(label=s_name, value=f"{win_rate:.0f}%", delta=f"{stat['total']}건")
-
-                            st.dataframe(pd.DataFrame(perf_data), use_container_width=True)
\ No newline at end of file
+                            if strat not in stats: stats[strat] = {'win':0, 'total':0}
+                            stats[strat]['total'] += 1
+                            if is_win: stats[strat]['win'] += 1
+                        
+                        if show_live:
+                            curr = current_prices.get(code, 0.0)
+                            item["현재가"] = curr if curr > 0 else None
+                            item["현재가 대비(%)"] = ((curr - entry) / entry) * 100 if curr > 0 and entry > 0 else None
+                        perf_data.append(item)
+                    
+                    st.divider()
+                    st.markdown(f"### 📊 {selected_date} 전략별 성적표 ({horizon}일 보유)")
+                    cols = st.columns(len(stats)) if stats else []
+                    for idx, (s_name, stat) in enumerate(stats.items()):
+                        win_rate = (stat['win'] / stat['total']) * 100
+                        with cols[idx]:
+                            st.metric(label=s_name, value=f"{win_rate:.0f}%", delta=f"{stat['total']}건")
+                    if not stats:
+                        st.caption("아직 만기가 도래한 결과가 없습니다.")
+
+                    st.dataframe(pd.DataFrame(perf_data), use_container_width=True)
@@ -2,13 +2,33 @@ import streamlit as st
 import pandas as pd
 import threading
 import time
+import queue
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError, Future
 import database as db
 import data_loader as dl
+import asof_scan
 import strategies as st_algo
 import ui_components as ui
 
+def save_error_queue():
+    """세션별 저장 실패 큐 (스캔 상태 dict 와 별개라 새 스캔이 시작돼도 남아 있음)"""
+    return st.session_state.setdefault("scan_save_errors", queue.Queue())
+
+def watch_write(result, errors, label):
+    """
+    대기하지 않은 저장(Future)의 실패를 버리지 않고 기록 → 다음 rerun 에 화면에 1번 표시
+    콜백은 writer 스레드에서 실행되므로 세션 상태는 건드리지 않고 스레드 안전한 큐에만 넣음
+    """
+    if not isinstance(result, Future): return result
+    def done(fut):
+        exc = fut.exception()
+        if exc is not None:
+            print(f"Scan Save Error ({label}): {exc}")
+            errors.put(f"{label}: {exc}")
+    result.add_done_callback(done)
+    return result
+
 def scan_worker(full_target, filter_opts, status_container):
     # [최적화] 백테스트 연산이 벡터화되어 가벼워졌으므로 워커 수 증가 (Speed Up)
     workers = 8  
@@ -16,8 +36,11 @@ def scan_worker(full_target, filter_opts, status_container):
     
     exclude_penny = filter_opts['exclude_penny']
     s_opts = filter_opts['strategies']
+    as_of = filter_opts.get('as_of')
     
     results = []
+    signals = []  # 필터와 무관하게 신호가 나온 모든 종목 (daily_signals 기록용)
+    scanned = []  # 실제로 스캔한 종목 (신규 신호 비교 범위)
     processed_count = 0
     
     try:
@@ -33,8 +56,9 @@ def scan_worker(full_target, filter_opts, status_container):
                 else:
                     safe_code = raw_code
                     
-                ft = executor.submit(st_algo.analyze_single_stock, safe_code, r['Name'], r.get('Market', 'Unknown'), exclude_penny)
+                ft = executor.submit(st_algo.analyze_single_stock, safe_code, r['Name'], r.get('Market', 'Unknown'), exclude_penny, as_of, True)
                 futures[ft] = r
+                scanned.append(safe_code)
 
             for future in as_completed(futures):
                 if status_container.get('stop_requested', False):
@@ -44,7 +68,9 @@ def scan_worker(full_target, filter_opts, status_container):
                     res = future.result(timeout=15) # 타임아웃 약간 여유있게
                     
                     if res:
-                        d = res['전략_리스트']
+                        res, scores = res
+                        signals.append((res['코드'], res['종목명'], res.get('시장', 'KR'), scores))
+                        d = res['발견된_전략'].split(" > ")
                         match = False
                         
                         if s_opts['elite'] and any("엘리트" in s for s in d): match = True
@@ -72,15 +98,110 @@ def scan_worker(full_target, filter_opts, status_container):
         print(f"Scan Worker Error: {e}")
         
     status_container['results'] = results
+    status_container['signals'] = signals
+    status_container['scanned_codes'] = scanned
     status_container['running'] = False
 
+def apply_scan_diff(scan_date, s_opts, scanned_codes, signals):
+    """
+    [신규] 직전 스캔 날짜 대비 새로 나온 (종목, 전략) 만 남김 - scan_history 에서 SQL EXCEPT 로 계산
+    (BNF / VWAP 처럼 며칠씩 유지되는 신호의 반복 포착을 걸러냄)
+    비교 범위는 이번에 스캔한 종목, 신규는 이번 스캔에서 실제로 나온 신호로 한정 (같은 날 앞선 스캔 기록 제외)
+    """
+    labels = dict(asof_scan.SCAN_STRATEGIES)
+    strategies = [labels[k] for k, on in s_opts.items() if on and k in labels]
+    prev_date = db.get_previous_scan_date(scan_date, scanned_codes)
+    new, dropped = db.get_scan_diff(scan_date, prev_date, strategies, scanned_codes)
+    fired = {(str(code), s_name) for code, _, _, scores in signals for s_name in scores}
+    new = [row for row in new if (row[0], row[3]) in fired]
+
+    new_by_code = {}
+    for code, _, _, s_name in new:
+        new_by_code.setdefault(code, []).append(s_name)
+    df = st.session_state["scan_data"]
+    if df is not None and not df.empty:
+        df = df[df['코드'].astype(str).isin(new_by_code)].copy()
+        df.insert(3, "신규_전략", df['코드'].astype(str).map(lambda c: " · ".join(new_by_code[c])))
+        st.session_state["scan_data"] = df.reset_index(drop=True)
+    st.session_state["scan_diff"] = {
+        "date": scan_date, "prev_date": prev_date, "new": len(new),
+        "dropped": pd.DataFrame(dropped, columns=["코드", "종목명", "시장", "전략", "직전 포착가"]),
+    }
+
+def render_scan_diff(diff):
+    if not diff['prev_date']:
+        st.info("🆕 직전 스캔 기록이 없어 모든 신호를 신규로 표시합니다.")
+        return
+    st.info(f"🆕 {diff['prev_date']} 스캔 대비 신규 신호 {diff['new']}건 · 이탈 {len(diff['dropped'])}건 (기준: {diff['date']})")
+    if not diff['dropped'].empty:
+        with st.expander(f"📤 직전 스캔 이후 이탈 ({len(diff['dropped'])}건)"):
+            st.dataframe(diff['dropped'], hide_index=True, use_container_width=True)
+
+def render_range_backfill(is_running):
+    """[신규] 과거 구간 일괄 스캔: 기간 전체를 한 번의 패널 연산으로 스캔해 scan_history 를 채움 (저장된 일봉만 사용)"""
+    with st.expander("🗓️ 과거 구간 일괄 스캔 (scan_history 백필)"):
+        with st.form("scanner_backfill_form"):
+            today = datetime.now().date()
+            c1, c2 = st.columns(2)
+            bf_range = c1.date_input("기간", value=(today - pd.Timedelta(days=90), today), max_value=today)
+            bf_markets = c2.multiselect("시장", ["KOSPI", "KOSDAQ", "S&P500", "NASDAQ"], default=["KOSPI"])
+            labels = dict(asof_scan.SCAN_STRATEGIES)
+            bf_strats = c1.multiselect("전략 필터 (비우면 전체)", list(labels), format_func=labels.get)
+            bf_penny = c2.checkbox("🚫 동전주 제외", value=True, key="bf_exclude_penny")
+            bf_submitted = st.form_submit_button("🗓️ 구간 스캔 후 기록", use_container_width=True, disabled=is_running)
+
+        if bf_submitted:
+            if len(bf_range) != 2 or not bf_markets:
+                st.error("시작일 / 종료일과 시장을 선택해주세요.")
+                return
+            with st.spinner("종목 리스트를 불러오는 중..."):
+                targets = pd.concat([dl.get_master_data(m) for m in bf_markets]).drop_duplicates(subset=['Code'])
+            bar = st.progress(0.0, text="구간 스캔 중...")
+            summary = asof_scan.backfill_range(targets, bf_range[0], bf_range[1], bf_penny, bf_strats,
+                                               progress=lambda done, total: bar.progress(done / total, text=f"구간 스캔 중... ({done}/{total})"))
+            bar.empty()
+            if summary['hits']:
+                st.success(f"✅ {summary['dates']}개 거래일, {summary['hits']:,}건 포착 → 새로 기록 {summary['saved']:,}건")
+            else:
+                st.warning("포착된 신호가 없습니다. (저장된 일봉이 없는 종목은 건너뜁니다)")
+
+def render_signal_query():
+    """[신규] 일별 신호 테이블 조회: 재스캔 없이 '기간 안에 N번 이상 발생한 종목' 검색"""
+    with st.expander("🔎 신호 이력 조회 (daily_signals)"):
+        first, last = db.get_signal_date_range()
+        if not first:
+            st.info("저장된 신호가 없습니다. 스캔 또는 과거 구간 일괄 스캔을 먼저 실행하세요.")
+            return
+        st.caption(f"저장된 신호 기간: {first} ~ {last}")
+        labels = dict(asof_scan.SCAN_STRATEGIES)
+        with st.form("scanner_signal_query_form"):
+            c1, c2, c3, c4 = st.columns(4)
+            q_strat = c1.selectbox("전략", list(labels), format_func=labels.get, index=list(labels).index("turtle"))
+            q_market = c2.selectbox("시장", ["전체", "KOSPI", "KOSDAQ", "S&P500", "NASDAQ"])
+            q_days = c3.number_input("최근 N일", value=30, min_value=1, max_value=3650)
+            q_min = c4.number_input("최소 발생 횟수", value=2, min_value=1, max_value=365)
+            q_submitted = st.form_submit_button("🔎 조회", use_container_width=True)
+
+        if q_submitted:
+            end = datetime.now().strftime("%Y-%m-%d")
+            start = (datetime.now() - pd.Timedelta(days=int(q_days))).strftime("%Y-%m-%d")
+            rows = db.query_signal_counts(q_strat, start, end, None if q_market == "전체" else q_market, q_min)
+            if not rows:
+                st.warning("조건에 맞는 종목이 없습니다.")
+                return
+            res = pd.DataFrame(rows, columns=["코드", "종목명", "시장", "발생 횟수", "첫 발생일", "마지막 발생일", "최고 점수"])
+            st.caption(f"{labels[q_strat]} · {start} ~ {end} · {len(res)}개 종목")
+            st.dataframe(res, hide_index=True, use_container_width=True,
+                         column_config={"최고 점수": st.column_config.NumberColumn(format="%.1f")})
+
 def run():
     if 'scan_status' not in st.session_state:
         st.session_state['scan_status'] = {
             'running': False, 'progress': 0, 'total': 0, 'results': [], 'stop_requested': False
         }
 
-    global_stats = db.get_strategy_stats()
+    # 전략별 5일 보유 누적 승률 (strategy_perf 집계 테이블 직접 조회)
+    global_stats = db.get_strategy_stats(horizon=5)
 
     def get_label(name, key):
         rate = global_stats.get(key, 0.0)
@@ -91,6 +212,9 @@ def run():
         
         status = st.session_state['scan_status']
         is_running = status['running']
+        errors = save_error_queue()
+        while not errors.empty():
+            st.error(f"💾 스캔 결과 저장 실패 - {errors.get_nowait()}")
         
         with st.form("scanner_form"):
             cols = st.columns(4)
@@ -101,8 +225,12 @@ def run():
             st.write("")
             c_opt1, c_opt2 = st.columns(2)
             exclude_penny = c_opt1.checkbox("🚫 동전주 제외", value=True)
+            diff_mode = c_opt1.checkbox("🆕 신규 신호만 (직전 스캔 대비)", value=False)
+            # [신규] 과거 기준일 스캔: 기준일까지 저장된 일봉만 사용 (네트워크 없음)
+            today = datetime.now().date()
+            as_of_date = c_opt2.date_input("📅 기준일 (과거 날짜는 저장된 일봉으로 스캔)", value=today, max_value=today)
             st.divider()
-            st.write("🎯 **전략 필터** (괄호 안은 전체 누적 승률)")
+            st.write("🎯 **전략 필터** (괄호 안은 과거 포착 종목의 5일 보유 누적 승률)")
             sc = st.columns(7)
             s_opts = {
                 'elite': sc[0].checkbox(get_label("⚡ 엘리트", "⚡엘리트"), value=True),
@@ -133,12 +261,14 @@ def run():
                     
                     full_target = full_target.drop_duplicates(subset=['Code']).reset_index(drop=True)
                 
+                as_of = pd.Timestamp(as_of_date) if as_of_date < datetime.now().date() else None
                 st.session_state['scan_status'] = {
-                    'running': True, 'progress': 0, 'total': len(full_target), 'results': [], 'stop_requested': False
+                    'running': True, 'progress': 0, 'total': len(full_target), 'results': [], 'stop_requested': False,
+                    'as_of': as_of, 'diff_mode': diff_mode, 'strategies': s_opts
                 }
                 st.session_state["scan_data"] = None
                 
-                filter_opts = {'exclude_penny': exclude_penny, 'strategies': s_opts}
+                filter_opts = {'exclude_penny': exclude_penny, 'strategies': s_opts, 'as_of': as_of}
                 
                 t = threading.Thread(target=scan_worker, args=(full_target, filter_opts, st.session_state['scan_status']))
                 t.daemon = True 
@@ -169,25 +299,39 @@ def run():
             if st.session_state["scan_data"] is None:
                 results = status['results']
                 stop_req = status.get('stop_requested', False)
+                as_of = status.get('as_of')
+                today_str = (as_of or datetime.now()).strftime("%Y-%m-%d")
+                diff_mode = status.get('diff_mode', False) and not stop_req
+                st.session_state["scan_diff"] = None
+                
+                if not stop_req:
+                    # [신규] 일별 신호 테이블 증분 저장 (전략 필터와 무관하게 신호가 나온 전체 종목)
+                    watch_write(db.save_daily_signals([asof_scan.signal_row(today_str, *sig) for sig in status.get('signals', [])], wait=False),
+                                errors, "daily_signals")
                 
                 if results:
                     st.session_state["scan_data"] = pd.DataFrame(results)
                     
                     if not stop_req:
-                        today_str = datetime.now().strftime("%Y-%m-%d")
-                        save_cnt = 0
+                        records = []
                         for res in results:
-                            s_list = res.get('전략_리스트', [])
+                            s_list = res['발견된_전략'].split(" > ")
                             code = str(res['코드'])
                             name = res['종목명']
                             entry_price = float(res['현재가_RAW'])
                             market = res.get('시장', 'KR')
                             
                             for s_name in s_list:
-                                db.save_scan_result(today_str, s_name, code, name, entry_price, market)
-                                save_cnt += 1
+                                records.append((today_str, s_name, code, name, entry_price, market))
+                        
+                        # [최적화] 행 단위 저장 대신 1회 트랜잭션으로 일괄 저장 (writer 큐에 넘기고 대기하지 않음)
+                        # 신규 신호 모드는 저장이 끝나야 직전 스캔과 비교할 수 있으므로 대기
+                        try:
+                            watch_write(db.save_scan_results(records, wait=diff_mode), errors, "scan_history")
+                        except Exception as e:
+                            st.error(f"💾 스캔 결과 저장 실패 - scan_history: {e}")
                         
-                        if save_cnt > 0:
+                        if records:
                             st.toast(f"💾 성과 분석을 위해 {len(results)}개 종목이 기록되었습니다.", icon="📈")
                     
                     if stop_req:
@@ -201,29 +345,53 @@ def run():
                     else:
                         st.warning("조건에 맞는 종목이 없습니다.")
                     st.session_state["scan_data"] = pd.DataFrame()
+                
+                if diff_mode:
+                    apply_scan_diff(today_str, status.get('strategies', {}), status.get('scanned_codes', []), status.get('signals', []))
+
+        render_range_backfill(is_running)
+        render_signal_query()
+
+    if st.session_state.get("scan_diff"):
+        render_scan_diff(st.session_state["scan_diff"])
 
     if st.session_state["scan_data"] is not None and not st.session_state["scan_data"].empty:
-        df = st.session_state["scan_data"].copy()
+        # [최적화] 정렬은 새 프레임을 만들므로 원본 복사 불필요 (결과 행은 스칼라만, 차트 시계열 / 중첩 통계는 chart_store)
+        df = st.session_state["scan_data"]
+        
+        # [신규] 보유기간 선택 → 해당 호라이즌 성과 컬럼만 표시하고 승률 순 정렬 (재스캔 불필요)
+        c_h1, c_h2 = st.columns([1, 3])
+        sort_h = c_h1.selectbox("📐 보유기간 기준", list(st_algo.SCAN_HORIZONS), index=2, format_func=lambda h: f"{h}일", key="scan_sort_h")
+        sort_key = c_h2.radio("정렬", ["승률", "평균수익률", "MAE(작은 손실 우선)"], horizontal=True, key="scan_sort_key")
+        sort_col = {"승률": f"승률_{sort_h}일", "평균수익률": f"수익_{sort_h}일", "MAE(작은 손실 우선)": f"MAE_{sort_h}일"}[sort_key]
+        if sort_col in df.columns:
+            df = df.sort_values(sort_col, ascending=False, na_position="last").reset_index(drop=True)
         
         col_conf = {
-            "현재가_RAW": None, "chart_dates": None, "chart_open": None, "chart_high": None, "chart_low": None, "chart_close": None, 
-            "chart_vol": None, "chart_ma": None, "chart_up": None, "chart_down": None, 
-            "chart_up1": None, "chart_down1": None,
-            "vwap_val": None, "mfi_line": None, "avwap": None,
-            "전략_리스트": None, "Bandwidth": None, "Disparity25": None, "ai_report_html": None, 
-            "RSI": None, "MA20": None, "MA5": None, "macd": None, "macd_sig": None, "macd_hist": None, 
-            "stoch_k": None, "stoch_d": None, "rsi_line": None, "ATR": None, "High20": None,
+            "현재가_RAW": None,
+            "Bandwidth": None, "Disparity25": None, "ai_report_html": None, 
+            "RSI": None, "MA20": None, "MA5": None, "ATR": None, "High20": None,
             
             "종목명": st.column_config.TextColumn("종목명", width="medium"),
             "시장": st.column_config.TextColumn("시장", width="small"),
             "발견된_전략": st.column_config.TextColumn("포착된 신호 (우선순위)", width="large"),
             "과거승률": st.column_config.TextColumn("과거 1년 백테스트 (5일보유)", width="medium", help="해당 종목이 과거 1년간 이 전략 신호 발생 후 5일 뒤 수익권이었던 비율"),
+            "승률_CI": st.column_config.TextColumn("승률 95% CI", width="small", help="과거승률의 부트스트랩 95% 신뢰구간 (표본이 적을수록 넓음)"),
+            "p값": st.column_config.NumberColumn("p값", format="%.3f", help="같은 종목에서 아무 날이나 같은 횟수만큼 진입했을 때 이 승률 이상이 나올 확률"),
+            "유의성": st.column_config.TextColumn("유의성", width="small"),
         }
+        for h in st_algo.SCAN_HORIZONS:
+            show = (h == sort_h)
+            col_conf[f"승률_{h}일"] = st.column_config.NumberColumn(f"승률({h}일)", format="%.0f%%", help="최우선 전략 신호 후 h일 뒤 수익권 비율") if show else None
+            col_conf[f"수익_{h}일"] = st.column_config.NumberColumn(f"평균({h}일)", format="%.2f%%") if show else None
+            col_conf[f"MAE_{h}일"] = st.column_config.NumberColumn(f"MAE({h}일)", format="%.2f%%", help="보유 중 최저가 기준 평균 최대 역행폭") if show else None
         
         evt = st.dataframe(df, column_config=col_conf, hide_index=True, use_container_width=True, height=400, selection_mode="single-row", on_select="rerun")
         
         if len(evt.selection['rows']) > 0:
             sel_row = df.iloc[evt.selection['rows'][0]]
+            # 중첩 통계는 결과 행이 아니라 공용 저장소에 있음 (키: 종목, 기준일)
+            detail = st_algo.scan_detail(sel_row['코드'], sel_row['종목명'], sel_row['시장'], sel_row['기준일']) or {}
             st.divider()
             c_h, c_b = st.columns([5, 1])
             c_h.subheader(f"{sel_row['종목명']} ({sel_row['코드']})")
@@ -239,9 +407,7 @@ def run():
                     try: current_p = float(sel_row.get('현재가_RAW', 0))
                     except: current_p = 0.0
                     
-                    strategies_raw = sel_row.get('전략_리스트', [])
-                    if isinstance(strategies_raw, list): strategies_str = ", ".join(strategies_raw)
-                    else: strategies_str = str(strategies_raw)
+                    strategies_str = ", ".join(detail.get('전략_리스트') or sel_row['발견된_전략'].split(" > "))
 
                     db.add_favorite(st.session_state["username"], str(sel_row['코드']), 
                                     name=str(sel_row['종목명']), 
@@ -252,4 +418,29 @@ def run():
             if 'ai_report_html' in sel_row and sel_row['ai_report_html']:
                 st.markdown(sel_row['ai_report_html'], unsafe_allow_html=True)
             
-            st.plotly_chart(ui.draw_detailed_chart(sel_row), use_container_width=True, key=f"chart_{sel_row['코드']}")
\ No newline at end of file
+            h_stats = detail.get('horizon_stats')
+            if isinstance(h_stats, dict) and h_stats:
+                with st.expander("📐 포착된 전략별 보유기간 성과 (과거 1년)", expanded=False):
+                    rows = [{"전략": strat, "보유(일)": h, "건수": v['n'], "승률(%)": v['win'], "평균수익률(%)": v['mean'], "MAE(%)": v['mae']}
+                            for strat, by_h in h_stats.items() for h, v in by_h.items()]
+                    sig = detail.get('significance')
+                    if isinstance(sig, dict):
+                        st.dataframe(pd.DataFrame([{
+                            "전략": strat, "건수": v['n'], "승률(%)": v['win'], "95% CI": f"{v['ci_lo']:.0f}~{v['ci_hi']:.0f}%" if v['n'] else "-",
+                            "무작위 진입 승률(%)": v['base_win'], "p값": v['p_value'], "판정": st_algo.significance.verdict(v['p_value'], v['n']),
+                        } for strat, v in sig.items()]), column_config={
+                            "승률(%)": st.column_config.NumberColumn(format="%.0f%%"),
+                            "무작위 진입 승률(%)": st.column_config.NumberColumn(format="%.0f%%"),
+                            "p값": st.column_config.NumberColumn(format="%.3f"),
+                        }, hide_index=True, use_container_width=True)
+                    st.dataframe(pd.DataFrame(rows), column_config={
+                        "승률(%)": st.column_config.NumberColumn(format="%.0f%%"),
+                        "평균수익률(%)": st.column_config.NumberColumn(format="%.2f%%"),
+                        "MAE(%)": st.column_config.NumberColumn(format="%.2f%%"),
+                    }, hide_index=True, use_container_width=True)
+            
+            chart = st_algo.chart_series(sel_row['코드'], sel_row['기준일'])
+            if chart is not None:
+                st.plotly_chart(ui.draw_detailed_chart(sel_row, chart), use_container_width=True, key=f"chart_{sel_row['코드']}")
+            else:
+                st.warning("차트 데이터를 불러오지 못했습니다.")
\ No newline at end of file
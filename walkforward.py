@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import backtest as bt
+import sweep
+from strategies import DEFAULT_PARAMS
+
+# -----------------------------------------------------------------------------
+# 워크포워드 검증
+# - 거래일 기준 [학습 | 검증] 창을 step 만큼 밀면서 반복
+# - 기본값 모드: 각 검증 구간에서 기본 파라미터 성과만 측정
+# - 스윕 모드: 학습 구간에서 격자 중 최고 조합을 고르고 바로 뒤 검증 구간에서 측정
+# - 창마다 병렬, 워커는 sweep 의 공유 메모리 패널 / 지표 캐시를 그대로 사용
+#   (지표는 과거 값만 쓰는 rolling/ewm 이라 전체 패널에서 한 번 계산해도 미래 정보가 섞이지 않음)
+# -----------------------------------------------------------------------------
+def make_windows(n_days, train_days=252, test_days=63, step=None):
+    """Returns: [(학습 시작, 학습 끝, 검증 끝), ...] (행 인덱스, 끝은 미포함)"""
+    step = step or test_days
+    windows = []
+    start = 0
+    while start + train_days + test_days <= n_days:
+        windows.append((start, start + train_days, start + train_days + test_days))
+        start += step
+    return windows
+
+def _eval_window(task):
+    w_idx, (t0, t1, t2), candidates, min_trades = task
+    rows = []
+    for strategy, param_sets in candidates.items():
+        best, best_score, best_train = None, None, (0, np.nan, np.nan)
+        for params in param_sets:
+            entry, fwd = sweep.worker_entry_and_returns(strategy, params)
+            hold = {**DEFAULT_PARAMS, **params}["hold_days"]
+            # 학습 구간 끝의 신호는 결과가 검증 구간에 걸치므로 제외
+            train = bt.event_stats(entry, fwd, slice(t0, max(t0, t1 - hold)))
+            score = train[2] if train[0] >= min_trades else None
+            if best is None or (score is not None and (best_score is None or score > best_score)):
+                best, best_score, best_train = params, score, train
+        entry, fwd = sweep.worker_entry_and_returns(strategy, best)
+        test = bt.event_stats(entry, fwd, slice(t1, t2))
+        rows.append({
+            "window": w_idx, "strategy": strategy, "params": best,
+            "train_n": best_train[0], "train_win": best_train[1], "train_mean": best_train[2],
+            "test_n": test[0], "test_win": test[1], "test_mean": test[2],
+        })
+    return rows
+
+def run_walkforward(panels, train_days=252, test_days=63, step=None, strategies=None,
+                    grid=None, optimize=False, min_trades=20, max_workers=None):
+    """
+    optimize=False: 기본 파라미터만 평가 / True: grid(없으면 sweep.DEFAULT_GRID) 에서 창마다 선택
+    Returns: (창별 결과 DataFrame, 전략별 안정성 요약 DataFrame)
+    Raises: ValueError - 창이 하나도 없거나 평가할 전략이 없을 때 (화면에 그대로 보여줄 메시지)
+    """
+    n_days = len(panels["dates"])
+    windows = make_windows(n_days, train_days, test_days, step)
+    if not windows:
+        raise ValueError(f"기간({n_days}거래일)이 학습 + 검증 창({train_days + test_days}거래일)보다 짧습니다. 기간을 늘리거나 창을 줄이세요.")
+
+    candidates = {}
+    if optimize:
+        for strategy, params, _ in sweep.make_tasks(grid, strategies):
+            candidates.setdefault(strategy, []).append(params)
+    else:
+        for strategy, _ in bt.STRATEGIES:
+            if not strategies or strategy in strategies: candidates[strategy] = [{}]
+    if not candidates:
+        raise ValueError(f"평가할 전략이 없습니다: {', '.join(strategies or [])}")
+    tasks = [(i, w, candidates, min_trades) for i, w in enumerate(windows)]
+
+    blocks, spec = sweep.share_panels(panels)
+    try:
+        with sweep.pool_executor(spec, max_workers) as executor:
+            rows = [r for chunk in executor.map(_eval_window, tasks) for r in chunk]
+    finally:
+        sweep.release_panels(blocks)
+
+    dates = panels["dates"]
+    df = pd.DataFrame(rows)
+    df["test_start"] = [dates[windows[i][1]].strftime("%Y-%m-%d") for i in df["window"]]
+    df["test_end"] = [dates[windows[i][2] - 1].strftime("%Y-%m-%d") for i in df["window"]]
+    df.insert(0, "전략", df["strategy"].map(dict(bt.STRATEGIES)))
+    return df, stability_summary(df)
+
+def stability_summary(df):
+    """검증 구간 성과가 창마다 얼마나 일정한지: 평균 / 표준편차 / 양(+)인 창 비율"""
+    g = df[df["test_n"] > 0].groupby("전략")
+    summary = pd.DataFrame({
+        "windows": g.size(),
+        "test_n": g["test_n"].sum(),
+        "win_mean": g["test_win"].mean(),
+        "win_std": g["test_win"].std(),
+        "ret_mean": g["test_mean"].mean(),
+        "ret_std": g["test_mean"].std(),
+        "positive_pct": g["test_mean"].apply(lambda x: (x > 0).mean() * 100),
+        # 학습 대비 검증 성과 하락폭 (과최적화 정도)
+        "decay": g.apply(lambda x: (x["train_mean"] - x["test_mean"]).mean(), include_groups=False),
+    })
+    summary["stability"] = summary["ret_mean"] / summary["ret_std"].replace(0, np.nan)
+    return summary.sort_values("stability", ascending=False).reset_index()